@@ -4,6 +4,7 @@ import sys
 
 from codemodder import __version__
 from codemodder.code_directory import DEFAULT_EXCLUDED_PATHS
+from codemodder.context import ExecutorType, Schedule
 from codemodder.logging import OutputFormat, logger
 from codemodder.registry import CodemodRegistry
 
@@ -152,11 +153,40 @@ def parse_args(argv, codemod_registry: CodemodRegistry):
         default=[],
         help="Comma-separated set of UNIX glob patterns to include",
     )
+    parser.add_argument(
+        "--changed-since",
+        type=str,
+        help="only analyze files that have changed relative to the given git ref",
+    )
     parser.add_argument(
         "--max-workers",
         type=int,
         default=1,
-        help="maximum number of workers (threads) to use for processing files in parallel",
+        help="maximum number of workers (threads or processes) to use for processing files in parallel",
+    )
+    parser.add_argument(
+        "--executor",
+        type=ExecutorType,
+        default=ExecutorType.THREAD,
+        choices=[ExecutorType.THREAD, ExecutorType.PROCESS],
+        help="the kind of workers used to process files in parallel",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=str,
+        help="directory for caching analysis results between runs",
+    )
+    parser.add_argument(
+        "--incremental",
+        action=argparse.BooleanOptionalAction,
+        help="skip files that produced no changes for a codemod in a previous run with the same inputs (requires --cache-dir)",
+    )
+    parser.add_argument(
+        "--schedule",
+        type=Schedule,
+        default=Schedule.CODEMOD_MAJOR,
+        choices=[Schedule.CODEMOD_MAJOR, Schedule.FILE_MAJOR],
+        help="apply each codemod to all files in turn (codemod-major) or all codemods to each file in turn (file-major)",
     )
 
     parser.add_argument(
@@ -184,4 +214,7 @@ def parse_args(argv, codemod_registry: CodemodRegistry):
         action=CsvListAction,
         help="Comma-separated set of path(s) to Contrast Security's vulnerabilities XML file(s) to feed to the codemods",
     )
-    return parser.parse_args(argv)
+    args = parser.parse_args(argv)
+    if args.incremental and not args.cache_dir:
+        parser.error("--incremental requires --cache-dir")
+    return args
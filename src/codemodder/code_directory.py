@@ -1,7 +1,13 @@
 import fnmatch
+import functools
 import itertools
+import os
+import re
+import threading
 from pathlib import Path
-from typing import Optional, Sequence
+from typing import Iterable, Iterator, Optional, Sequence
+
+import git
 
 DEFAULT_INCLUDED_PATHS = ["**.py", "**/*.py"]
 DEFAULT_EXCLUDED_PATHS = [
@@ -39,20 +45,253 @@ def file_line_patterns(file_path: str | Path, patterns: Sequence[str]):
     ]
 
 
-def filter_files(names: Sequence[str], patterns: Sequence[str], exclude: bool = False):
-    patterns = (
+def _compile_line_patterns(
+    patterns: Sequence[str],
+) -> list[tuple[re.Pattern, frozenset[int]]]:
+    lines_by_glob: dict[str, set[int]] = {}
+    for pat in patterns:
+        if len(result := pat.split(":")) != 2:
+            continue
+        try:
+            line = int(result[1])
+        except ValueError:
+            continue
+        lines_by_glob.setdefault(result[0], set()).add(line)
+
+    return [
+        (re.compile(fnmatch.translate(os.path.normcase(glob))), frozenset(lines))
+        for glob, lines in lines_by_glob.items()
+    ]
+
+
+class LineMatcher:
+    """
+    Lines included and excluded for each file by the path include and exclude patterns
+
+    Patterns that name a line are grouped by glob and compiled once per run,
+    and the lines for each file are computed once and shared by every codemod
+    that is applied to it.
+    """
+
+    _NO_LINES: frozenset[int] = frozenset()
+
+    def __init__(self, path_include: Sequence[str], path_exclude: Sequence[str]):
+        self._include = _compile_line_patterns(path_include)
+        self._exclude = _compile_line_patterns(path_exclude)
+        self._lines: dict[str, tuple[frozenset[int], frozenset[int]]] = {}
+
+    @staticmethod
+    def _match(
+        patterns: list[tuple[re.Pattern, frozenset[int]]], name: str
+    ) -> frozenset[int]:
+        return frozenset().union(
+            *(lines for regex, lines in patterns if regex.match(name))
+        )
+
+    def lines(self, file_path: str | Path) -> tuple[frozenset[int], frozenset[int]]:
+        """
+        Return the lines included and excluded for the given file
+        """
+        if not self._include and not self._exclude:
+            return self._NO_LINES, self._NO_LINES
+
+        key = str(file_path)
+        if (lines := self._lines.get(key)) is None:
+            name = os.path.normcase(key)
+            lines = self._lines[key] = (
+                self._match(self._include, name),
+                self._match(self._exclude, name),
+            )
+        return lines
+
+
+def _glob_patterns(patterns: Sequence[str], exclude: bool = False) -> list[str]:
+    return (
         [x.split(":")[0] for x in (patterns or [])]
         if not exclude
         # An excluded line should not cause the entire file to be excluded
         else [x for x in (patterns or []) if ":" not in x]
     )
-    return itertools.chain(*[fnmatch.filter(names, pattern) for pattern in patterns])
+
+
+@functools.cache
+def compile_patterns(patterns: tuple[str, ...]) -> re.Pattern | None:
+    """
+    Compile UNIX glob patterns into a single regex with `fnmatch` semantics
+    """
+    if not patterns:
+        return None
+    return re.compile(
+        "|".join(fnmatch.translate(os.path.normcase(pat)) for pat in patterns)
+    )
+
+
+def _prunable_dirs(exclude_patterns: Sequence[str]) -> re.Pattern | None:
+    """
+    Compile the excluded directories whose contents are entirely excluded
+
+    A pattern like `build/**` excludes every path beneath any directory that
+    matches `build`, so such directories need not be walked at all.
+    """
+    return compile_patterns(
+        tuple(
+            prefix[:-1]
+            for pat in exclude_patterns
+            if (prefix := pat.rstrip("*")) != pat
+            and prefix.endswith("/")
+            and len(prefix) > 1
+        )
+    )
+
+
+def _walk_files(parent_path: str | Path, prune: re.Pattern | None) -> Iterator[str]:
+    """
+    Yield the relative paths of all files beneath parent_path
+
+    Directories matching `prune` are not descended into. Like `Path.rglob`,
+    symlinks to directories are not followed.
+    """
+    dirs = [""]
+    while dirs:
+        rel_dir = dirs.pop()
+        try:
+            entries = os.scandir(os.path.join(parent_path, rel_dir))
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                rel_path = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if prune is None or not prune.match(os.path.normcase(rel_path)):
+                            dirs.append(rel_path)
+                    elif entry.is_file():
+                        yield rel_path
+                except OSError:
+                    continue
+
+
+def _suffix(name: str) -> str:
+    # Unlike `os.path.splitext`, a leading dot is part of the suffix
+    return "." + name.rsplit(".", 1)[1] if "." in name else ""
+
+
+class RepositoryInventory:
+    """
+    Index of all files beneath a directory, shared by file discovery and project analysis
+
+    The directory is walked once, when the inventory is first queried, and the
+    files found are indexed by name, suffix, and containing directory. Like
+    `Path.rglob`, symlinks to directories are not followed. Directories whose
+    contents are entirely excluded by `exclude_paths` are not walked.
+    """
+
+    def __init__(
+        self, parent_path: str | Path, exclude_paths: Optional[Sequence[str]] = None
+    ):
+        self.parent_path = parent_path
+        self._prune = _prunable_dirs(_glob_patterns(exclude_paths or [], exclude=True))
+        self._files: list[str] | None = None
+        self._by_name: dict[str, list[str]] = {}
+        self._by_suffix: dict[str, list[str]] = {}
+        self._by_dir: dict[str, set[str]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def files(self) -> list[str]:
+        """The sorted relative paths of all files in the inventory"""
+        return self._load()
+
+    def _load(self) -> list[str]:
+        with self._lock:
+            if self._files is None:
+                self._files = self._index()
+            return self._files
+
+    def _index(self) -> list[str]:
+        files = sorted(_walk_files(self.parent_path, self._prune))
+        for rel_path in files:
+            rel_dir, name = os.path.split(rel_path)
+            self._by_name.setdefault(name, []).append(rel_path)
+            self._by_suffix.setdefault(os.path.normcase(_suffix(name)), []).append(
+                rel_path
+            )
+            self._by_dir.setdefault(rel_dir, set()).add(name)
+        return files
+
+    def find(self, name: str) -> list[Path]:
+        """Find all files with the given name"""
+        self._load()
+        parent_path = Path(self.parent_path)
+        return [parent_path.joinpath(p) for p in self._by_name.get(name, [])]
+
+    def with_suffix(self, suffix: str) -> list[str]:
+        """Return the relative paths of all files with the given suffix"""
+        self._load()
+        return self._by_suffix.get(os.path.normcase(suffix), [])
+
+    def contains(self, directory: Path, name: str) -> bool | None:
+        """
+        Determine whether directory contains a file with the given name
+
+        Returns `None` if directory is not within the inventory.
+        """
+        try:
+            rel_dir = directory.relative_to(Path(self.parent_path))
+        except ValueError:
+            return None
+        self._load()
+        return name in self._by_dir.get("" if rel_dir == Path() else str(rel_dir), ())
+
+
+def _literal_suffixes(include_patterns: Sequence[str]) -> set[str] | None:
+    """
+    Find the suffix every file matching each pattern must have, e.g. `.py` for `**/*.py`
+
+    Returns `None` unless all of the patterns require such a suffix.
+    """
+    suffixes = set()
+    for pat in include_patterns:
+        if (match := re.search(r"\*(\.[^./*?\[\]]+)$", pat)) is None:
+            return None
+        suffixes.add(os.path.normcase(match[1]))
+    return suffixes
+
+
+def changed_files(parent_path: str | Path, ref: str) -> list[Path]:
+    """
+    Find the files within parent_path that have changed relative to a git ref.
+
+    This includes committed and uncommitted changes to tracked files as well as
+    untracked files that are not ignored. Deleted files are not included.
+
+    :param parent_path: str name for a directory within a git repository
+    :param ref: git ref (e.g. branch, tag, or commit) to compare against
+
+    :return: list of <pathlib.PosixPath> changed files within the parent directory
+    :raises git.GitError: if parent_path is not in a git repository or ref is invalid
+    """
+    repo = git.Repo(parent_path, search_parent_directories=True)
+    root = Path(repo.working_tree_dir or parent_path).resolve()
+    parent = Path(parent_path).resolve()
+
+    # Names are NUL-terminated so that they are not quoted
+    names = repo.git.diff("--name-only", "--no-renames", "-z", ref).split("\0")
+    names.extend(repo.git.ls_files("--others", "--exclude-standard", "-z").split("\0"))
+
+    return [
+        Path(parent_path).joinpath(path.relative_to(parent))
+        for name in sorted(set(names))
+        if name and (path := root / name).is_relative_to(parent) and path.is_file()
+    ]
 
 
 def match_files(
     parent_path: str | Path,
     exclude_paths: Optional[Sequence[str]] = None,
     include_paths: Optional[Sequence[str]] = None,
+    candidates: Optional[Sequence[Path]] = None,
+    inventory: Optional[RepositoryInventory] = None,
 ):
     """
     Find pattern-matching files starting at the parent_path, recursively.
@@ -63,30 +302,47 @@ def match_files(
     :param parent_path: str name for starting directory
     :param exclude_paths: list of UNIX glob patterns to exclude
     :param include_paths: list of UNIX glob patterns to exclude
+    :param candidates: files within parent_path to consider instead of walking the entire directory
+    :param inventory: inventory of parent_path to query instead of walking the directory again
 
     :return: list of <pathlib.PosixPath> files found within (including recursively) the parent directory
     that match the criteria of both exclude and include patterns.
     """
-    all_files = [
-        str(Path(path).relative_to(parent_path))
-        for path in Path(parent_path).rglob("*")
-    ]
-    included_files = set(
-        filter_files(
-            all_files,
-            include_paths if include_paths is not None else DEFAULT_INCLUDED_PATHS,
-        )
+    include_patterns = _glob_patterns(
+        include_paths if include_paths is not None else DEFAULT_INCLUDED_PATHS
     )
-    excluded_files = set(
-        filter_files(
-            all_files,
-            exclude_paths if exclude_paths is not None else DEFAULT_EXCLUDED_PATHS,
-            exclude=True,
-        )
+    include = compile_patterns(tuple(include_patterns))
+    exclude_patterns = _glob_patterns(
+        exclude_paths if exclude_paths is not None else DEFAULT_EXCLUDED_PATHS,
+        exclude=True,
     )
+    exclude = compile_patterns(tuple(exclude_patterns))
+    if include is None:
+        return []
 
-    return [
-        path
-        for p in sorted(list(included_files - excluded_files))
-        if (path := Path(parent_path).joinpath(p)).is_file()
+    all_files: Iterable[str]
+    if candidates is not None:
+        all_files = (
+            str(Path(path).relative_to(parent_path))
+            for path in candidates
+            if Path(path).is_file()
+        )
+    elif inventory is not None:
+        suffixes = _literal_suffixes(include_patterns)
+        all_files = (
+            inventory.files
+            if suffixes is None
+            else itertools.chain.from_iterable(
+                inventory.with_suffix(suffix) for suffix in suffixes
+            )
+        )
+    else:
+        all_files = _walk_files(parent_path, _prunable_dirs(exclude_patterns))
+
+    matched = [
+        name
+        for name in all_files
+        if include.match(normalized := os.path.normcase(name))
+        and (exclude is None or not exclude.match(normalized))
     ]
+    return [Path(parent_path).joinpath(p) for p in sorted(matched)]
@@ -1,33 +1,35 @@
 import datetime
+import functools
 import itertools
 import logging
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from pathlib import Path
 from typing import DefaultDict, Sequence
 
+import git
+
 from codemodder import __version__, registry
 from codemodder.cli import parse_args
-from codemodder.code_directory import match_files
+from codemodder.code_directory import RepositoryInventory, changed_files, match_files
 from codemodder.codemods.api import BaseCodemod
+from codemodder.codemods.fusion import apply_codemods_to_findings
 from codemodder.codemods.semgrep import SemgrepRuleDetector
-from codemodder.codetf import CodeTF
-from codemodder.context import CodemodExecutionContext
+from codemodder.codetf import CodeTFWriter, Run
+from codemodder.context import CodemodExecutionContext, Schedule
 from codemodder.dependency import Dependency
+from codemodder.executors import WorkUnit, process_work_units, use_process_pool
+from codemodder.file_context import FileContext
 from codemodder.logging import configure_logger, log_list, log_section, logger
+from codemodder.patch import PatchWriter
 from codemodder.project_analysis.file_parsers.package_store import PackageStore
 from codemodder.project_analysis.python_repo_manager import PythonRepoManager
 from codemodder.result import ResultSet
-from codemodder.sarifs import detect_sarif_tools
+from codemodder.sarifs import SarifRegistry
 from codemodder.semgrep import run as run_semgrep
-
-
-def update_code(file_path, new_code):
-    """
-    Write the `new_code` to the `file_path`
-    """
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write(new_code)
+from codemodder.utils.timer import Timer
 
 
 def find_semgrep_results(
@@ -50,7 +52,8 @@ def find_semgrep_results(
     ):
         return ResultSet()
 
-    return run_semgrep(context, yaml_files, files_to_analyze)
+    with context.timer.measure("semgrep"):
+        return run_semgrep(context, yaml_files, files_to_analyze)
 
 
 def log_report(context, argv, elapsed_ms, files_to_analyze):
@@ -76,6 +79,151 @@ def log_report(context, argv, elapsed_ms, files_to_analyze):
     logger.info("  write:       %s ms", context.timer.get_time_ms("write"))
 
 
+def files_for_codemod(
+    codemod: BaseCodemod,
+    semgrep_results: ResultSet,
+    files_to_analyze: list[Path],
+) -> list[Path] | None:
+    """
+    Return the files a codemod should be applied to, or `None` if it should be skipped entirely
+    """
+    if isinstance(codemod.detector, SemgrepRuleDetector):
+        # Unfortunately the IDs from semgrep are not fully specified
+        # TODO: eventually we need to be able to use fully specified IDs here
+        if codemod.name not in semgrep_results:
+            logger.debug(
+                "no results from semgrep for %s, skipping analysis",
+                codemod.id,
+            )
+            return None
+
+        return semgrep_results.files_for_rule(codemod.name)
+
+    # Non-semgrep codemods ignore the semgrep results
+    return files_to_analyze
+
+
+@dataclass
+class CodemodPlan:
+    """The detector results and files for a single codemod in a file-major run"""
+
+    codemod: BaseCodemod
+    results: ResultSet | None
+    files: set[Path]
+
+
+def apply_codemods_to_file(
+    file_path: Path,
+    context: CodemodExecutionContext,
+    plans: Sequence[CodemodPlan],
+) -> tuple[dict[str, FileContext], Timer]:
+    """
+    Apply the ordered sequence of codemods to a single file and write the final result once
+    """
+    return apply_codemods_to_findings(
+        file_path,
+        context,
+        [
+            (
+                plan.codemod,
+                plan.codemod._get_findings(
+                    file_path, context, plan.results, plan.codemod.rules
+                ),
+            )
+            for plan in plans
+            if file_path in plan.files
+        ],
+    )
+
+
+def apply_codemods_by_file(
+    context: CodemodExecutionContext,
+    codemods_to_run: Sequence[BaseCodemod],
+    semgrep_results: ResultSet,
+    files_to_analyze: list[Path],
+):
+    plans: list[CodemodPlan] = []
+    for codemod in codemods_to_run:
+        if (
+            codemod_files := files_for_codemod(
+                codemod, semgrep_results, files_to_analyze
+            )
+        ) is None:
+            continue
+
+        results = codemod.get_results(context, codemod_files)
+        if results is not None and not results:
+            logger.debug("No results for %s", codemod.id)
+            continue
+
+        plans.append(
+            CodemodPlan(
+                codemod,
+                results,
+                set(
+                    codemod.filter_by_results(
+                        context,
+                        codemod.filter_by_extension(codemod_files),
+                        results,
+                        codemod.rules,
+                    )
+                ),
+            )
+        )
+
+    planned_files: set[Path] = set().union(*(plan.files for plan in plans))
+    files = [path for path in files_to_analyze if path in planned_files]
+    files.extend(sorted(planned_files.difference(files_to_analyze)))
+
+    file_results: list[tuple[dict[str, FileContext], Timer]]
+    if use_process_pool(context, [plan.codemod for plan in plans]):
+        logger.debug("using process pool with %s workers", context.max_workers)
+        units = [
+            WorkUnit(
+                path,
+                tuple(
+                    (
+                        plan.codemod.id,
+                        plan.codemod._get_findings(
+                            path, context, plan.results, plan.codemod.rules
+                        ),
+                    )
+                    for plan in plans
+                    if path in plan.files
+                ),
+            )
+            for path in files
+        ]
+        file_results = list(process_work_units(context, units))
+    else:
+        process_file = functools.partial(
+            apply_codemods_to_file, context=context, plans=plans
+        )
+        with ThreadPoolExecutor(max_workers=context.max_workers) as executor:
+            logger.debug("using executor with %s workers", context.max_workers)
+            file_results = list(executor.map(process_file, files))
+
+    planned_codemods = {plan.codemod.id for plan in plans}
+    for codemod in codemods_to_run:
+        if codemod.id in planned_codemods:
+            # NOTE: this may be used as a progress indicator by upstream tools
+            logger.info("running codemod %s", codemod.id)
+            context.process_results(
+                codemod.id,
+                (
+                    file_contexts[codemod.id]
+                    for file_contexts, _ in file_results
+                    if codemod.id in file_contexts
+                ),
+            )
+            record_dependency_update(context.process_dependencies(codemod.id))
+            context.log_changes(codemod.id)
+        context.report_results(codemod)
+
+    for _, timer in file_results:
+        context.timer.aggregate(timer)
+
+
 def apply_codemods(
     context: CodemodExecutionContext,
     codemods_to_run: Sequence[BaseCodemod],
@@ -92,29 +240,38 @@ def apply_codemods(
         logger.info("no codemods to run")
         return
 
-    semgrep_finding_ids = semgrep_results.all_rule_ids()
+    # Changed files are only written once all codemods have been applied
+    with context.batch_writes():
+        if context.schedule == Schedule.FILE_MAJOR:
+            apply_codemods_by_file(
+                context, codemods_to_run, semgrep_results, files_to_analyze
+            )
+        else:
+            apply_codemods_by_codemod(
+                context, codemods_to_run, semgrep_results, files_to_analyze
+            )
 
+
+def apply_codemods_by_codemod(
+    context: CodemodExecutionContext,
+    codemods_to_run: Sequence[BaseCodemod],
+    semgrep_results: ResultSet,
+    files_to_analyze: list[Path],
+):
     # run codemods one at a time making sure to respect the given sequence
     for codemod in codemods_to_run:
         # NOTE: this may be used as a progress indicator by upstream tools
         logger.info("running codemod %s", codemod.id)
 
-        if isinstance(codemod.detector, SemgrepRuleDetector):
-            # Unfortunately the IDs from semgrep are not fully specified
-            # TODO: eventually we need to be able to use fully specified IDs here
-            if codemod.name not in semgrep_finding_ids:
-                logger.debug(
-                    "no results from semgrep for %s, skipping analysis",
-                    codemod.id,
-                )
-                continue
-
-            files_to_analyze = semgrep_results.files_for_rule(codemod.name)
-
-        # Non-semgrep codemods ignore the semgrep results
-        codemod.apply(context, files_to_analyze)
-        record_dependency_update(context.process_dependencies(codemod.id))
-        context.log_changes(codemod.id)
+        if (
+            codemod_files := files_for_codemod(
+                codemod, semgrep_results, files_to_analyze
+            )
+        ) is not None:
+            codemod.apply(context, codemod_files)
+            record_dependency_update(context.process_dependencies(codemod.id))
+            context.log_changes(codemod.id)
+        context.report_results(codemod)
 
 
 def record_dependency_update(dependency_results: dict[Dependency, PackageStore | None]):
@@ -158,14 +315,15 @@ def run(original_args) -> int:
     logger.info("command: %s %s", Path(sys.argv[0]).name, " ".join(original_args))
 
     # TODO: this should be dict[str, list[Path]]
-    tool_result_files_map: DefaultDict[str, list[str]] = detect_sarif_tools(
-        [Path(name) for name in argv.sarif or []]
-    )
+    sarif_registry = SarifRegistry.load([Path(name) for name in argv.sarif or []])
+    tool_result_files_map: DefaultDict[str, list[str]] = sarif_registry.files_by_tool()
     tool_result_files_map["sonar"].extend(argv.sonar_issues_json or [])
     tool_result_files_map["sonar"].extend(argv.sonar_hotspots_json or [])
     tool_result_files_map["defectdojo"] = argv.defectdojo_findings_json or []
 
-    repo_manager = PythonRepoManager(Path(argv.directory))
+    # The directory is walked once and shared by project analysis and file discovery
+    inventory = RepositoryInventory(Path(argv.directory), argv.path_exclude)
+    repo_manager = PythonRepoManager(Path(argv.directory), inventory)
     context = CodemodExecutionContext(
         Path(argv.directory),
         argv.dry_run,
@@ -176,7 +334,13 @@ def run(original_args) -> int:
         argv.path_exclude,
         tool_result_files_map,
         argv.max_workers,
+        argv.schedule,
+        argv.executor,
+        Path(argv.cache_dir) if argv.cache_dir else None,
+        bool(argv.incremental),
+        inventory,
     )
+    context.sarif_registry = sarif_registry
 
     repo_manager.parse_project()
 
@@ -194,10 +358,23 @@ def run(original_args) -> int:
     log_list(logging.INFO, "including paths", included_paths)
     log_list(logging.INFO, "excluding paths", argv.path_exclude)
 
+    candidates: list[Path] | None = None
+    if argv.changed_since:
+        try:
+            candidates = changed_files(context.directory, argv.changed_since)
+        except git.GitError as err:
+            logger.error(
+                "unable to find files changed since '%s': %s", argv.changed_since, err
+            )
+            return 1
+        log_list(logging.DEBUG, "changed files", candidates)
+
     files_to_analyze: list[Path] = match_files(
         context.directory,
         argv.path_exclude,
         included_paths,
+        candidates,
+        inventory,
     )
 
     full_names = [str(path) for path in files_to_analyze]
@@ -208,25 +385,37 @@ def run(original_args) -> int:
         codemods_to_run,
         files_to_analyze,
     )
+    # Semgrep-based detectors reuse these results instead of running semgrep again
+    context.semgrep_results = semgrep_results
+    if argv.output:
+        context.report = (
+            PatchWriter(argv.output)
+            if argv.output_format == "diff"
+            else CodeTFWriter(argv.output)
+        )
 
-    apply_codemods(
-        context,
-        codemods_to_run,
-        semgrep_results,
-        files_to_analyze,
-    )
+    try:
+        apply_codemods(
+            context,
+            codemods_to_run,
+            semgrep_results,
+            files_to_analyze,
+        )
+    except BaseException:
+        if context.report is not None:
+            context.report.discard()
+        raise
+    finally:
+        context.close()
 
     elapsed = datetime.datetime.now() - start
     elapsed_ms = int(elapsed.total_seconds() * 1000)
 
-    if argv.output:
-        codetf = CodeTF.build(
-            context,
-            elapsed_ms,
-            original_args,
-            context.compile_results(codemods_to_run),
-        )
-        codetf.write_report(argv.output)
+    if context.report is not None:
+        # Codemods that were never run still have results
+        for codemod in codemods_to_run:
+            context.report_results(codemod)
+        context.report.close(Run.build(context, elapsed_ms, original_args))
 
     log_report(
         context, argv, elapsed_ms, [] if not codemods_to_run else files_to_analyze
@@ -26,10 +26,14 @@ class SimpleCodemod(LibcstResultTransformer, metaclass=ABCMeta):
     Child classes must implement the following attributes:
     - metadata: Metadata
     - codemod_base: type[BaseCodemod]
+
+    Child classes may also define `trigger_tokens`, strings of which at least
+    one must appear in a file for the codemod to apply to it.
     """
 
     metadata: Metadata
     detector_pattern: str
+    trigger_tokens: tuple[str, ...] = ()
     on_result_found: Callable[[cst.CSTNode, cst.CSTNode], cst.CSTNode]
 
     codemod_base: type[BaseCodemod]
@@ -53,4 +57,5 @@ class SimpleCodemod(LibcstResultTransformer, metaclass=ABCMeta):
             ),
             # This allows the transformer to inherit all the methods of the class itself
             transformer=LibcstTransformerPipeline(cls),
+            trigger_tokens=cls.trigger_tokens,
         )
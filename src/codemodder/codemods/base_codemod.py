@@ -9,15 +9,19 @@ from enum import Enum
 from functools import cached_property
 from importlib.abc import Traversable
 from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, Sequence
 
-from codemodder.code_directory import file_line_patterns
 from codemodder.codemods.base_detector import BaseDetector
 from codemodder.codemods.base_transformer import BaseTransformerPipeline
 from codemodder.codetf import DetectionTool, Reference
 from codemodder.context import CodemodExecutionContext
+from codemodder.executors import WorkUnit, process_work_units, use_process_pool
 from codemodder.file_context import FileContext
 from codemodder.logging import logger
-from codemodder.result import ResultSet
+from codemodder.result import Result, ResultSet
+
+if TYPE_CHECKING:
+    from codemodder.codemods.fusion import FusedTraversal
 
 
 class ReviewGuidance(Enum):
@@ -78,6 +82,7 @@ class BaseCodemod(metaclass=ABCMeta):
     detector: BaseDetector | None
     transformer: BaseTransformerPipeline
     default_extensions: list[str] | None
+    trigger_tokens: tuple[str, ...]
 
     def __init__(
         self,
@@ -86,12 +91,17 @@ class BaseCodemod(metaclass=ABCMeta):
         detector: BaseDetector | None = None,
         transformer: BaseTransformerPipeline,
         default_extensions: list[str] | None = None,
+        trigger_tokens: Sequence[str] | None = None,
     ):
+        """
+        :param trigger_tokens: Strings of which at least one must appear in the source of a file for the codemod to apply to it
+        """
         # Metadata should only be accessed via properties
         self._metadata = metadata
         self.detector = detector
         self.transformer = transformer
         self.default_extensions = default_extensions or [".py"]
+        self.trigger_tokens = tuple(trigger_tokens or ())
 
     @property
     @abstractmethod
@@ -153,24 +163,25 @@ class BaseCodemod(metaclass=ABCMeta):
             "references": [ref.model_dump() for ref in self.references],
         }
 
-    def _apply(
+    @property
+    def rules(self) -> list[str]:
+        """The rule IDs used to look up detector results for this codemod"""
+        return [self.name]
+
+    def get_results(
         self,
         context: CodemodExecutionContext,
         files_to_analyze: list[Path],
-        rules: list[str],
-    ) -> None:
-        results = (
+    ) -> ResultSet | None:
+        return (
             # It seems like semgrep doesn't like our fully-specified id format
             self.detector.apply(self.name, context, files_to_analyze)
             if self.detector
             else None
         )
 
-        if results is not None and not results:
-            logger.debug("No results for %s", self.id)
-            return
-
-        files_to_analyze = (
+    def filter_by_extension(self, files_to_analyze: list[Path]) -> list[Path]:
+        return (
             [
                 path
                 for path in files_to_analyze
@@ -180,11 +191,59 @@ class BaseCodemod(metaclass=ABCMeta):
             else files_to_analyze
         )
 
+    def filter_by_results(
+        self,
+        context: CodemodExecutionContext,
+        files_to_analyze: list[Path],
+        results: ResultSet | None,
+        rules: list[str],
+    ) -> list[Path]:
+        """
+        Restrict the files to those with detector results, if the codemod has a detector
+        """
+        if results is None:
+            return files_to_analyze
+
+        files_with_results = results.files_for_rules(context, rules)
+        return [path for path in files_to_analyze if path in files_with_results]
+
+    def _apply(
+        self,
+        context: CodemodExecutionContext,
+        files_to_analyze: list[Path],
+        rules: list[str],
+    ) -> None:
+        results = self.get_results(context, files_to_analyze)
+
+        if results is not None and not results:
+            logger.debug("No results for %s", self.id)
+            return
+
+        files_to_analyze = self.filter_by_results(
+            context, self.filter_by_extension(files_to_analyze), results, rules
+        )
+
+        if use_process_pool(context, [self]):
+            logger.debug("using process pool with %s workers", context.max_workers)
+            units = [
+                WorkUnit(
+                    path,
+                    ((self.id, self._get_findings(path, context, results, rules)),),
+                )
+                for path in files_to_analyze
+            ]
+            contexts: Iterator[FileContext] = (
+                file_contexts[self.id]
+                for file_contexts, _ in process_work_units(context, units)
+            )
+            context.process_results(self.id, contexts)
+            return
+
         process_file = functools.partial(
             self._process_file, context=context, results=results, rules=rules
         )
 
-        with ThreadPoolExecutor() as executor:
+        with ThreadPoolExecutor(max_workers=context.max_workers) as executor:
             logger.debug("using executor with %s workers", context.max_workers)
             contexts = executor.map(process_file, files_to_analyze)
             executor.shutdown(wait=True)
@@ -209,10 +268,33 @@ class BaseCodemod(metaclass=ABCMeta):
 
         Per-file processing can be parallelized based on the `max_workers` setting.
 
+        Changed files are written once the codemod has been applied, unless the
+        codemod is applied within `context.batch_writes()`.
+
         :param context: The codemod execution context
         :param files_to_analyze: The list of files to analyze
         """
-        self._apply(context, files_to_analyze, [self.name])
+        self._apply(context, files_to_analyze, self.rules)
+        if not context.batching_writes:
+            context.flush_staged()
+
+    def _get_findings(
+        self,
+        filename: Path,
+        context: CodemodExecutionContext,
+        results: ResultSet | None,
+        rules: list[str],
+    ) -> list[Result] | None:
+        if results is None:
+            return None
+
+        findings_for_rule = []
+        for rule in rules:
+            findings_for_rule.extend(
+                results.results_for_rule_and_file(context, rule, filename)
+            )
+        logger.debug("%d findings for %s", len(findings_for_rule), filename)
+        return findings_for_rule
 
     def _process_file(
         self,
@@ -221,16 +303,26 @@ class BaseCodemod(metaclass=ABCMeta):
         results: ResultSet | None,
         rules: list[str],
     ):
-        line_exclude = file_line_patterns(filename, context.path_exclude)
-        line_include = file_line_patterns(filename, context.path_include)
-        findings_for_rule = None
-        if results is not None:
-            findings_for_rule = []
-            for rule in rules:
-                findings_for_rule.extend(
-                    results.results_for_rule_and_file(context, rule, filename)
-                )
-            logger.debug("%d findings for %s", len(findings_for_rule), filename)
+        return self.process_file_findings(
+            filename, context, self._get_findings(filename, context, results, rules)
+        )
+
+    def process_file_findings(
+        self,
+        filename: Path,
+        context: CodemodExecutionContext,
+        findings_for_rule: list[Result] | None,
+        fusion: FusedTraversal | None = None,
+    ) -> FileContext:
+        """
+        Apply the transformer pipeline to a single file given its findings (if any)
+
+        :param filename: The file to transform
+        :param context: The codemod execution context
+        :param findings_for_rule: The detector findings for this file, or `None` if the codemod has no detector
+        :param fusion: Fused traversal used to skip codemods that do not apply to the file
+        """
+        line_include, line_exclude = context.line_matcher.lines(filename)
 
         file_context = FileContext(
             context.directory,
@@ -238,12 +330,40 @@ class BaseCodemod(metaclass=ABCMeta):
             line_exclude,
             line_include,
             findings_for_rule,
+            inventory=context.inventory,
         )
-        if results is not None and not findings_for_rule:
+        if findings_for_rule is not None and not findings_for_rule:
             logger.debug("no findings for %s, short-circuiting analysis", filename)
             return file_context
 
-        # TODO: for SAST tools we should preemtively filter out files that are not part of the result set
+        source = None
+        if self.trigger_tokens or context.incremental_index is not None:
+            try:
+                source = context.module_cache.get_source(filename)
+            except (OSError, UnicodeDecodeError):
+                # Let the pipeline report the failure
+                pass
+
+        if (
+            source is not None
+            and self.trigger_tokens
+            and not any(token in source for token in self.trigger_tokens)
+        ):
+            logger.debug("no trigger tokens in %s, skipping", filename)
+            return file_context
+
+        if source is not None and (index := context.incremental_index) is not None:
+            # The key is recorded on a hit too, so that it is kept in the index
+            file_context.incremental_key = index.key(
+                self.id, source, findings_for_rule, line_include, line_exclude
+            )
+            if file_context.incremental_key in index:
+                logger.debug("no changes for %s in previous run, skipping", filename)
+                return file_context
+
+        if fusion is not None and not fusion.may_change(self):
+            logger.debug("%s does not apply to %s, skipping", self.id, filename)
+            return file_context
 
         if change_set := self.transformer.apply(
             context, file_context, findings_for_rule
@@ -15,7 +15,7 @@ class BaseTransformerPipeline(metaclass=ABCMeta):
 
     The transformers in a given pipeline can either be homogeneous or heterogeneous in terms of inputs and output formats accepted by each transformer. For a heterogeneous pipeline it may be necessary to implement adapter classes to convert between formats.
 
-    Each transformer pipeline is responsible for writing results to the output files if `dry_run` is `False`.
+    Each transformer pipeline is responsible for staging its results in the context's module cache, from which they are written to the output files at the end of the run if `dry_run` is `False`.
 
     **NOTE**: In general, pipelines that rely on detectors will need to account for the fact that the detected results become "stale" after the application of the first transformer in the pipeline. This is not an issue for transformers that do their own detection or which are capable of adjusting the location of results
     """
@@ -41,5 +41,5 @@ class BaseTransformerPipeline(metaclass=ABCMeta):
 
         :return: The `ChangeSet` to apply to the file, or `None` if no changes are applied
 
-        This method is responsible for writing the results to the output files if `dry_run` is False.
+        This method is responsible for staging the results to be written to the output files.
         """
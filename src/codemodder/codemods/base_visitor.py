@@ -1,4 +1,3 @@
-from functools import cache
 from typing import ClassVar, Collection, cast
 
 import libcst as cst
@@ -7,7 +6,7 @@ from libcst._position import CodePosition, CodeRange
 from libcst.codemod import ContextAwareVisitor, VisitorBasedCodemodCommand
 from libcst.metadata import PositionProvider, ProviderT
 
-from codemodder.result import Result
+from codemodder.result import Result, ResultIndex
 
 
 # TODO: this should just be part of BaseTransformer and BaseVisitor?
@@ -17,29 +16,44 @@ class UtilsMixin(MetadataDependent):
     def __init__(
         self,
         results: list[Result] | None,
-        line_exclude: list[int],
-        line_include: list[int],
+        line_exclude: Collection[int],
+        line_include: Collection[int],
     ):
         self.results = results
         self.line_exclude = line_exclude
         self.line_include = line_include
+        self._result_index: ResultIndex | None = None
+        # Matches are stored on the instance so that they are released along with it
+        self._results_for_node: dict[cst.CSTNode, list[Result]] = {}
 
     def filter_by_result(self, node: cst.CSTNode) -> bool:
         # Codemods with detectors will only run their transformations if there are results.
         return self.results is None or any(self.results_for_node(node))
 
-    @cache
+    @property
+    def result_index(self) -> ResultIndex:
+        index = self._result_index
+        if index is None or index.results is not self.results:
+            index = self._result_index = ResultIndex(self.results or [])
+        return index
+
     def results_for_node(self, node: cst.CSTNode) -> list[Result]:
+        if not self.results:
+            return []
+
+        matches = self._results_for_node
+        if (results := matches.get(node)) is not None:
+            return results
+
         pos_to_match = self.node_position(node)
-        return (
-            [
-                result
-                for result in self.results
-                if result.match_location(pos_to_match, node)
-            ]
-            if self.results
-            else []
-        )
+        results = matches[node] = [
+            result
+            for result in self.result_index.overlapping(
+                pos_to_match.start.line, pos_to_match.end.line
+            )
+            if result.match_location(pos_to_match, node)
+        ]
+        return results
 
     def filter_by_path_includes_or_excludes(self, pos_to_match):
         """
@@ -47,9 +61,9 @@ class UtilsMixin(MetadataDependent):
         """
         # excludes takes precedence if defined
         if self.line_exclude:
-            return not any(match_line(pos_to_match, line) for line in self.line_exclude)
+            return not match_lines(pos_to_match, self.line_exclude)
         if self.line_include:
-            return any(match_line(pos_to_match, line) for line in self.line_include)
+            return match_lines(pos_to_match, self.line_include)
         return True
 
     def node_is_selected(self, node) -> bool:
@@ -95,8 +109,8 @@ class BaseTransformer(VisitorBasedCodemodCommand, UtilsMixin):
         self,
         context,
         results: list[Result] | None,
-        line_include: list[int],
-        line_exclude: list[int],
+        line_include: Collection[int],
+        line_exclude: Collection[int],
     ):
         VisitorBasedCodemodCommand.__init__(self, context)
         UtilsMixin.__init__(self, results, line_exclude, line_include)
@@ -107,12 +121,15 @@ class BaseVisitor(ContextAwareVisitor, UtilsMixin):
         self,
         context,
         results: list[Result] | None,
-        line_include: list[int],
-        line_exclude: list[int],
+        line_include: Collection[int],
+        line_exclude: Collection[int],
     ):
         ContextAwareVisitor.__init__(self, context)
         UtilsMixin.__init__(self, results, line_exclude, line_include)
 
 
-def match_line(pos, line):
-    return pos.start.line == line and pos.end.line == line
+def match_lines(pos, lines: Collection[int]) -> bool:
+    """
+    Returns True if the position spans a single line that is one of the given lines.
+    """
+    return pos.start.line == pos.end.line and pos.start.line in lines
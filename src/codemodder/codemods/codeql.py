@@ -16,6 +16,10 @@ class CodeQLSarifFileDetector(BaseDetector):
     ) -> ResultSet:
         del codemod_id
         del files_to_analyze
+        if context.sarif_registry is not None:
+            return context.sarif_registry.result_set(
+                "codeql", CodeQLResultSet.from_results
+            )
         return process_codeql_findings(
             tuple(context.tool_result_files_map.get("codeql", ()))
         )  # Convert list to tuple for cache hashability
@@ -0,0 +1,339 @@
+"""
+Support for detecting which codemods apply to a file in a single traversal.
+
+Most codemods are a single `LibcstResultTransformer` and most of them make no
+changes to any given file. Rather than walk the tree (and compute metadata)
+once per codemod just to find that out, compatible codemods are fused into a
+single read-only traversal that dispatches each node to the hooks of every
+member by node type. Only the members that could change the file are then
+applied individually, which keeps each `Change` attributed to its codemod.
+
+The fused traversal is only valid for the tree it was run on, so it must be
+invalidated whenever a codemod changes the file.
+"""
+
+from __future__ import annotations
+
+import functools
+from contextlib import ExitStack
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Sequence
+
+import libcst as cst
+from libcst.codemod import CodemodContext
+
+from codemodder.codemods.libcst_transformer import (
+    LibcstResultTransformer,
+    LibcstTransformerPipeline,
+)
+from codemodder.codemods.semgrep import SemgrepRuleDetector
+from codemodder.context import CodemodExecutionContext
+from codemodder.file_context import FileContext
+from codemodder.logging import logger
+from codemodder.result import Result
+from codemodder.utils.timer import Timer
+
+if TYPE_CHECKING:
+    from codemodder.codemods.base_codemod import BaseCodemod
+
+# Overriding any of these changes how a transformer traverses the tree
+TRAVERSAL_METHODS = (
+    "transform_module",
+    "transform_module_impl",
+    "should_allow_multiple_passes",
+    "on_visit",
+    "on_leave",
+    "on_visit_attribute",
+    "on_leave_attribute",
+    # Changes made here are not seen by a read-only traversal
+    "leave_Module",
+)
+
+
+def _defining_class(cls: type, name: str) -> type | None:
+    return next((klass for klass in cls.__mro__ if name in klass.__dict__), None)
+
+
+def _is_libcst_default(cls: type, name: str) -> bool:
+    klass = _defining_class(cls, name)
+    return klass is None or klass.__module__.startswith("libcst.")
+
+
+@functools.cache
+def fusable_hooks(
+    transformer: type[LibcstResultTransformer],
+) -> tuple[dict[str, str], dict[str, str]] | None:
+    """
+    Return the visit and leave hooks implemented by the transformer, keyed by node type
+
+    Returns `None` if the transformer cannot be fused.
+    """
+    if not transformer.fusable:
+        return None
+    if _defining_class(transformer, "transform") is not LibcstResultTransformer:
+        return None
+    if not all(
+        _is_libcst_default(transformer, name)
+        # Skipping subtrees without results does not change the outcome
+        or _defining_class(transformer, name) is LibcstResultTransformer
+        for name in TRAVERSAL_METHODS
+    ):
+        return None
+
+    visit: dict[str, str] = {}
+    leave: dict[str, str] = {}
+    for name in dir(transformer):
+        prefix, _, node_type = name.partition("_")
+        if prefix not in ("visit", "leave") or _is_libcst_default(transformer, name):
+            continue
+        if not isinstance(getattr(cst, node_type, None), type):
+            # Attribute hooks such as `visit_Call_func` are not supported
+            return None
+        (visit if prefix == "visit" else leave)[node_type] = name
+
+    return visit, leave
+
+
+def is_fusable(codemod: BaseCodemod) -> bool:
+    pipeline = codemod.transformer
+    return (
+        isinstance(pipeline, LibcstTransformerPipeline)
+        and type(pipeline).apply is LibcstTransformerPipeline.apply
+        and len(pipeline.transformers) == 1
+        and issubclass(pipeline.transformers[0], LibcstResultTransformer)
+        and fusable_hooks(pipeline.transformers[0]) is not None
+    )
+
+
+class FusedVisitor(cst.CSTVisitor):
+    """
+    Read-only visitor that dispatches each node to the hooks of several transformers
+
+    Each member sees the original node as both the original and updated node.
+    A member that returns anything else from a leave hook would change the
+    tree, so it is marked as affected and takes no further part in the
+    traversal. A member whose visit hook returns `False`
+    is suspended until the traversal leaves that node, as it would be if it
+    were walking the tree on its own.
+    """
+
+    def __init__(self, members: Sequence[LibcstResultTransformer]):
+        super().__init__()
+        self.members = members
+        self.affected: set[int] = set()
+        self._suspended: dict[int, cst.CSTNode] = {}
+        self._visit: dict[str, list[tuple[int, Callable]]] = {}
+        self._leave: dict[str, list[tuple[int, Callable]]] = {}
+        for idx, member in enumerate(members):
+            hooks = fusable_hooks(type(member))
+            assert hooks is not None
+            visit, leave = hooks
+            for node_type, name in visit.items():
+                self._visit.setdefault(node_type, []).append(
+                    (idx, getattr(member, name))
+                )
+            for node_type, name in leave.items():
+                self._leave.setdefault(node_type, []).append(
+                    (idx, getattr(member, name))
+                )
+
+    def _is_active(self, idx: int, node: cst.CSTNode) -> bool:
+        if idx in self.affected:
+            return False
+        suspended_at = self._suspended.get(idx)
+        return suspended_at is None or suspended_at is node
+
+    def on_visit(self, node: cst.CSTNode) -> bool:
+        for idx, hook in self._visit.get(type(node).__name__, ()):
+            if idx in self._suspended or idx in self.affected:
+                continue
+            if hook(node) is False:
+                self._suspended[idx] = node
+
+        return len(self.affected) + len(self._suspended) < len(self.members)
+
+    def on_leave(self, original_node: cst.CSTNode) -> None:
+        for idx, hook in self._leave.get(type(original_node).__name__, ()):
+            if not self._is_active(idx, original_node):
+                continue
+            if hook(original_node, original_node) is not original_node:
+                self.affected.add(idx)
+
+        for idx, suspended_at in list(self._suspended.items()):
+            if suspended_at is original_node:
+                del self._suspended[idx]
+
+
+class FusedTraversal:
+    """
+    Determine which of the codemods to be applied to a file could change it
+
+    Verdicts are computed lazily for the current contents of the file, in a
+    single traversal for the codemod being applied and all fusable codemods
+    that follow it.
+    """
+
+    def __init__(
+        self,
+        context: CodemodExecutionContext,
+        file_path: Path,
+        codemods: Sequence[tuple[BaseCodemod, list[Result] | None]],
+    ):
+        self.context = context
+        self.file_path = file_path
+        self.timer = Timer()
+        self.members = [
+            (codemod, findings)
+            for codemod, findings in codemods
+            if (findings is None or findings) and is_fusable(codemod)
+        ]
+        self._verdicts: dict[str, bool] = {}
+
+    def invalidate(self):
+        """Discard verdicts once the file has been changed"""
+        self._verdicts.clear()
+
+    def update_findings(self, codemod: BaseCodemod, findings: list[Result] | None):
+        """Replace the findings of a codemod, e.g. once the file has been rescanned"""
+        self.members = [
+            (member, findings if member.id == codemod.id else member_findings)
+            for member, member_findings in self.members
+            if member.id != codemod.id or findings is None or findings
+        ]
+        # Any verdict was reached with the old findings
+        self._verdicts.pop(codemod.id, None)
+
+    def may_change(self, codemod: BaseCodemod) -> bool:
+        if codemod.id not in self._verdicts:
+            pending = next(
+                (
+                    self.members[idx:]
+                    for idx, (member, _) in enumerate(self.members)
+                    if member.id == codemod.id
+                ),
+                [],
+            )
+            # Fusing a single codemod would only add a traversal
+            if len(pending) < 2:
+                return True
+            self._verdicts.update(self._traverse(pending))
+
+        return self._verdicts.get(codemod.id, True)
+
+    def _traverse(
+        self, pending: Sequence[tuple[BaseCodemod, list[Result] | None]]
+    ) -> dict[str, bool]:
+        try:
+            with self.timer.measure("parse"):
+                module = self.context.module_cache.get_module(self.file_path)
+        except (cst.ParserSyntaxError, OSError, UnicodeDecodeError):
+            # Let each codemod report the failure
+            return {codemod.id: True for codemod, _ in pending}
+
+        line_include, line_exclude = self.context.line_matcher.lines(self.file_path)
+        wrapper = self.context.module_cache.get_metadata_wrapper(self.file_path, module)
+
+        members: list[tuple[str, LibcstResultTransformer]] = []
+        verdicts: dict[str, bool] = {}
+        with ExitStack() as stack:
+            for codemod, findings in pending:
+                pipeline = codemod.transformer
+                assert isinstance(pipeline, LibcstTransformerPipeline)
+                transformer = pipeline.transformers[0]
+                file_context = FileContext(
+                    self.context.directory,
+                    self.file_path,
+                    line_exclude,
+                    line_include,
+                    findings,
+                    inventory=self.context.inventory,
+                )
+                member = transformer(
+                    CodemodContext(wrapper=wrapper),
+                    findings,
+                    file_context,
+                    _transformer=True,
+                )
+                if (
+                    member._matchers
+                    or member._extra_visit_funcs
+                    or member._extra_leave_funcs
+                ):
+                    # Matcher decorators need their own traversal
+                    verdicts[codemod.id] = True
+                    continue
+                try:
+                    stack.enter_context(member.resolve(wrapper))
+                except (cst.MetadataException, KeyError):
+                    # Let the codemod report the failure
+                    verdicts[codemod.id] = True
+                    continue
+                members.append((codemod.id, member))
+
+            visitor = FusedVisitor([member for _, member in members])
+            try:
+                with self.timer.measure("transform"):
+                    wrapper.module.visit(visitor)
+            except Exception:
+                # A hook that fails would fail the codemod on its own too, so
+                # each codemod is applied individually and reports the error
+                logger.debug(
+                    "fused traversal of %s failed", self.file_path, exc_info=True
+                )
+                return {codemod.id: True for codemod, _ in pending}
+
+        for idx, (codemod_id, member) in enumerate(members):
+            file_context = member.file_context
+            verdicts[codemod_id] = (
+                idx in visitor.affected
+                or bool(file_context.codemod_changes)
+                or bool(file_context.unfixed_findings)
+                or bool(file_context.dependencies)
+            )
+
+        logger.debug(
+            "fused %d codemods for %s, %d may apply",
+            len(members),
+            self.file_path,
+            sum(verdicts.values()),
+        )
+        return verdicts
+
+
+def apply_codemods_to_findings(
+    file_path: Path,
+    context: CodemodExecutionContext,
+    codemods: Sequence[tuple[BaseCodemod, list[Result] | None]],
+) -> tuple[dict[str, FileContext], Timer]:
+    """
+    Apply the ordered codemods, with their findings, to a single file
+
+    Codemods that are found not to apply to the file by a fused traversal are
+    skipped. The findings of semgrep codemods are found again once an earlier
+    codemod has changed the file. The result is left staged, to be written
+    with the rest of the run, and the trees and metadata for the file are
+    released.
+    """
+    fusion = FusedTraversal(context, file_path, codemods)
+    file_contexts: dict[str, FileContext] = {}
+    changed = False
+    for codemod, findings in codemods:
+        if changed and isinstance(codemod.detector, SemgrepRuleDetector):
+            findings = codemod._get_findings(
+                file_path,
+                context,
+                codemod.get_results(context, [file_path]),
+                codemod.rules,
+            )
+            fusion.update_findings(codemod, findings)
+        file_context = codemod.process_file_findings(
+            file_path, context, findings, fusion
+        )
+        if file_context.changesets:
+            fusion.invalidate()
+            changed = True
+        file_contexts[codemod.id] = file_context
+
+    # No other codemods will be applied to the file
+    context.module_cache.release(file_path)
+    return file_contexts, fusion.timer
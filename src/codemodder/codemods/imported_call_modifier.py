@@ -34,12 +34,12 @@ class ImportedCallModifier(
         results: list[Result] | None = None,
     ):
         VisitorBasedCodemodCommand.__init__(self, codemod_context)
-        self.line_exclude = file_context.line_exclude
-        self.line_include = file_context.line_include
+        UtilsMixin.__init__(
+            self, results, file_context.line_exclude, file_context.line_include
+        )
         self.matching_functions: FunctionMatchType = matching_functions
         self.change_description = change_description
         self.changes_in_file: list[Change] = []
-        self.results = results
         self.file_context = file_context
 
     def updated_args(self, original_args: Sequence[cst.Arg]):
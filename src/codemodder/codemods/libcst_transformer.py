@@ -1,18 +1,28 @@
+import functools
 from collections import namedtuple
+from contextlib import contextmanager
+from typing import ClassVar, Generator
 
 import libcst as cst
 from libcst import matchers
 from libcst._position import CodeRange
 from libcst.codemod import CodemodContext
 from libcst.codemod.visitors import AddImportsVisitor, RemoveImportsVisitor
+from libcst.matchers._decorators import (
+    CONSTRUCTED_LEAVE_MATCHER_ATTR,
+    CONSTRUCTED_VISIT_MATCHER_ATTR,
+    VISIT_NEGATIVE_MATCHER_ATTR,
+    VISIT_POSITIVE_MATCHER_ATTR,
+)
+from libcst.metadata import PositionProvider
 
 from codemodder.codemods.base_transformer import BaseTransformerPipeline
-from codemodder.codemods.base_visitor import BaseTransformer
+from codemodder.codemods.base_visitor import BaseTransformer, UtilsMixin
 from codemodder.codemods.utils import get_call_name
 from codemodder.codetf import Change, ChangeSet
 from codemodder.context import CodemodExecutionContext
 from codemodder.dependency import Dependency
-from codemodder.diff import create_diff_from_tree
+from codemodder.diff import create_diff_from_code
 from codemodder.file_context import FileContext
 from codemodder.logging import logger
 from codemodder.result import Result
@@ -20,14 +30,6 @@ from codemodder.result import Result
 NewArg = namedtuple("NewArg", ["name", "value", "add_if_missing"])
 
 
-def update_code(file_path, new_code):
-    """
-    Write the `new_code` to the `file_path`
-    """
-    with open(file_path, "w", encoding="utf-8") as f:
-        f.write(new_code)
-
-
 class LibcstResultTransformer(BaseTransformer):
     """
     Transformer class that performs libcst-based transformations on a given file
@@ -38,6 +40,17 @@ class LibcstResultTransformer(BaseTransformer):
     """
 
     change_description: str = ""
+    # Only visit the subtrees that overlap the lines of a result, when there
+    # are results. This is safe for transformers whose hooks only act on nodes
+    # that match a result, and is always done for transformers that only
+    # implement `on_result_found`.
+    skip_unmatched_subtrees: ClassVar[bool] = False
+    # Whether the transformer may share a read-only traversal with others to
+    # find out whether it applies to a file. Transformers that can change a
+    # file without replacing a node or reporting a change, such as by only
+    # adding or removing an import, must opt out, since the change would
+    # not be seen. See `codemodder.codemods.fusion`.
+    fusable: ClassVar[bool] = True
 
     def __init__(
         self,
@@ -55,12 +68,34 @@ class LibcstResultTransformer(BaseTransformer):
             line_include=file_context.line_include,
             line_exclude=file_context.line_exclude,
         )
+        self._result_guided = results is not None and self.is_result_guided()
+
+    @classmethod
+    @functools.cache
+    def is_result_guided(cls) -> bool:
+        """
+        Determine whether subtrees that do not overlap a result can be skipped
+        """
+        return cls.skip_unmatched_subtrees or _only_handles_results(cls)
 
     @classmethod
     def transform(
-        cls, module: cst.Module, results: list[Result] | None, file_context: FileContext
+        cls,
+        module: cst.Module,
+        results: list[Result] | None,
+        file_context: FileContext,
+        wrapper: cst.MetadataWrapper | None = None,
     ) -> cst.Module:
-        wrapper = cst.MetadataWrapper(module)
+        """
+        Apply the transformer to `module`
+
+        :param wrapper: A metadata wrapper for `module` whose computed metadata can be reused
+        """
+        if results is not None and not results and cls.is_result_guided():
+            # No node can match a result, so there is nothing to transform
+            return module
+
+        wrapper = wrapper if wrapper is not None else cst.MetadataWrapper(module)
         codemod = cls(
             CodemodContext(wrapper=wrapper),
             results,
@@ -68,7 +103,36 @@ class LibcstResultTransformer(BaseTransformer):
             _transformer=True,
         )
 
-        return codemod.transform_module(module)
+        return codemod.transform_module(wrapper.module)
+
+    @contextmanager
+    def _handle_metadata_reference(
+        self, module: cst.Module
+    ) -> Generator[cst.Module, None, None]:
+        # Resolve metadata with the wrapper we were given rather than a new copy
+        if (wrapper := self.context.wrapper) is None or wrapper.module is not module:
+            with super()._handle_metadata_reference(module) as tree:
+                yield tree
+            return
+
+        with self.resolve(wrapper):
+            yield wrapper.module
+
+    def on_visit(self, node: cst.CSTNode) -> bool:
+        if not super().on_visit(node):
+            return False
+        if not self._result_guided or isinstance(node, cst.Module):
+            return True
+        if (pos := self.get_metadata(PositionProvider, node, None)) is None:
+            return True
+        start = pos.start.line
+        # Functions and classes start at `def` or `class`, below their decorators
+        for decorator in getattr(node, "decorators", ()):
+            if (
+                decorator_pos := self.get_metadata(PositionProvider, decorator, None)
+            ) is not None:
+                start = min(start, decorator_pos.start.line)
+        return self.result_index.covers(start, pos.end.line)
 
     def _new_or_updated_node(self, original_node, updated_node):
         if self.node_is_selected(original_node):
@@ -261,8 +325,7 @@ class LibcstTransformerPipeline(BaseTransformerPipeline):
 
         try:
             with file_context.timer.measure("parse"):
-                with open(file_path, "r", encoding="utf-8") as f:
-                    source_tree = cst.parse_module(f.read())
+                source_tree = context.module_cache.get_module(file_path)
         except Exception:
             file_context.add_failure(file_path)
             logger.exception("error parsing file %s", file_path)
@@ -273,7 +336,13 @@ class LibcstTransformerPipeline(BaseTransformerPipeline):
         try:
             with file_context.timer.measure("transform"):
                 for transformer in self.transformers:
-                    tree = transformer.transform(tree, results, file_context)
+                    # Metadata can only be reused until a transformer returns a new tree
+                    wrapper = (
+                        context.module_cache.get_metadata_wrapper(file_path, tree)
+                        if tree is source_tree
+                        else None
+                    )
+                    tree = transformer.transform(tree, results, file_context, wrapper)
         except Exception:
             file_context.add_failure(file_path)
             logger.exception("error transforming file %s", file_path)
@@ -282,7 +351,10 @@ class LibcstTransformerPipeline(BaseTransformerPipeline):
         if not file_context.codemod_changes:
             return None
 
-        if not (diff := create_diff_from_tree(source_tree, tree)):
+        # The code for each tree is only generated once for the diff and the write
+        new_code = tree.code
+        source_code = context.module_cache.get_code(file_path, source_tree)
+        if not (diff := create_diff_from_code(source_code, new_code)):
             return None
 
         change_set = ChangeSet(
@@ -291,13 +363,62 @@ class LibcstTransformerPipeline(BaseTransformerPipeline):
             changes=file_context.codemod_changes,
         )
 
-        if not context.dry_run:
-            with file_context.timer.measure("write"):
-                update_code(file_context.file_path, tree.code)
+        # The file is written once all codemods have been applied to it
+        context.module_cache.stage(file_context.file_path, tree, new_code)
 
         return change_set
 
 
+# Hooks that are implemented by `LibcstResultTransformer` to find results
+_RESULT_HOOKS = ("leave_Call", "leave_Assign", "leave_ClassDef")
+# Overriding any of these changes which nodes are selected for `on_result_found`
+_SELECTION_METHODS = (
+    "filter_by_result",
+    "results_for_node",
+    "node_is_selected",
+    "_new_or_updated_node",
+)
+_MATCHER_ATTRS = (
+    VISIT_POSITIVE_MATCHER_ATTR,
+    VISIT_NEGATIVE_MATCHER_ATTR,
+    CONSTRUCTED_VISIT_MATCHER_ATTR,
+    CONSTRUCTED_LEAVE_MATCHER_ATTR,
+)
+# Overriding any of these changes how a transformer traverses the tree
+_TRAVERSAL_METHODS = (
+    "transform_module",
+    "transform_module_impl",
+    "on_visit",
+    "on_leave",
+    "on_visit_attribute",
+    "on_leave_attribute",
+)
+
+
+def _only_handles_results(cls: type[LibcstResultTransformer]) -> bool:
+    """
+    Determine whether the transformer only changes nodes through `on_result_found`
+    """
+    for name in dir(cls):
+        klass = next((klass for klass in cls.__mro__ if name in klass.__dict__), None)
+        if klass is None:
+            continue
+        if any(hasattr(klass.__dict__[name], attr) for attr in _MATCHER_ATTRS):
+            # Matcher decorators act on nodes regardless of results
+            return False
+        if name in _RESULT_HOOKS or name in _SELECTION_METHODS:
+            if klass not in (LibcstResultTransformer, UtilsMixin):
+                return False
+        elif name.startswith(("visit_", "leave_")) or name in _TRAVERSAL_METHODS:
+            if (
+                klass is not LibcstResultTransformer
+                and not klass.__module__.startswith("libcst.")
+            ):
+                return False
+
+    return True
+
+
 def _match_with_existing_arg(arg, args_info):
     """
     Given an `arg` and a list of arg info, determine if any of the names in arg_info match the arg.
@@ -3,14 +3,17 @@ import os
 import tempfile
 from functools import cache
 from pathlib import Path
+from typing import Iterable
 
 import yaml
 
 from codemodder.codemods.base_detector import BaseDetector
 from codemodder.context import CodemodExecutionContext
+from codemodder.logging import logger
 from codemodder.result import ResultSet
-from codemodder.semgrep import SemgrepResultSet
+from codemodder.semgrep import InternalSemgrepResultSet, SemgrepResultSet
 from codemodder.semgrep import run as semgrep_run
+from codemodder.semgrep import run_on_sources
 
 
 def _populate_yaml(rule: str, codemod_id: str) -> str:
@@ -46,9 +49,50 @@ class SemgrepRuleDetector(BaseDetector):
         context: CodemodExecutionContext,
         files_to_analyze: list[Path],
     ) -> ResultSet:
-        yaml_files = self.get_yaml_files(codemod_id)
-        with context.timer.measure("semgrep"):
-            return semgrep_run(context, yaml_files, files_to_analyze)
+        # Files changed by earlier codemods are only staged, so their current
+        # contents must be scanned instead of the files on disk
+        staged = {
+            path: source
+            for path in files_to_analyze
+            if (source := context.module_cache.get_staged_source(path)) is not None
+        }
+        unchanged = [path for path in files_to_analyze if path not in staged]
+
+        if context.semgrep_results is not None:
+            # Semgrep has already been run once with the rules for all codemods
+            if not staged:
+                return context.semgrep_results
+            results = _without_files(context.semgrep_results, staged)
+        elif unchanged or not staged:
+            with context.timer.measure("semgrep"):
+                results = semgrep_run(
+                    context, self.get_yaml_files(codemod_id), unchanged
+                )
+        else:
+            results = InternalSemgrepResultSet()
+
+        if staged:
+            logger.debug("rescanning %s files changed by earlier codemods", len(staged))
+            with context.timer.measure("semgrep"):
+                rescanned = run_on_sources(
+                    context, self.get_yaml_files(codemod_id), staged
+                )
+            for rule_id, files in rescanned.items():
+                results.setdefault(rule_id, {}).update(files)
+        return results
+
+
+def _without_files(results: ResultSet, files: Iterable[Path]) -> ResultSet:
+    """Copy of the results without those for the given files"""
+    excluded = {Path(os.path.normpath(file)) for file in files}
+    copy = InternalSemgrepResultSet()
+    for rule_id, results_by_file in results.items():
+        copy[rule_id] = {
+            path: file_results
+            for path, file_results in results_by_file.items()
+            if path not in excluded
+        }
+    return copy
 
 
 class SemgrepSarifFileDetector(BaseDetector):
@@ -60,6 +104,10 @@ class SemgrepSarifFileDetector(BaseDetector):
     ) -> ResultSet:
         del codemod_id
         del files_to_analyze
+        if context.sarif_registry is not None:
+            return context.sarif_registry.result_set(
+                "semgrep", SemgrepResultSet.from_results
+            )
         return process_semgrep_findings(
             tuple(context.tool_result_files_map.get("semgrep", ()))
         )  # Convert list to tuple for cache hashability
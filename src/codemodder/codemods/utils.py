@@ -7,6 +7,8 @@ from libcst import MetadataDependent, matchers
 from libcst.codemod import CodemodContext
 from libcst.matchers import MatcherDecoratableTransformer
 
+from codemodder.code_directory import RepositoryInventory
+
 
 class BaseType(Enum):
     """
@@ -153,10 +155,18 @@ class MetadataPreservingTransformer(
             self.metadata = {dep: wrapper._metadata[dep] for dep in dependencies}
 
 
-def is_django_settings_file(file_path: Path):
+def is_django_settings_file(
+    file_path: Path, inventory: RepositoryInventory | None = None
+):
     if "settings.py" not in file_path.name:
         return False
     # the most telling fact is the presence of a manage.py file in the parent directory
+    if (
+        inventory is not None
+        and (found := inventory.contains(file_path.parent.parent, "manage.py"))
+        is not None
+    ):
+        return found
     if file_path.parent.parent.is_dir():
         return "manage.py" in (f.name for f in file_path.parent.parent.iterdir())
     return False
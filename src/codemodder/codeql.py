@@ -1,10 +1,10 @@
-import json
 from pathlib import Path
+from typing import Iterable
 
 from typing_extensions import Self
 
 from codemodder.result import LineInfo, Location, Result, ResultSet
-from codemodder.sarifs import AbstractSarifToolDetector
+from codemodder.sarifs import AbstractSarifToolDetector, iter_sarif_results
 
 
 class CodeQLSarifToolDetector(AbstractSarifToolDetector):
@@ -58,16 +58,21 @@ class CodeQLResult(Result):
 class CodeQLResultSet(ResultSet):
     @classmethod
     def from_sarif(cls, sarif_file: str | Path, truncate_rule_id: bool = False) -> Self:
-        with open(sarif_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        return cls.from_results(iter_sarif_results(sarif_file), truncate_rule_id)
 
+    @classmethod
+    def from_results(
+        cls, results: Iterable[tuple[dict, dict]], truncate_rule_id: bool = False
+    ) -> Self:
+        """Build the result set from each SARIF result along with its run"""
         result_set = cls()
-        for sarif_run in data["runs"]:
-            rule_extensions = sarif_run["tool"]["extensions"]
+        for sarif_run, sarif_result in results:
             if CodeQLSarifToolDetector.detect(sarif_run):
-                for sarif_result in sarif_run["results"]:
-                    codeql_result = CodeQLResult.from_sarif(
-                        sarif_result, sarif_run, rule_extensions, truncate_rule_id
-                    )
-                    result_set.add_result(codeql_result)
+                codeql_result = CodeQLResult.from_sarif(
+                    sarif_result,
+                    sarif_run,
+                    sarif_run["tool"]["extensions"],
+                    truncate_rule_id,
+                )
+                result_set.add_result(codeql_result)
         return result_set
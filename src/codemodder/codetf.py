@@ -6,15 +6,17 @@ We need to keep this in sync with the CodeTF schema.
 
 from __future__ import annotations
 
+import contextlib
 import os
 import sys
 from enum import Enum
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Optional, TextIO
 
 from pydantic import BaseModel, model_validator
 
 from codemodder import __version__
 from codemodder.logging import logger
+from codemodder.utils.atomic_write import temp_file_beside
 
 if TYPE_CHECKING:
     from codemodder.context import CodemodExecutionContext
@@ -143,22 +145,16 @@ class Run(BaseModel):
     directory: str
     sarifs: list[Sarif] = []
 
-
-class CodeTF(BaseModel):
-    run: Run
-    results: list[Result]
-
     @classmethod
     def build(
         cls,
         context: CodemodExecutionContext,
         elapsed_ms,
         original_args,
-        results: list[Result],
     ):
         command_name = os.path.basename(sys.argv[0])
         command_args = " ".join(original_args)
-        run = Run(
+        return cls(
             vendor="pixee",
             tool="codemodder-python",
             version=__version__,
@@ -169,6 +165,21 @@ class CodeTF(BaseModel):
             # TODO: this should be populated from the context
             sarifs=[],
         )
+
+
+class CodeTF(BaseModel):
+    run: Run
+    results: list[Result]
+
+    @classmethod
+    def build(
+        cls,
+        context: CodemodExecutionContext,
+        elapsed_ms,
+        original_args,
+        results: list[Result],
+    ):
+        run = Run.build(context, elapsed_ms, original_args)
         return cls(run=run, results=results)
 
     def write_report(self, outfile):
@@ -181,3 +192,84 @@ class CodeTF(BaseModel):
             return 2
         logger.debug("wrote report to %s", outfile)
         return 0
+
+
+class CodeTFWriter:
+    """
+    Write a CodeTF report incrementally, as the results of each codemod become available
+
+    Each changeset is serialized and written on its own, so the report is never
+    held in memory as a whole. The run is written last, once the elapsed time is
+    known. Keys in a JSON object are unordered, so the report is equivalent to
+    one written by `CodeTF.write_report`.
+
+    The report is written to a temporary file that replaces `outfile` once it
+    is complete, so an incomplete report is never left in its place.
+    """
+
+    def __init__(self, outfile):
+        self.outfile = outfile
+        self._partial: str | None = None
+        self._file: TextIO | None = None
+        self._failed = False
+        self._has_results = False
+        # The temporary file is private to the run until it replaces the report
+        umask = os.umask(0)
+        os.umask(umask)
+        self._mode = 0o666 & ~umask
+
+    def _open(self) -> TextIO:
+        # Each run writes to its own temporary file, so concurrent runs do not clobber each other
+        fd, self._partial = temp_file_beside(self.outfile)
+        return os.fdopen(fd, "w", encoding="utf-8")
+
+    def _write(self, data: str):
+        if self._failed:
+            return
+        try:
+            if self._file is None:
+                self._file = self._open()
+                self._file.write('{"results":[')
+            self._file.write(data)
+        except Exception:
+            logger.exception("failed to write report file.")
+            self._failed = True
+
+    def add_result(self, result: Result):
+        """Append `result` to the report, writing its changesets one at a time"""
+        header = result.model_dump_json(exclude={"changeset"}, exclude_none=True)
+        self._write(("," if self._has_results else "") + header[:-1] + ',"changeset":[')
+        self._has_results = True
+        for idx, changeset in enumerate(result.changeset):
+            self._write(
+                ("," if idx else "") + changeset.model_dump_json(exclude_none=True)
+            )
+        self._write("]}")
+
+    def close(self, run: Run) -> int:
+        """Complete the report with the given run"""
+        self._write('],"run":' + run.model_dump_json(exclude_none=True) + "}")
+        if self._file is not None and self._partial is not None and not self._failed:
+            try:
+                self._file.close()
+                os.chmod(self._partial, self._mode)
+                os.replace(self._partial, self.outfile)
+            except Exception:
+                logger.exception("failed to write report file.")
+                self._failed = True
+        self.discard()
+        if self._failed:
+            # Any issues with writing the output file should exit status 2.
+            return 2
+        logger.debug("wrote report to %s", self.outfile)
+        return 0
+
+    def discard(self):
+        """Remove the incomplete report, if any"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._partial is not None:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(self._partial)
+            self._partial = None
@@ -1,13 +1,18 @@
 from __future__ import annotations
 
+import contextlib
 import itertools
 import logging
 import os
+import shutil
+from concurrent.futures import Executor
+from enum import Enum
 from pathlib import Path
 from textwrap import indent
 from typing import TYPE_CHECKING, Iterator, List
 
-from codemodder.codetf import ChangeSet
+from codemodder.code_directory import LineMatcher, RepositoryInventory
+from codemodder.codetf import ChangeSet, CodeTFWriter
 from codemodder.codetf import Result as CodeTFResult
 from codemodder.codetf import UnfixedFinding
 from codemodder.dependency import (
@@ -16,10 +21,16 @@ from codemodder.dependency import (
     build_failed_dependency_notification,
 )
 from codemodder.file_context import FileContext
+from codemodder.incremental import IncrementalIndex
 from codemodder.logging import log_list, logger
+from codemodder.module_cache import ModuleCache
+from codemodder.patch import PatchWriter
 from codemodder.project_analysis.file_parsers.package_store import PackageStore
 from codemodder.project_analysis.python_repo_manager import PythonRepoManager
 from codemodder.registry import CodemodRegistry
+from codemodder.result import ResultSet
+from codemodder.sarifs import SarifRegistry
+from codemodder.utils.atomic_write import fsync_directory, temp_file_beside
 from codemodder.utils.timer import Timer
 
 try:
@@ -34,6 +45,70 @@ if TYPE_CHECKING:
     from codemodder.codemods.base_codemod import BaseCodemod
 
 
+class Schedule(Enum):
+    """
+    Order in which codemods are applied to files.
+    """
+
+    # Each codemod is applied to every file before the next codemod runs
+    CODEMOD_MAJOR = "codemod-major"
+    # Each file has every codemod applied to it before the next file is processed
+    FILE_MAJOR = "file-major"
+
+    def __str__(self):
+        return self.value
+
+
+class ExecutorType(Enum):
+    """
+    Kind of worker pool used to process files in parallel.
+    """
+
+    THREAD = "thread"
+    PROCESS = "process"
+
+    def __str__(self):
+        return self.value
+
+
+def write_files(contents: dict[Path, str]):
+    """
+    Write the new contents of each file, replacing them all in one batch
+
+    Each new version is written to a temporary file next to the file it
+    replaces and synced to disk. The originals are then atomically replaced
+    by renaming, so no file is ever left partially written, and none are
+    replaced if any of the new versions could not be written. Temporary files
+    that were not renamed are always removed.
+    """
+    temp_files: list[tuple[str, str]] = []
+    replaced = 0
+    try:
+        for file_path, code in contents.items():
+            # Replace the target of a symlink rather than the link itself
+            target = os.path.realpath(file_path)
+            fd, temp_path = temp_file_beside(target)
+            temp_files.append((temp_path, target))
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(code)
+                f.flush()
+                os.fsync(f.fileno())
+            with contextlib.suppress(FileNotFoundError):
+                shutil.copymode(target, temp_path)
+
+        for temp_path, target in temp_files:
+            os.replace(temp_path, target)
+            replaced += 1
+    finally:
+        for temp_path, _ in temp_files[replaced:]:
+            with contextlib.suppress(OSError):
+                os.unlink(temp_path)
+
+    # The renames are only durable once each directory entry is synced
+    for directory in {os.path.dirname(target) for _, target in temp_files}:
+        fsync_directory(directory)
+
+
 class CodemodExecutionContext:
     _results_by_codemod: dict[str, list[ChangeSet]] = {}
     _failures_by_codemod: dict[str, list[Path]] = {}
@@ -48,9 +123,19 @@ class CodemodExecutionContext:
     timer: Timer
     path_include: list[str]
     path_exclude: list[str]
+    line_matcher: LineMatcher
     max_workers: int = 1
+    schedule: Schedule = Schedule.CODEMOD_MAJOR
+    executor_type: ExecutorType = ExecutorType.THREAD
+    cache_dir: Path | None = None
+    incremental_index: IncrementalIndex | None = None
+    inventory: RepositoryInventory | None = None
     tool_result_files_map: dict[str, list[str]]
     llm_client: Client | None = None
+    module_cache: ModuleCache
+    semgrep_results: ResultSet | None = None
+    sarif_registry: SarifRegistry | None = None
+    report: CodeTFWriter | PatchWriter | None = None
 
     def __init__(
         self,
@@ -63,6 +148,11 @@ class CodemodExecutionContext:
         path_exclude: list[str],
         tool_result_files_map: dict[str, list[str]] | None = None,
         max_workers: int = 1,
+        schedule: Schedule = Schedule.CODEMOD_MAJOR,
+        executor_type: ExecutorType = ExecutorType.THREAD,
+        cache_dir: Path | None = None,
+        incremental: bool = False,
+        inventory: RepositoryInventory | None = None,
     ):
         self.directory = directory
         self.dry_run = dry_run
@@ -73,11 +163,82 @@ class CodemodExecutionContext:
         self.registry = registry
         self.repo_manager = repo_manager
         self.timer = Timer()
+        self.module_cache = ModuleCache()
         self.path_include = path_include
         self.path_exclude = path_exclude
+        self.line_matcher = LineMatcher(path_include, path_exclude)
         self.max_workers = max_workers
+        self.schedule = schedule
+        self.executor_type = executor_type
+        self.cache_dir = cache_dir
+        self.incremental_index = (
+            IncrementalIndex(cache_dir / "incremental.idx")
+            if incremental and cache_dir is not None
+            else None
+        )
+        # Files in the directory, if it has already been walked
+        self.inventory = inventory
+        self.process_pool: Executor | None = None
         self.tool_result_files_map = tool_result_files_map or {}
         self.llm_client = self._setup_llm_client()
+        # Results of the combined semgrep scan for all codemods in the run, if any
+        self.semgrep_results = None
+        # SARIF files given as input, decoded once and shared by their detectors
+        self.sarif_registry = None
+        # Report that the results of each codemod are written to as it finishes
+        self.report = None
+        self._reported: set[str] = set()
+        self._batching_writes = False
+
+    @property
+    def batching_writes(self) -> bool:
+        """Whether changed files are written by an enclosing `batch_writes` block"""
+        return self._batching_writes
+
+    @contextlib.contextmanager
+    def batch_writes(self) -> Iterator[None]:
+        """
+        Stage the files changed within the block and write them all when it exits
+
+        Codemods applied within the block see each other's changes but do not
+        write them. Nothing is written if the block raises.
+        """
+        batching, self._batching_writes = self._batching_writes, True
+        try:
+            yield
+        finally:
+            self._batching_writes = batching
+        if not batching:
+            self.flush_staged()
+
+    def flush_staged(self):
+        """
+        Write the final version of every file that was changed during the run
+
+        The files are replaced in one batch. Nothing is written in a dry run,
+        but the staged versions are discarded.
+        """
+        staged = {
+            file_path: staged
+            for file_path in self.module_cache.staged_paths()
+            if (staged := self.module_cache.pop_staged(file_path)) is not None
+        }
+        if not staged or self.dry_run:
+            return
+
+        with self.timer.measure("write"):
+            write_files({file_path: code for file_path, (_, code) in staged.items()})
+        for file_path, (tree, code) in staged.items():
+            if tree is not None:
+                self.module_cache.update(file_path, tree, code)
+
+    def close(self):
+        """Release any resources held for the duration of the run"""
+        if self.process_pool is not None:
+            self.process_pool.shutdown()
+            self.process_pool = None
+        if self.incremental_index is not None:
+            self.incremental_index.save()
 
     def _setup_llm_client(self) -> Client | None:
         if not Client:
@@ -147,7 +308,7 @@ class CodemodExecutionContext:
         from codemodder.dependency_management import DependencyManager
 
         for package_store in store_list:
-            dm = DependencyManager(package_store, self.directory)
+            dm = DependencyManager(package_store, self.directory, self.module_cache)
             if (changeset := dm.write(list(dependencies), self.dry_run)) is not None:
                 self.add_changesets(codemod_id, [changeset])
                 self._dependency_update_by_codemod[codemod_id] = package_store
@@ -183,25 +344,60 @@ class CodemodExecutionContext:
             self.add_dependencies(codemod_id, file_context.dependencies)
             self.add_unfixed_findings(codemod_id, file_context.unfixed_findings)
             self.timer.aggregate(file_context.timer)
+            if (
+                self.incremental_index is not None
+                and file_context.incremental_key is not None
+                and not (
+                    file_context.changesets
+                    or file_context.failures
+                    or file_context.dependencies
+                    or file_context.unfixed_findings
+                )
+            ):
+                self.incremental_index.add(file_context.incremental_key)
+
+    def compile_result(self, codemod: BaseCodemod) -> CodeTFResult:
+        """
+        Compile the results of a codemod
+
+        Results cannot be compiled once they have been reported, since their
+        diffs have been released.
+        """
+        if codemod.id in self._reported:
+            raise ValueError(f"results of {codemod.id} have already been reported")
+        return self._compile_result(codemod)
+
+    def _compile_result(self, codemod: BaseCodemod) -> CodeTFResult:
+        return CodeTFResult(
+            codemod=codemod.id,
+            summary=codemod.summary,
+            description=self.add_description(codemod),
+            detectionTool=codemod.detection_tool,
+            references=codemod.references,
+            properties={},
+            failedFiles=[str(file) for file in self.get_failures(codemod.id)],
+            changeset=self.get_changesets(codemod.id),
+            unfixedFindings=self.get_unfixed_findings(codemod.id),
+        )
 
     def compile_results(self, codemods: list[BaseCodemod]) -> list[CodeTFResult]:
-        results = []
-        for codemod in codemods:
-            result = CodeTFResult(
-                codemod=codemod.id,
-                summary=codemod.summary,
-                description=self.add_description(codemod),
-                detectionTool=codemod.detection_tool,
-                references=codemod.references,
-                properties={},
-                failedFiles=[str(file) for file in self.get_failures(codemod.id)],
-                changeset=self.get_changesets(codemod.id),
-                unfixedFindings=self.get_unfixed_findings(codemod.id),
-            )
+        return [self.compile_result(codemod) for codemod in codemods]
+
+    def report_results(self, codemod: BaseCodemod):
+        """
+        Write the results of a codemod that has finished to the report, if any
 
-            results.append(result)
+        Diffs are released once they have been written, since they make up
+        most of the results of a large run, so the results of the codemod can
+        no longer be compiled.
+        """
+        if self.report is None or codemod.id in self._reported:
+            return
 
-        return results
+        self._reported.add(codemod.id)
+        self.report.add_result(self._compile_result(codemod))
+        for change_set in self.get_changesets(codemod.id):
+            change_set.diff = ""
 
     def log_changes(self, codemod_id: str):
         if failures := self.get_failures(codemod_id):
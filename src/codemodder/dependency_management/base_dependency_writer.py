@@ -6,16 +6,24 @@ from packaging.requirements import Requirement
 
 from codemodder.codetf import Action, Change, ChangeSet, PackageAction, PackageResult
 from codemodder.dependency import Dependency
+from codemodder.module_cache import ModuleCache
 from codemodder.project_analysis.file_parsers.package_store import PackageStore
 
 
 class DependencyWriter(metaclass=ABCMeta):
     dependency_store: PackageStore
 
-    def __init__(self, dependency_store: PackageStore, parent_directory: Path):
+    def __init__(
+        self,
+        dependency_store: PackageStore,
+        parent_directory: Path,
+        module_cache: ModuleCache | None = None,
+    ):
         self.dependency_store = dependency_store
         self.path = Path(dependency_store.file)
         self.parent_directory = parent_directory
+        # Python files changed during a run are staged in the cache until the end of it
+        self.module_cache = module_cache
 
     @abstractmethod
     def add_to_file(
@@ -9,6 +9,7 @@ from codemodder.dependency_management.requirements_txt_writer import (
 )
 from codemodder.dependency_management.setup_py_writer import SetupPyWriter
 from codemodder.dependency_management.setupcfg_writer import SetupCfgWriter
+from codemodder.module_cache import ModuleCache
 from codemodder.project_analysis.file_parsers.package_store import (
     FileType,
     PackageStore,
@@ -19,9 +20,15 @@ class DependencyManager:
     dependencies_store: PackageStore
     parent_directory: Path
 
-    def __init__(self, dependencies_store: PackageStore, parent_directory: Path):
+    def __init__(
+        self,
+        dependencies_store: PackageStore,
+        parent_directory: Path,
+        module_cache: ModuleCache | None = None,
+    ):
         self.dependencies_store = dependencies_store
         self.parent_directory = parent_directory
+        self.module_cache = module_cache
 
     def write(
         self, dependencies: list[Dependency], dry_run: bool = False
@@ -40,7 +47,7 @@ class DependencyManager:
                 ).write(dependencies, dry_run)
             case FileType.SETUP_PY:
                 return SetupPyWriter(
-                    self.dependencies_store, self.parent_directory
+                    self.dependencies_store, self.parent_directory, self.module_cache
                 ).write(dependencies, dry_run)
             case FileType.SETUP_CFG:
                 return SetupCfgWriter(
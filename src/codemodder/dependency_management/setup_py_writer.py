@@ -40,7 +40,10 @@ class SetupPyWriter(DependencyWriter):
 
         diff = create_diff_from_tree(input_tree, output_tree)
 
-        if not dry_run:
+        if self.module_cache is not None:
+            # Written along with any changes that codemods made to the file
+            self.module_cache.stage(self.path, output_tree, output_tree.code)
+        elif not dry_run:
             with open(self.path, "w", encoding="utf-8") as f:
                 f.write(output_tree.code)
 
@@ -54,6 +57,8 @@ class SetupPyWriter(DependencyWriter):
         )
 
     def _parse_file(self):
+        if self.module_cache is not None:
+            return self.module_cache.get_module(self.path)
         with open(self.path, encoding="utf-8") as f:
             return cst.parse_module(f.read())
 
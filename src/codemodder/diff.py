@@ -1,27 +1,158 @@
 import difflib
+from typing import Iterator
 
 import libcst as cst
 
+# Lines of context around each hunk, as for `difflib.unified_diff`
+CONTEXT_LINES = 3
+
+
+def _format_range(start: int, stop: int) -> str:
+    """Convert a range of lines to the format used in unified diff hunk headers"""
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return f"{beginning}"
+    if not length:
+        # Empty ranges begin at the line just before the range
+        beginning -= 1
+    return f"{beginning},{length}"
+
+
+def _common_prefix(original_lines: list[str], new_lines: list[str], limit: int) -> int:
+    prefix = 0
+    while prefix < limit and original_lines[prefix] == new_lines[prefix]:
+        prefix += 1
+    return prefix
+
+
+def _common_suffix(original_lines: list[str], new_lines: list[str], limit: int) -> int:
+    suffix = 0
+    while suffix < limit and original_lines[-1 - suffix] == new_lines[-1 - suffix]:
+        suffix += 1
+    return suffix
+
+
+def _opcodes(original_lines: list[str], new_lines: list[str]) -> list[tuple]:
+    """
+    Return the opcodes that turn the original lines into the new lines
+
+    Most changes only touch a few lines of a file, so the lines the versions
+    have in common at the start and end of the file are not compared. As in
+    `difflib`, the longer of the two is matched first, which decides where a
+    change is placed among identical lines at the edges of the changed region.
+    """
+    limit = min(len(original_lines), len(new_lines))
+    prefix = _common_prefix(original_lines, new_lines, limit)
+    if prefix == len(original_lines) == len(new_lines):
+        return [("equal", 0, prefix, 0, prefix)]
+    suffix = _common_suffix(original_lines, new_lines, limit - prefix)
+    if suffix > prefix:
+        suffix = _common_suffix(original_lines, new_lines, limit)
+        prefix = _common_prefix(original_lines, new_lines, limit - suffix)
+
+    original_end = len(original_lines) - suffix
+    new_end = len(new_lines) - suffix
+    opcodes = [("equal", 0, prefix, 0, prefix)] if prefix else []
+    matcher = difflib.SequenceMatcher(
+        None, original_lines[prefix:original_end], new_lines[prefix:new_end]
+    )
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        opcodes.append((tag, i1 + prefix, i2 + prefix, j1 + prefix, j2 + prefix))
+    if suffix:
+        opcodes.append(
+            ("equal", original_end, len(original_lines), new_end, len(new_lines))
+        )
+    return opcodes
+
+
+def _grouped_opcodes(opcodes: list[tuple], n: int) -> Iterator[list[tuple]]:
+    """
+    Group the opcodes into hunks with up to `n` lines of context
+
+    This is `difflib.SequenceMatcher.get_grouped_opcodes` for precomputed opcodes.
+    """
+    codes = list(opcodes)
+    if codes[0][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - n), i2, max(j1, j2 - n), j2
+    if codes[-1][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)
+
+    group: list[tuple] = []
+    for tag, i1, i2, j1, j2 in codes:
+        # End the current group and start a new one whenever
+        # there is a large range with no changes.
+        if tag == "equal" and i2 - i1 > n * 2:
+            group.append((tag, i1, min(i2, i1 + n), j1, min(j2, j1 + n)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - n), max(j1, j2 - n)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        yield group
+
+
+def unified_diff(
+    original_lines: list[str], new_lines: list[str], n: int = CONTEXT_LINES
+) -> Iterator[str]:
+    """
+    Generate a unified diff of the lines in the format of `difflib.unified_diff`
+    """
+    started = False
+    for group in _grouped_opcodes(_opcodes(original_lines, new_lines), n):
+        if not started:
+            started = True
+            yield "--- \n"
+            yield "+++ \n"
+
+        first, last = group[0], group[-1]
+        original_range = _format_range(first[1], last[2])
+        new_range = _format_range(first[3], last[4])
+        yield f"@@ -{original_range} +{new_range} @@\n"
+
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                for line in original_lines[i1:i2]:
+                    yield " " + line
+                continue
+            if tag in ("replace", "delete"):
+                for line in original_lines[i1:i2]:
+                    yield "-" + line
+            if tag in ("replace", "insert"):
+                for line in new_lines[j1:j2]:
+                    yield "+" + line
+
 
 def create_diff(original_lines: list[str], new_lines: list[str]) -> str:
-    diff_lines = list(difflib.unified_diff(original_lines, new_lines))
+    diff_lines = list(unified_diff(original_lines, new_lines))
     return difflines_to_str(diff_lines)
 
 
-def create_diff_from_tree(original_tree: cst.Module, new_tree: cst.Module) -> str:
+def create_diff_from_code(original_code: str, new_code: str) -> str:
     """
-    Create a diff between the original and output trees.
+    Create a diff between the original and output code.
     """
+    if original_code == new_code:
+        return ""
     return create_diff(
-        original_tree.code.splitlines(keepends=True),
-        new_tree.code.splitlines(keepends=True),
+        original_code.splitlines(keepends=True),
+        new_code.splitlines(keepends=True),
     )
 
 
+def create_diff_from_tree(original_tree: cst.Module, new_tree: cst.Module) -> str:
+    """
+    Create a diff between the original and output trees.
+    """
+    return create_diff_from_code(original_tree.code, new_tree.code)
+
+
 def create_diff_and_linenums(
     original_lines: list[str], new_lines: list[str]
 ) -> tuple[str, list[int]]:
-    diff_lines = list(difflib.unified_diff(original_lines, new_lines))
+    diff_lines = list(unified_diff(original_lines, new_lines))
     return difflines_to_str(diff_lines), calc_new_line_nums(diff_lines)
 
 
@@ -0,0 +1,152 @@
+"""
+Support for applying codemods to files in a pool of worker processes.
+
+libcst transforms are pure Python and hold the GIL, so worker threads do not
+scale beyond a single core. Work is instead shipped to worker processes as
+picklable units that refer to codemods by ID, and the resulting `FileContext`
+objects are returned to the parent process for reporting. Workers do not
+write files: the parent sends the staged contents of each file along with its
+unit and stages the new contents that come back, to be written with the rest
+of the run.
+"""
+
+from __future__ import annotations
+
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterator, Sequence
+
+from codemodder.codemods.fusion import apply_codemods_to_findings
+from codemodder.context import CodemodExecutionContext, ExecutorType, Schedule
+from codemodder.file_context import FileContext
+from codemodder.project_analysis.python_repo_manager import PythonRepoManager
+from codemodder.registry import load_registered_codemods
+from codemodder.result import Result
+from codemodder.utils.timer import Timer
+
+if TYPE_CHECKING:
+    from codemodder.codemods.base_codemod import BaseCodemod
+
+
+@dataclass(frozen=True)
+class WorkUnit:
+    """A file along with the ordered codemods, and their findings, to apply to it"""
+
+    file_path: Path
+    codemods: tuple[tuple[str, list[Result] | None], ...]
+    # Contents of the file staged in the parent process, if it has been changed
+    source: str | None = None
+
+
+# Each worker process builds its own execution context when it starts
+_worker_context: CodemodExecutionContext | None = None
+
+
+def _init_worker(
+    directory: Path,
+    dry_run: bool,
+    verbose: bool,
+    path_include: list[str],
+    path_exclude: list[str],
+    tool_result_files_map: dict[str, list[str]],
+    schedule: Schedule,
+    cache_dir: Path | None,
+    incremental: bool,
+):
+    global _worker_context
+    _worker_context = CodemodExecutionContext(
+        directory,
+        dry_run,
+        verbose,
+        load_registered_codemods(),
+        PythonRepoManager(directory),
+        path_include,
+        path_exclude,
+        tool_result_files_map,
+        schedule=schedule,
+        cache_dir=cache_dir,
+        incremental=incremental,
+    )
+
+
+def apply_work_unit(
+    unit: WorkUnit,
+) -> tuple[dict[str, FileContext], Timer, str | None]:
+    """
+    Apply each codemod in the unit to its file within a worker process
+
+    Returns the new contents of the file if any codemod changed it.
+    """
+    context = _worker_context
+    assert context is not None, "worker process was not initialized"
+
+    codemods = []
+    for codemod_id, findings in unit.codemods:
+        codemod = context.registry.get_codemod(codemod_id)
+        assert codemod is not None, f"unknown codemod {codemod_id}"
+        codemods.append((codemod, findings))
+
+    if unit.source is not None:
+        context.module_cache.stage_source(unit.file_path, unit.source)
+    file_contexts, timer = apply_codemods_to_findings(unit.file_path, context, codemods)
+    # Changes staged in a worker would be lost along with it
+    staged = context.module_cache.pop_staged(unit.file_path)
+    new_code = None if staged is None or staged[1] == unit.source else staged[1]
+    return file_contexts, timer, new_code
+
+
+def use_process_pool(
+    context: CodemodExecutionContext, codemods: Sequence[BaseCodemod]
+) -> bool:
+    """
+    Determine whether the given codemods can be applied in worker processes
+
+    Workers look up codemods in the registry by ID, so codemods that are not
+    registered (e.g. those created ad hoc in tests) must run in threads.
+    """
+    return context.executor_type == ExecutorType.PROCESS and all(
+        context.registry.get_codemod(codemod.id) is codemod for codemod in codemods
+    )
+
+
+def get_process_pool(context: CodemodExecutionContext) -> Executor:
+    if context.process_pool is None:
+        context.process_pool = ProcessPoolExecutor(
+            max_workers=context.max_workers,
+            initializer=_init_worker,
+            initargs=(
+                context.directory,
+                context.dry_run,
+                context.verbose,
+                context.path_include,
+                context.path_exclude,
+                context.tool_result_files_map,
+                context.schedule,
+                context.cache_dir,
+                context.incremental_index is not None,
+            ),
+        )
+    return context.process_pool
+
+
+def process_work_units(
+    context: CodemodExecutionContext, units: list[WorkUnit]
+) -> Iterator[tuple[dict[str, FileContext], Timer]]:
+    """
+    Apply the given units of work in the process pool, preserving their order
+
+    Workers read files from disk, so any changes staged so far are sent along
+    with each unit, and the changes made by the workers are staged in turn.
+    """
+    units = [
+        replace(unit, source=context.module_cache.get_staged_source(unit.file_path))
+        for unit in units
+    ]
+    # Batch units to amortize the cost of communicating with the workers
+    chunksize = max(1, len(units) // (max(context.max_workers, 1) * 4))
+    results = get_process_pool(context).map(apply_work_unit, units, chunksize=chunksize)
+    for unit, (file_contexts, timer, new_code) in zip(units, results):
+        if new_code is not None:
+            context.module_cache.stage_source(unit.file_path, new_code)
+        yield file_contexts, timer
@@ -1,6 +1,8 @@
 from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Collection
 
+from codemodder.code_directory import RepositoryInventory
 from codemodder.codetf import Change, ChangeSet, Finding, UnfixedFinding
 from codemodder.dependency import Dependency
 from codemodder.result import Result
@@ -15,8 +17,8 @@ class FileContext:
 
     base_directory: Path
     file_path: Path
-    line_exclude: list[int] = field(default_factory=list)
-    line_include: list[int] = field(default_factory=list)
+    line_exclude: Collection[int] = field(default_factory=list)
+    line_include: Collection[int] = field(default_factory=list)
     results: list[Result] | None = field(default_factory=list)
     dependencies: set[Dependency] = field(default_factory=set)
     codemod_changes: list[Change] = field(default_factory=list)
@@ -24,6 +26,16 @@ class FileContext:
     changesets: list[ChangeSet] = field(default_factory=list)
     failures: list[Path] = field(default_factory=list)
     timer: Timer = field(default_factory=Timer)
+    # Recorded in the incremental index if the file is left unchanged
+    incremental_key: bytes | None = None
+    # Inventory of the base directory shared by all files in the run, if any
+    inventory: RepositoryInventory | None = field(
+        default=None, repr=False, compare=False
+    )
+
+    def __getstate__(self):
+        # The inventory is not sent to or from worker processes
+        return {**self.__dict__, "inventory": None}
 
     def add_dependency(self, dependency: Dependency):
         self.dependencies.add(dependency)
@@ -0,0 +1,104 @@
+import hashlib
+import threading
+from pathlib import Path
+from typing import Collection
+
+from codemodder import __version__
+from codemodder.result import Result
+from codemodder.utils.atomic_write import atomic_write
+
+DIGEST_SIZE = 16
+# Minimum number of keys not used by a run before the index file is rewritten
+COMPACT_THRESHOLD = 1 << 16
+
+
+class IncrementalIndex:
+    """
+    Compact on-disk record of codemod inputs that are known to produce no changes
+
+    Each entry is a fixed-size digest of the codemod ID, the codemodder version,
+    the file contents, the findings for the file, and the line filters. The
+    index file is a flat sequence of these digests, to which the keys recorded
+    by each run are appended. Keys that were not used by a run are stale, and
+    once they outnumber both the threshold and the keys that were used, the
+    file is rewritten with only the keys used by the run.
+
+    Codemods whose output depends on files other than the one being
+    transformed may be skipped even though that other file has changed, so
+    this is only intended for repeated scans of a largely unchanged repository.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._keys: set[bytes] = set()
+        self._new_keys: set[bytes] = set()
+        self._used_keys: set[bytes] = set()
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            data = self.path.read_bytes()
+        except FileNotFoundError:
+            return
+
+        self._keys = {
+            data[i : i + DIGEST_SIZE]
+            for i in range(0, len(data) - DIGEST_SIZE + 1, DIGEST_SIZE)
+        }
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: bytes) -> bool:
+        return key in self._keys
+
+    @staticmethod
+    def key(
+        codemod_id: str,
+        source: str,
+        findings: list[Result] | None,
+        line_include: Collection[int],
+        line_exclude: Collection[int],
+    ) -> bytes:
+        digest = hashlib.blake2b(digest_size=DIGEST_SIZE)
+        for part in (
+            codemod_id,
+            __version__,
+            source,
+            repr(findings),
+            repr(sorted(line_include)),
+            repr(sorted(line_exclude)),
+        ):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.digest()
+
+    def add(self, key: bytes):
+        """Record a key, whether it is new or was found in the index, as used"""
+        with self._lock:
+            self._used_keys.add(key)
+            if key not in self._keys:
+                self._keys.add(key)
+                self._new_keys.add(key)
+
+    def save(self):
+        """Append any keys recorded during this run to the index file"""
+        with self._lock:
+            stale = len(self._keys) - len(self._used_keys)
+            if stale > max(COMPACT_THRESHOLD, len(self._used_keys)):
+                self._compact()
+                return
+            if not self._new_keys:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "ab") as f:
+                f.write(b"".join(self._new_keys))
+            self._new_keys.clear()
+
+    def _compact(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(self.path, "wb") as f:
+            f.write(b"".join(self._used_keys))
+        self._keys = set(self._used_keys)
+        self._new_keys.clear()
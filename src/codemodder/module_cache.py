@@ -0,0 +1,204 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+
+import libcst as cst
+
+
+def content_hash(source: str) -> str:
+    return hashlib.sha1(source.encode("utf-8"), usedforsecurity=False).hexdigest()
+
+
+@dataclass(frozen=True)
+class CachedModule:
+    digest: str
+    module: cst.Module
+    # The code for the module, so that it does not need to be generated again
+    code: str
+    # Parsed trees never share nodes, so metadata can be computed without a copy
+    parsed: bool = False
+
+
+class ModuleCache:
+    """
+    Cache of parsed libcst modules that is shared by all codemods in a run.
+
+    Entries are keyed by path and validated against a hash of the file contents,
+    so each file is parsed once and only re-parsed if its contents have changed
+    in a way that the cache was not told about.
+
+    Pipelines `stage` the new tree for each file they change rather than
+    writing it, and the staged tree is handed out in place of the file
+    contents until it is popped. Staged trees thus form an in-memory overlay
+    of the directory, so that subsequent codemods see earlier changes even
+    in a dry run. Once a popped tree is written it should be recorded with
+    `update` so that it can be reused without parsing. Changes made in worker
+    processes are staged as source only, and parsed if they are needed.
+
+    Metadata computed for the current tree of each file is cached as well, so
+    that providers such as `ScopeProvider` are only computed again once a
+    codemod replaces the tree. So is the code for each tree, which is costly
+    to generate for large modules.
+
+    Trees and metadata are only kept for the most recently used files, and
+    can be released once no further codemods will be applied to a file, so
+    that memory use does not grow with the size of the repository.
+    """
+
+    def __init__(self, max_entries: int = 128):
+        self.max_entries = max_entries
+        self._modules: OrderedDict[Path, CachedModule] = OrderedDict()
+        self._staged: dict[Path, tuple[cst.Module | None, str]] = {}
+        self._wrappers: OrderedDict[Path, tuple[cst.Module, cst.MetadataWrapper]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def _add(self, entries: OrderedDict, path: Path, entry):
+        # Must be called with the lock held
+        entries[path] = entry
+        entries.move_to_end(path)
+        while len(entries) > self.max_entries:
+            entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._modules)
+
+    def get_source(self, path: Path) -> str:
+        """
+        Return the current contents of `path`, including any staged changes
+        """
+        with self._lock:
+            if (staged := self._staged.get(path)) is not None:
+                return staged[1]
+
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def get_module(self, path: Path) -> cst.Module:
+        """
+        Return the parsed module for the current contents of `path`
+        """
+        with self._lock:
+            staged = self._staged.get(path)
+        if staged is not None:
+            if (module := staged[0]) is None:
+                module = cst.parse_module(staged[1])
+                with self._lock:
+                    if self._staged.get(path) is staged:
+                        self._staged[path] = (module, staged[1])
+            return module
+
+        with open(path, "r", encoding="utf-8") as f:
+            source = f.read()
+
+        digest = content_hash(source)
+        with self._lock:
+            cached = self._modules.get(path)
+            if cached is not None and cached.digest == digest:
+                self._modules.move_to_end(path)
+                return cached.module
+
+        module = cst.parse_module(source)
+        with self._lock:
+            self._add(
+                self._modules, path, CachedModule(digest, module, source, parsed=True)
+            )
+        return module
+
+    def get_code(self, path: Path, module: cst.Module) -> str:
+        """
+        Return the code for `module`, without generating it if it is the current tree for `path`
+        """
+        with self._lock:
+            staged = self._staged.get(path)
+            cached = self._modules.get(path)
+        if staged is not None and staged[0] is module:
+            return staged[1]
+        if cached is not None and cached.module is module:
+            return cached.code
+        return module.code
+
+    def get_metadata_wrapper(
+        self, path: Path, module: cst.Module
+    ) -> cst.MetadataWrapper:
+        """
+        Return a metadata wrapper for `module`, the current tree for `path`
+
+        Transformers must use the wrapper's `module`, which is a copy of
+        `module` unless it was parsed by this cache.
+        """
+        with self._lock:
+            cached_wrapper = self._wrappers.get(path)
+            if cached_wrapper is not None and cached_wrapper[0] is module:
+                self._wrappers.move_to_end(path)
+                return cached_wrapper[1]
+            cached = self._modules.get(path)
+            parsed = cached is not None and cached.module is module and cached.parsed
+
+        wrapper = cst.MetadataWrapper(module, unsafe_skip_copy=parsed)
+        with self._lock:
+            self._add(self._wrappers, path, (module, wrapper))
+        return wrapper
+
+    def update(self, path: Path, module: cst.Module, code: str | None = None):
+        """
+        Record `module` as the current tree for `path`
+
+        :param code: The generated code for `module`, if it is already available
+        """
+        code = module.code if code is None else code
+        with self._lock:
+            self._add(
+                self._modules, path, CachedModule(content_hash(code), module, code)
+            )
+            self._wrappers.pop(path, None)
+
+    def release(self, path: Path):
+        """
+        Discard the trees and metadata held for `path`
+
+        Any staged changes are kept as source only.
+        """
+        with self._lock:
+            self._modules.pop(path, None)
+            self._wrappers.pop(path, None)
+            if (staged := self._staged.get(path)) is not None:
+                self._staged[path] = (None, staged[1])
+
+    def stage(self, path: Path, module: cst.Module, code: str):
+        """
+        Record `module` as the current tree for `path` without it being written yet
+        """
+        with self._lock:
+            self._staged[path] = (module, code)
+            self._wrappers.pop(path, None)
+
+    def stage_source(self, path: Path, code: str):
+        """
+        Record `code` as the current contents of `path` without it being written yet
+        """
+        with self._lock:
+            self._staged[path] = (None, code)
+            self._wrappers.pop(path, None)
+
+    def get_staged_source(self, path: Path) -> str | None:
+        """
+        Return the staged contents of `path`, if it has any
+        """
+        with self._lock:
+            staged = self._staged.get(path)
+        return None if staged is None else staged[1]
+
+    def pop_staged(self, path: Path) -> tuple[cst.Module | None, str] | None:
+        with self._lock:
+            return self._staged.pop(path, None)
+
+    def staged_paths(self) -> list[Path]:
+        """
+        Return the paths that have staged changes, in the order they were first staged
+        """
+        with self._lock:
+            return list(self._staged)
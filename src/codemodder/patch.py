@@ -0,0 +1,96 @@
+"""
+Support for writing the changes made by a run as a single unified patch.
+"""
+
+from __future__ import annotations
+
+import tempfile
+from pathlib import PurePath
+from typing import BinaryIO
+
+from codemodder.codetf import Result, Run
+from codemodder.logging import logger
+
+NO_NEWLINE = "\\ No newline at end of file\n"
+
+
+def format_patch(path: str, diff: str) -> str:
+    """
+    Format the diff of a file in a changeset so that it can be applied with `git apply`
+
+    Diffs in changesets do not name the file, so the headers are replaced.
+    """
+    name = PurePath(path).as_posix()
+    lines = diff.split("\n", 2)
+    if len(lines) == 3 and lines[0].startswith("---") and lines[1].startswith("+++"):
+        diff = lines[2]
+    if not diff.endswith("\n"):
+        diff += "\n" + NO_NEWLINE
+    return f"diff --git a/{name} b/{name}\n--- a/{name}\n+++ b/{name}\n{diff}"
+
+
+class PatchWriter:
+    """
+    Write the changes of a run as a single unified patch, ordered by path
+
+    The diffs of each codemod are spooled to a temporary file as soon as its
+    results are available, so that they need not be held in memory, and are
+    copied to the patch in order of path once the run is complete. A file that
+    was changed by several codemods has a diff for each of them, in the order
+    they were applied, which `git apply` applies in turn.
+    """
+
+    def __init__(self, outfile):
+        self.outfile = outfile
+        self._spool: BinaryIO | None = None
+        self._failed = False
+        # Path, and offset and size in the spool, of each diff
+        self._entries: list[tuple[str, int, int]] = []
+
+    def add_result(self, result: Result):
+        """Spool the diffs of the changesets in `result`"""
+        if self._failed:
+            return
+        try:
+            if self._spool is None:
+                self._spool = tempfile.TemporaryFile()
+            for changeset in result.changeset:
+                if not changeset.diff:
+                    continue
+                data = format_patch(changeset.path, changeset.diff).encode("utf-8")
+                self._entries.append((changeset.path, self._spool.tell(), len(data)))
+                self._spool.write(data)
+        except Exception:
+            logger.exception("failed to write report file.")
+            self._failed = True
+
+    def close(self, run: Run) -> int:
+        """Write the spooled diffs to the patch"""
+        del run
+        try:
+            if not self._failed:
+                with open(self.outfile, "wb") as f:
+                    # Sorting is stable, so diffs of the same file stay in order
+                    for _, offset, size in sorted(
+                        self._entries, key=lambda entry: entry[0]
+                    ):
+                        assert self._spool is not None
+                        self._spool.seek(offset)
+                        f.write(self._spool.read(size))
+        except Exception:
+            logger.exception("failed to write report file.")
+            self._failed = True
+        finally:
+            self.discard()
+
+        if self._failed:
+            # Any issues with writing the output file should exit status 2.
+            return 2
+        logger.debug("wrote patch to %s", self.outfile)
+        return 0
+
+    def discard(self):
+        """Release the spooled diffs without writing the patch"""
+        if self._spool is not None:
+            self._spool.close()
+            self._spool = None
@@ -2,6 +2,7 @@ from abc import ABC, abstractmethod
 from pathlib import Path
 from typing import List
 
+from codemodder.code_directory import RepositoryInventory
 from codemodder.logging import logger
 
 from .package_store import FileType, PackageStore
@@ -9,9 +10,13 @@ from .package_store import FileType, PackageStore
 
 class BaseParser(ABC):
     parent_directory: Path
+    inventory: RepositoryInventory | None
 
-    def __init__(self, parent_directory: Path):
+    def __init__(
+        self, parent_directory: Path, inventory: RepositoryInventory | None = None
+    ):
         self.parent_directory = parent_directory
+        self.inventory = inventory
 
     @property
     @abstractmethod
@@ -23,6 +28,8 @@ class BaseParser(ABC):
         pass
 
     def find_file_locations(self) -> List[Path]:
+        if self.inventory is not None:
+            return self.inventory.find(self.file_type.value)
         return list(Path(self.parent_directory).rglob(self.file_type.value))
 
     def parse(self) -> list[PackageStore]:
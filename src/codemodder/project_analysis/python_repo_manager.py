@@ -2,6 +2,7 @@ from functools import cached_property
 from pathlib import Path
 from typing import Optional
 
+from codemodder.code_directory import RepositoryInventory
 from codemodder.project_analysis.file_parsers import (
     PyprojectTomlParser,
     RequirementsTxtParser,
@@ -12,8 +13,12 @@ from codemodder.project_analysis.file_parsers.package_store import PackageStore
 
 
 class PythonRepoManager:
-    def __init__(self, parent_directory: Path):
+    def __init__(
+        self, parent_directory: Path, inventory: RepositoryInventory | None = None
+    ):
         self.parent_directory = parent_directory
+        # All parsers query the same inventory rather than each walking the repo
+        self.inventory = inventory or RepositoryInventory(parent_directory)
         self._potential_stores = [
             PyprojectTomlParser,
             SetupPyParser,
@@ -42,6 +47,6 @@ class PythonRepoManager:
         discovered_pkg_stores: list[PackageStore] = []
         for store in self._potential_stores:
             discovered_pkg_stores.extend(
-                store(self.parent_directory).parse()  # type: ignore
+                store(self.parent_directory, self.inventory).parse()  # type: ignore
             )
         return discovered_pkg_stores
@@ -65,6 +65,9 @@ class CodemodRegistry:
             if codemod.origin == "pixee"
         }
 
+    def get_codemod(self, codemod_id: str) -> BaseCodemod | None:
+        return self._codemods_by_id.get(codemod_id)
+
     def add_codemod_collection(self, collection: CodemodCollection):
         for codemod in collection.codemods:
             wrapper = codemod() if isinstance(codemod, type) else codemod
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+import bisect
+import itertools
+import os
 from dataclasses import dataclass
 from pathlib import Path
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Sequence
 
 import libcst as cst
 from libcst._position import CodeRange
@@ -36,6 +39,12 @@ class Result(ABCDataclass):
     finding: Finding | None = None
 
     def match_location(self, pos: CodeRange, node: cst.CSTNode) -> bool:
+        """
+        Determine whether the node at `pos` matches one of the result's locations
+
+        Implementations must only match nodes whose lines overlap the lines of
+        one of the locations, which `ResultIndex` relies on.
+        """
         del node
         return any(
             same_line(pos, location)
@@ -67,10 +76,104 @@ def fuzzy_column_match(pos: CodeRange, location: Location) -> bool:
     )
 
 
+class ResultIndex:
+    """
+    Index of a sequence of results by the lines spanned by their locations
+
+    Locations are sorted by their start line so that the results overlapping
+    a range of lines are found by bisection. A count of the lines covered by
+    any location rejects ranges that overlap no result in constant time.
+    """
+
+    def __init__(self, results: Sequence[Result]):
+        self.results = results
+        self._entries = sorted(
+            (location.start.line, max(location.start.line, location.end.line), idx)
+            for idx, result in enumerate(results)
+            for location in result.locations
+        )
+        self._starts = [start for start, _, _ in self._entries]
+        self._max_span = max(
+            (end - start for start, end, _ in self._entries), default=0
+        )
+
+        last_line = max((end for _, end, _ in self._entries), default=0)
+        covered = [0] * (last_line + 2)
+        for start, end, _ in self._entries:
+            covered[max(start, 0)] += 1
+            covered[end + 1] -= 1
+        # The number of covered lines up to and including each line
+        self._covered_lines = list(
+            itertools.accumulate(
+                int(depth > 0) for depth in itertools.accumulate(covered)
+            )
+        )
+
+    def _covered_before(self, line: int) -> int:
+        if line <= 0:
+            return 0
+        return self._covered_lines[min(line, len(self._covered_lines)) - 1]
+
+    def covers(self, start_line: int, end_line: int) -> bool:
+        """
+        Determine whether any location overlaps the given lines
+        """
+        return self._covered_before(end_line + 1) > self._covered_before(start_line)
+
+    def overlapping(self, start_line: int, end_line: int) -> list[Result]:
+        """
+        Return the results with a location that overlaps the given lines, in their original order
+        """
+        if not self.covers(start_line, end_line):
+            return []
+
+        lo = bisect.bisect_left(self._starts, start_line - self._max_span)
+        hi = bisect.bisect_right(self._starts, end_line)
+        indices = sorted(
+            {idx for _, end, idx in self._entries[lo:hi] if end >= start_line}
+        )
+        return [self.results[idx] for idx in indices]
+
+
 class ResultSet(dict[str, dict[Path, list[Result]]]):
+    """
+    Results keyed by rule ID and then by file
+
+    Files are keyed by normalized paths, which are relative to the project
+    root for tools that report relative paths. Keys are computed once as
+    results are added and are shared by all results for the same file, and
+    the key for each file being analyzed is computed once per lookup set.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._canonical_paths: dict[str, Path] = {}
+        self._file_keys: dict[tuple[Any, Path], Path] = {}
+
+    def _canonical_path(self, path: str | Path) -> Path:
+        name = os.path.normpath(path)
+        if (key := self._canonical_paths.get(name)) is None:
+            key = self._canonical_paths[name] = Path(name)
+        return key
+
+    def _relative_path(self, context: CodemodExecutionContext, file: Path) -> Path:
+        return file.relative_to(context.directory)
+
+    def _file_key(self, context: CodemodExecutionContext, file: Path) -> Path:
+        keys = self._file_keys
+        if (key := keys.get((context.directory, file))) is None:
+            key = keys[(context.directory, file)] = self._canonical_path(
+                self._relative_path(context, file)
+            )
+        return key
+
     def add_result(self, result: Result):
+        # Lookups are recomputed against the updated results
+        self._file_keys.clear()
         for loc in result.locations:
-            self.setdefault(result.rule_id, {}).setdefault(loc.file, []).append(result)
+            self.setdefault(result.rule_id, {}).setdefault(
+                self._canonical_path(loc.file), []
+            ).append(result)
 
     def results_for_rule_and_file(
         self, context: CodemodExecutionContext, rule_id: str, file: Path
@@ -84,11 +187,27 @@ class ResultSet(dict[str, dict[Path, list[Result]]]):
 
         Some implementers may need to use the context to compute paths that are relative to the target directory.
         """
-        return self.get(rule_id, {}).get(file.relative_to(context.directory), [])
+        if not (paths_for_rule := self.get(rule_id)):
+            return []
+        return paths_for_rule.get(self._file_key(context, file), [])
 
     def files_for_rule(self, rule_id: str) -> list[Path]:
         return list(self.get(rule_id, {}).keys())
 
+    def files_for_rules(
+        self, context: CodemodExecutionContext, rule_ids: list[str]
+    ) -> set[Path]:
+        """
+        Return the files with results for any of the given rules
+
+        Paths are resolved the same way as in `results_for_rule_and_file`, so
+        that a file has results exactly when it is in the returned set.
+        """
+        directory = Path(context.directory)
+        return {
+            directory / path for rule_id in rule_ids for path in self.get(rule_id, {})
+        }
+
     def all_rule_ids(self) -> list[str]:
         return list(self.keys())
 
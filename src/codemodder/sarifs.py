@@ -1,11 +1,19 @@
 import json
+import re
+import threading
 from abc import ABCMeta, abstractmethod
 from collections import defaultdict
+from dataclasses import dataclass
 from importlib.metadata import entry_points
 from pathlib import Path
-from typing import DefaultDict
+from typing import IO, Any, Callable, DefaultDict, Iterable, Iterator, TypeVar
+
+from typing_extensions import Self
 
 from codemodder.logging import logger
+from codemodder.result import ResultSet
+
+ResultSetT = TypeVar("ResultSetT", bound=ResultSet)
 
 
 class AbstractSarifToolDetector(metaclass=ABCMeta):
@@ -15,23 +23,300 @@ class AbstractSarifToolDetector(metaclass=ABCMeta):
         pass
 
 
-def detect_sarif_tools(filenames: list[Path]) -> DefaultDict[str, list[str]]:
-    results: DefaultDict[str, list[str]] = defaultdict(list)
+# Large fields, such as dataflow traces, that are never used to build results
+SKIPPED_RUN_FIELDS = frozenset(
+    {"artifacts", "graphs", "invocations", "logicalLocations", "threadFlowLocations"}
+)
+SKIPPED_RESULT_FIELDS = frozenset(
+    {"codeFlows", "graphs", "graphTraversals", "relatedLocations", "stacks"}
+)
+
+CHUNK_SIZE = 1 << 20
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_NUMBER_TAIL = re.compile(r"[0-9eE+\-.]*")
+
+
+class JsonStream:
+    """
+    Minimal pull parser for navigating a large JSON document in bounded memory
+
+    The document is read in chunks. Callers walk objects and arrays with
+    `object_keys` and `array_items`, and must consume each key's value or each
+    item, with `value`, `skip`, or a nested walk, before moving on to the next.
+    Only the value being decoded, rather than the whole document, is held in
+    memory at any time.
+    """
+
+    def __init__(self, file: IO[str], chunk_size: int = CHUNK_SIZE):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        """Read more of the document, discarding what has been consumed"""
+        if self._eof:
+            return False
+        remaining = self.buf[self.pos :]
+        # Read at least as much as is buffered so that long values are not rescanned too often
+        chunk = self.file.read(max(self.chunk_size, len(remaining)))
+        self._eof = not chunk
+        self.buf = remaining + chunk
+        self.pos = 0
+        return not self._eof
+
+    def _peek(self) -> str:
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()  # type: ignore
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, chars: str) -> str:
+        char = self._peek()
+        if not char or char not in chars:
+            raise json.JSONDecodeError(
+                f"Expecting one of {chars!r}", self.buf, self.pos
+            )
+        self.pos += 1
+        return char
+
+    def value(self) -> Any:
+        """Decode the next value"""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number at the end of the buffer may continue in the next chunk
+            if _NUMBER_TAIL.fullmatch(self.buf, end) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def skip(self):
+        """Skip the next value without retaining it"""
+        # Decoding in C is much faster than scanning for the end of the value in Python
+        self.value()
+
+    def object_keys(self) -> Iterator[str]:
+        """Yield the keys of the next object, which may be null"""
+        if self._peek() == "n":
+            self.value()
+            return
+        self._expect("{")
+        if self._peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self._expect(":")
+            yield key
+            if self._expect(",}") == "}":
+                return
+
+    def array_items(self) -> Iterator[None]:
+        """Yield once for each item of the next array, which may be null"""
+        if self._peek() == "n":
+            self.value()
+            return
+        self._expect("[")
+        if self._peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield None
+            if self._expect(",]") == "]":
+                return
+
+
+def _read_result(stream: JsonStream) -> dict:
+    result = stream.value()
+    for key in SKIPPED_RESULT_FIELDS:
+        result.pop(key, None)
+    return result
+
+
+def _iter_runs(
+    sarif_file: str | Path, include_results: bool
+) -> Iterator[tuple[int, dict, dict | None]]:
+    """
+    Yield each result along with its run, and each run once it has been read
+
+    Each run is yielded with its index in the file. The run yielded with a
+    result includes its `tool`, although it may not include fields that
+    follow the results. The run yielded on its own, with `None` in place of a
+    result, is complete but never includes its results.
+    """
+    with open(sarif_file, "r", encoding="utf-8") as f:
+        stream = JsonStream(f)
+        for key in stream.object_keys():
+            if key != "runs":
+                stream.skip()
+                continue
+            for index, _ in enumerate(stream.array_items()):
+                run: dict = {}
+                # Results are held back until the tool they belong to is known
+                pending: list[dict] = []
+                for run_key in stream.object_keys():
+                    if run_key == "results" and include_results:
+                        for _ in stream.array_items():
+                            result = _read_result(stream)
+                            if "tool" in run:
+                                yield index, run, result
+                            else:
+                                pending.append(result)
+                    elif run_key == "results" or run_key in SKIPPED_RUN_FIELDS:
+                        stream.skip()
+                    else:
+                        run[run_key] = stream.value()
+
+                for result in pending:
+                    yield index, run, result
+                yield index, run, None
+
+
+def iter_sarif_runs(sarif_file: str | Path) -> Iterator[dict]:
+    """
+    Yield each run in the SARIF file without its results
+    """
+    for _, run, _ in _iter_runs(sarif_file, include_results=False):
+        yield run
+
+
+def iter_sarif_results(sarif_file: str | Path) -> Iterator[tuple[dict, dict]]:
+    """
+    Yield each result in the SARIF file along with the run it belongs to
 
+    The file is streamed so that only a single result is held in memory at a
+    time. Fields that are never used to build results, such as `codeFlows`
+    and `relatedLocations`, are dropped as soon as each result is read. Each run is
+    yielded without its results and may not yet include the fields that
+    follow them in the file, but always includes its `tool`.
+    """
+    for _, run, result in _iter_runs(sarif_file, include_results=True):
+        if result is not None:
+            yield run, result
+
+
+def _load_detectors() -> dict[str, type[AbstractSarifToolDetector]]:
     logger.debug("loading registered SARIF tool detectors")
-    detectors = {
+    return {
         ent.name: ent.load() for ent in entry_points().select(group="sarif_detectors")
     }
+
+
+def _detected_tools(
+    run: dict, detectors: dict[str, type[AbstractSarifToolDetector]]
+) -> Iterator[str]:
+    for name, det in detectors.items():
+        # TODO: handle malformed sarif?
+        try:
+            if det.detect(run):
+                yield name
+        except (KeyError, AttributeError, ValueError):
+            continue
+
+
+def detect_sarif_tools(filenames: list[Path]) -> DefaultDict[str, list[str]]:
+    results: DefaultDict[str, list[str]] = defaultdict(list)
+
+    detectors = _load_detectors()
     for fname in filenames:
-        data = json.loads(fname.read_text())
-        for name, det in detectors.items():
-            # TODO: handle malformed sarif?
-            for run in data["runs"]:
-                try:
-                    if det.detect(run):
-                        logger.debug("detected %s sarif: %s", name, fname)
-                        results[name].append(str(fname))
-                except (KeyError, AttributeError, ValueError):
-                    continue
+        for run in iter_sarif_runs(fname):
+            for name in _detected_tools(run, detectors):
+                logger.debug("detected %s sarif: %s", name, fname)
+                results[name].append(str(fname))
 
     return results
+
+
+@dataclass
+class SarifRun:
+    """A single run from a SARIF file, without its results"""
+
+    sarif_file: Path
+    index: int
+    run: dict
+
+
+def _iter_run_results(runs: list[SarifRun]) -> Iterator[tuple[dict, dict]]:
+    """
+    Yield each result of the given runs along with its run
+
+    Each file is streamed again, once, to read the results of its runs.
+    """
+    runs_by_file: dict[Path, dict[int, dict]] = {}
+    for sarif_run in runs:
+        runs_by_file.setdefault(sarif_run.sarif_file, {})[
+            sarif_run.index
+        ] = sarif_run.run
+    for sarif_file, runs_by_index in runs_by_file.items():
+        for index, _, result in _iter_runs(sarif_file, include_results=True):
+            if result is not None and index in runs_by_index:
+                yield runs_by_index[index], result
+
+
+class SarifRegistry:
+    """
+    The SARIF files given for a codemodder run, along with the tools that produced them
+
+    Each run is recorded, without its results, under every tool that produced
+    it. The results for a tool are only read, by streaming its files again,
+    when its result set is first needed, so that the results of tools that no
+    codemod consumes are never held in memory.
+    """
+
+    def __init__(self):
+        self._files: DefaultDict[str, list[str]] = defaultdict(list)
+        self._runs: DefaultDict[str, list[SarifRun]] = defaultdict(list)
+        self._result_sets: dict[str, ResultSet] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, filenames: list[Path]) -> Self:
+        registry = cls()
+        detectors = _load_detectors()
+        for fname in filenames:
+            for index, run, _ in _iter_runs(fname, include_results=False):
+                for name in _detected_tools(run, detectors):
+                    logger.debug("detected %s sarif: %s", name, fname)
+                    registry.add(name, SarifRun(fname, index, run))
+
+        return registry
+
+    def add(self, tool: str, sarif_run: SarifRun):
+        with self._lock:
+            self._runs[tool].append(sarif_run)
+            if str(sarif_run.sarif_file) not in self._files[tool]:
+                self._files[tool].append(str(sarif_run.sarif_file))
+
+    def files_by_tool(self) -> DefaultDict[str, list[str]]:
+        """Return the SARIF files that contain runs from each tool"""
+        with self._lock:
+            return defaultdict(
+                list, {tool: list(files) for tool, files in self._files.items()}
+            )
+
+    def result_set(
+        self,
+        tool: str,
+        build: Callable[[Iterable[tuple[dict, dict]]], ResultSetT],
+    ) -> ResultSetT:
+        """
+        Return the result set for the tool, building it from its runs on first use
+
+        :param build: Builds the result set from each result along with its run
+        """
+        with self._lock:
+            if tool not in self._result_sets:
+                runs = self._runs.pop(tool, [])
+                self._result_sets[tool] = build(_iter_run_results(runs))
+            return self._result_sets[tool]  # type: ignore
@@ -1,8 +1,12 @@
+import hashlib
 import itertools
 import json
+import os
 import subprocess
+import urllib.parse
+from importlib.metadata import version
 from pathlib import Path
-from tempfile import NamedTemporaryFile
+from tempfile import NamedTemporaryFile, TemporaryDirectory
 from typing import Iterable, Optional
 
 from typing_extensions import Self, override
@@ -10,7 +14,8 @@ from typing_extensions import Self, override
 from codemodder.context import CodemodExecutionContext
 from codemodder.logging import logger
 from codemodder.result import LineInfo, Location, Result, ResultSet
-from codemodder.sarifs import AbstractSarifToolDetector
+from codemodder.sarifs import AbstractSarifToolDetector, iter_sarif_results
+from codemodder.utils.atomic_write import atomic_write
 
 
 class SemgrepSarifToolDetector(AbstractSarifToolDetector):
@@ -77,9 +82,23 @@ class SemgrepResult(Result):
 class SemgrepResultSet(ResultSet):
     @classmethod
     def from_sarif(cls, sarif_file: str | Path, truncate_rule_id: bool = False) -> Self:
-        with open(sarif_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        return cls.from_results(iter_sarif_results(sarif_file), truncate_rule_id)
 
+    @classmethod
+    def from_results(
+        cls, results: Iterable[tuple[dict, dict]], truncate_rule_id: bool = False
+    ) -> Self:
+        """Build the result set from each SARIF result along with its run"""
+        result_set = cls()
+        for sarif_run, result in results:
+            result_set.add_result(
+                SemgrepResult.from_sarif(result, sarif_run, truncate_rule_id)
+            )
+
+        return result_set
+
+    @classmethod
+    def from_sarif_data(cls, data: dict, truncate_rule_id: bool = False) -> Self:
         result_set = cls()
         for sarif_run in data["runs"]:
             for result in sarif_run["results"]:
@@ -93,26 +112,79 @@ class SemgrepResultSet(ResultSet):
 
 class InternalSemgrepResultSet(SemgrepResultSet):
     @override
-    def results_for_rule_and_file(
-        self, context: CodemodExecutionContext, rule_id: str, file: Path
-    ) -> list[Result]:
+    def _relative_path(self, context: CodemodExecutionContext, file: Path) -> Path:
         del context
-        paths_for_rule = self.get(rule_id, {})
-        # Do not normalize the path
-        return paths_for_rule.get(file, [])
+        # Results are keyed by the paths that were passed to semgrep
+        return file
 
+    @override
+    def files_for_rules(
+        self, context: CodemodExecutionContext, rule_ids: list[str]
+    ) -> set[Path]:
+        del context
+        return {path for rule_id in rule_ids for path in self.get(rule_id, {})}
 
-def run(
+
+class SemgrepCache:
+    """
+    Content-addressed on-disk cache of semgrep results
+
+    Each entry holds the SARIF results for a single file and is keyed by a hash
+    of the semgrep version, the combined rule configuration, the path of the
+    file, and the contents of the file.
+    """
+
+    def __init__(self, cache_dir: Path, yaml_files: Iterable[Path]):
+        self.cache_dir = cache_dir
+        rules_hash = hashlib.sha256(version("semgrep").encode("utf-8"))
+        for rules in sorted(Path(f).read_bytes() for f in yaml_files):
+            rules_hash.update(rules)
+        self.rules_digest = rules_hash.hexdigest()
+
+    def key(self, file: Path) -> str | None:
+        """
+        Return the key of the entry for the current contents of `file`
+
+        Returns `None` if the file cannot be read.
+        """
+        key = hashlib.sha256(self.rules_digest.encode("utf-8"))
+        key.update(str(file).encode("utf-8"))
+        try:
+            key.update(file.read_bytes())
+        except OSError:
+            return None
+        return key.hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> list[dict] | None:
+        """Return the cached SARIF results for the key, or `None` on a cache miss"""
+        try:
+            with open(self._entry_path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, sarif_results: list[dict]):
+        """Cache the SARIF results for the key, if the cache can be written"""
+        entry = self._entry_path(key)
+        try:
+            entry.parent.mkdir(parents=True, exist_ok=True)
+            with atomic_write(entry) as f:
+                json.dump(sarif_results, f)
+        except OSError:
+            logger.debug("failed to write semgrep cache entry %s", entry, exc_info=True)
+
+
+def _scan(
     execution_context: CodemodExecutionContext,
     yaml_files: Iterable[Path],
     files_to_analyze: Optional[Iterable[Path]] = None,
-) -> SemgrepResultSet:
+) -> dict:
     """
-    Runs Semgrep and outputs a dict with the results organized by rule_id.
+    Runs Semgrep and returns the resulting SARIF data.
     """
-    if not yaml_files:
-        raise ValueError("No Semgrep rules were provided")
-
     with NamedTemporaryFile(prefix="semgrep", suffix=".sarif") as temp_sarif_file:
         command = [
             "semgrep",
@@ -141,8 +213,124 @@ def run(
             if not execution_context.verbose:
                 logger.error("captured semgrep stderr: %s", call.stderr)
             raise subprocess.CalledProcessError(call.returncode, command)
-        # semgrep prepends the folders into the rule-id, we want the base name only
-        results = InternalSemgrepResultSet.from_sarif(
-            temp_sarif_file.name, truncate_rule_id=True
+        with open(temp_sarif_file.name, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+
+def _canonical_file(uri: str) -> str:
+    """Normalize the path of a file, or of a SARIF artifact uri, for comparison"""
+    if uri.startswith("file:"):
+        uri = urllib.parse.unquote(urllib.parse.urlparse(uri).path)
+    return os.path.normpath(os.path.abspath(uri))
+
+
+def _run_cached(
+    execution_context: CodemodExecutionContext,
+    yaml_files: list[Path],
+    files_to_analyze: list[Path],
+    cache: SemgrepCache,
+) -> SemgrepResultSet:
+    sarif_results: list[dict] = []
+    misses: list[Path] = []
+    # Each file is read and hashed once, before it is scanned
+    keys = {file: cache.key(file) for file in files_to_analyze}
+    for file, key in keys.items():
+        if key is None or (cached := cache.get(key)) is None:
+            misses.append(file)
+        else:
+            sarif_results.extend(cached)
+
+    logger.debug(
+        "semgrep cache: %s hits, %s misses",
+        len(files_to_analyze) - len(misses),
+        len(misses),
+    )
+    if misses:
+        data = _scan(execution_context, yaml_files, misses)
+        results_by_file: dict[str, list[dict]] = {
+            _canonical_file(str(file)): [] for file in misses
+        }
+        for sarif_run in data["runs"]:
+            for result in sarif_run["results"]:
+                # Rule IDs may be stored in the run rather than in each result
+                result["ruleId"] = SemgrepResult.extract_rule_id(result, sarif_run)
+                uri = result["locations"][0]["physicalLocation"]["artifactLocation"][
+                    "uri"
+                ]
+                key = _canonical_file(uri)
+                if key not in results_by_file and "%" in uri:
+                    # The uri may be percent-encoded even without a scheme
+                    key = _canonical_file(urllib.parse.unquote(uri))
+                results_by_file.setdefault(key, []).append(result)
+                sarif_results.append(result)
+
+        for file in misses:
+            if (key := keys[file]) is not None:
+                cache.put(key, results_by_file[_canonical_file(str(file))])
+
+    # semgrep prepends the folders into the rule-id, we want the base name only
+    return InternalSemgrepResultSet.from_sarif_data(
+        {"runs": [{"results": sarif_results}]}, truncate_rule_id=True
+    )
+
+
+def run(
+    execution_context: CodemodExecutionContext,
+    yaml_files: Iterable[Path],
+    files_to_analyze: Optional[Iterable[Path]] = None,
+) -> SemgrepResultSet:
+    """
+    Runs Semgrep and outputs a dict with the results organized by rule_id.
+
+    When the context has a cache directory, semgrep is only run on the files
+    whose results are not already cached.
+    """
+    if not yaml_files:
+        raise ValueError("No Semgrep rules were provided")
+
+    if execution_context.cache_dir is not None and files_to_analyze:
+        yaml_files = list(yaml_files)
+        return _run_cached(
+            execution_context,
+            yaml_files,
+            list(files_to_analyze),
+            SemgrepCache(execution_context.cache_dir / "semgrep", yaml_files),
         )
-        return results
+
+    data = _scan(execution_context, yaml_files, files_to_analyze)
+    # semgrep prepends the folders into the rule-id, we want the base name only
+    return InternalSemgrepResultSet.from_sarif_data(data, truncate_rule_id=True)
+
+
+def run_on_sources(
+    execution_context: CodemodExecutionContext,
+    yaml_files: Iterable[Path],
+    sources: dict[Path, str],
+) -> SemgrepResultSet:
+    """
+    Runs Semgrep on the given contents of files rather than on the files on disk
+
+    Results are reported for the original paths of the files.
+    """
+    with TemporaryDirectory(prefix="semgrep") as tmp:
+        originals: dict[str, Path] = {}
+        for idx, (path, source) in enumerate(sources.items()):
+            # The name is kept so that semgrep recognizes the language
+            target = Path(tmp, str(idx), path.name)
+            target.parent.mkdir()
+            with open(target, "w", encoding="utf-8", newline="") as f:
+                f.write(source)
+            originals[_canonical_file(str(target))] = path
+
+        data = _scan(execution_context, yaml_files, [Path(p) for p in originals])
+
+    for sarif_run in data["runs"]:
+        for result in sarif_run["results"]:
+            for location in result["locations"]:
+                artifact = location["physicalLocation"]["artifactLocation"]
+                original = originals.get(_canonical_file(artifact["uri"]))
+                if original is not None:
+                    artifact["uri"] = str(original)
+
+    # semgrep prepends the folders into the rule-id, we want the base name only
+    return InternalSemgrepResultSet.from_sarif_data(data, truncate_rule_id=True)
@@ -0,0 +1,54 @@
+import contextlib
+import os
+import tempfile
+from pathlib import Path
+from typing import IO, Iterator
+
+
+def temp_file_beside(path: str | Path) -> tuple[int, str]:
+    """
+    Create a temporary file in the same directory as `path`
+
+    The file can replace `path` by renaming, which is atomic within a
+    filesystem. Returns an open descriptor for the file and its path.
+    """
+    path = os.path.abspath(path)
+    return tempfile.mkstemp(
+        dir=os.path.dirname(path),
+        prefix=f".{os.path.basename(path)}.",
+        suffix=".tmp",
+    )
+
+
+@contextlib.contextmanager
+def atomic_write(
+    path: str | Path, mode: str = "w", encoding: str | None = "utf-8"
+) -> Iterator[IO]:
+    """
+    Write a temporary file that replaces `path` once the block exits
+
+    Readers, including concurrent runs, never see a partially written file.
+    If the block raises, the temporary file is removed and `path` is left
+    unchanged.
+    """
+    fd, temp_path = temp_file_beside(path)
+    try:
+        with os.fdopen(fd, mode, encoding=None if "b" in mode else encoding) as f:
+            yield f
+        os.replace(temp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(temp_path)
+        raise
+
+
+def fsync_directory(path: str | Path):
+    """Sync a directory so that files renamed into it are durable"""
+    # Directories cannot be opened on Windows, and some filesystems do not
+    # support syncing them
+    with contextlib.suppress(OSError):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
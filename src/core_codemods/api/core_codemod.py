@@ -1,4 +1,4 @@
-from pathlib import Path
+from typing import Sequence
 
 from codemodder.codemods.api import BaseCodemod
 from codemodder.codemods.api import SimpleCodemod as _SimpleCodemod
@@ -8,7 +8,6 @@ from codemodder.codemods.base_transformer import BaseTransformerPipeline
 from codemodder.codemods.import_modifier_codemod import (
     ImportModifierCodemod as _ImportModifierCodemod,
 )
-from codemodder.context import CodemodExecutionContext
 
 
 class CoreCodemod(BaseCodemod):
@@ -35,6 +34,7 @@ class SASTCodemod(CoreCodemod):
         detector: BaseDetector | None = None,
         transformer: BaseTransformerPipeline,
         default_extensions: list[str] | None = None,
+        trigger_tokens: Sequence[str] | None = None,
         requested_rules: list[str] | None = None,
     ):
         super().__init__(
@@ -42,17 +42,15 @@ class SASTCodemod(CoreCodemod):
             detector=detector,
             transformer=transformer,
             default_extensions=default_extensions,
+            trigger_tokens=trigger_tokens,
         )
         self.requested_rules = [self.name]
         if requested_rules:
             self.requested_rules.extend(requested_rules)
 
-    def apply(
-        self,
-        context: CodemodExecutionContext,
-        files_to_analyze: list[Path],
-    ) -> None:
-        self._apply(context, files_to_analyze, self.requested_rules)
+    @property
+    def rules(self) -> list[str]:
+        return self.requested_rules
 
 
 class SimpleCodemod(_SimpleCodemod):
@@ -16,6 +16,7 @@ class CombineStartswithEndswith(SimpleCodemod, NameResolutionMixin):
         review_guidance=ReviewGuidance.MERGE_WITHOUT_REVIEW,
         references=[],
     )
+    trigger_tokens = ("startswith", "endswith")
     change_description = "Use tuple of matches instead of boolean expression"
 
     @check_filter_by_path_includes_or_excludes
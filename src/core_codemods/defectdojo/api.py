@@ -73,18 +73,12 @@ class DefectDojoCodemod(SASTCodemod):
             ),
             transformer=other.transformer,
             detector=DefectDojoDetector(),
+            trigger_tokens=other.trigger_tokens,
             requested_rules=[rule_id],
         )
 
+    @property
     @override
-    def apply(
-        self,
-        context: CodemodExecutionContext,
-        files_to_analyze: list[Path],
-    ) -> None:
-        self._apply(
-            context,
-            files_to_analyze,
-            # We know this has a tool because we created it with `from_core_codemod`
-            cast(ToolMetadata, self._metadata.tool).rule_ids,
-        )
+    def rules(self) -> list[str]:
+        # We know this has a tool because we created it with `from_core_codemod`
+        return cast(ToolMetadata, self._metadata.tool).rule_ids
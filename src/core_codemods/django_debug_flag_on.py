@@ -32,7 +32,9 @@ class DjangoDebugFlagOn(SimpleCodemod):
         """
         Only visit module with this codemod if it's a settings.py file.
         """
-        return is_django_settings_file(self.file_context.file_path)
+        return is_django_settings_file(
+            self.file_context.file_path, self.file_context.inventory
+        )
 
     def on_result_found(self, _, updated_node):
         return updated_node.with_changes(value=cst.Name("False"))
@@ -82,6 +82,7 @@ DjangoModelWithoutDunderStr = CoreCodemod(
             ),
         ],
     ),
+    trigger_tokens=["Model"],
     transformer=LibcstTransformerPipeline(DjangoModelWithoutDunderStrTransformer),
     detector=None,
 )
@@ -47,6 +47,7 @@ DjangoReceiverOnTop = CoreCodemod(
             Reference(url="https://docs.djangoproject.com/en/4.1/topics/signals/"),
         ],
     ),
+    trigger_tokens=["receiver"],
     transformer=LibcstTransformerPipeline(DjangoReceiverOnTopTransformer),
     detector=None,
 )
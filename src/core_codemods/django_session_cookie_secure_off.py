@@ -32,7 +32,7 @@ class DjangoSessionCookieSecureOff(SimpleCodemod):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.is_django_settings_file = is_django_settings_file(
-            self.file_context.file_path
+            self.file_context.file_path, self.file_context.inventory
         )
         self.flag_correctly_set = False
 
@@ -19,6 +19,7 @@ class FixAsyncTaskInstantiation(SimpleCodemod, NameAndAncestorResolutionMixin):
             ),
         ],
     )
+    trigger_tokens = ("Task",)
     change_description = "Replace instantiation of `asyncio.Task` with higher-level functions to create tasks."
     _module_name = "asyncio"
 
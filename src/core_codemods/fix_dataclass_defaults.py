@@ -16,6 +16,7 @@ class FixDataclassDefaults(SimpleCodemod, NameAndAncestorResolutionMixin, UtilsM
             )
         ],
     )
+    trigger_tokens = ("dataclass",)
     change_description = (
         "Replace `dataclass` mutable default values with call to `field`"
     )
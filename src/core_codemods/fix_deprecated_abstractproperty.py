@@ -21,6 +21,7 @@ class FixDeprecatedAbstractproperty(SimpleCodemod, NameResolutionMixin):
             ),
         ],
     )
+    trigger_tokens = ("abstractproperty", "abstractclassmethod", "abstractstaticmethod")
     change_description = "Replace deprecated `abc` decorator."
     DEPRECATED_TO_NEW = {
         "abc.abstractproperty": "property",
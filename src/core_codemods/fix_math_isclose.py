@@ -58,6 +58,7 @@ FixMathIsClose = CoreCodemod(
             Reference(url="https://docs.python.org/3/library/math.html#math.isclose"),
         ],
     ),
+    trigger_tokens=["isclose"],
     transformer=LibcstTransformerPipeline(FixMathIsCloseTransformer),
     detector=None,
 )
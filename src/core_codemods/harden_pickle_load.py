@@ -23,6 +23,7 @@ class HardenPickleLoad(ImportModifierCodemod):
         ],
     )
 
+    trigger_tokens = ("pickle",)
     change_description = "Harden `pickle.load()` against deserialization attacks"
 
     @property
@@ -180,5 +180,6 @@ HardenPyyaml = CoreCodemod(
                             - pattern: yaml.UnsafeLoader
         """
     ),
+    trigger_tokens=["yaml"],
     transformer=LibcstTransformerPipeline(HardenPyyamlTransformer),
 )
@@ -62,6 +62,7 @@ class HTTPSConnection(SimpleCodemod):
         ],
     )
 
+    trigger_tokens = ("HTTPConnectionPool",)
     change_description = "Enforce HTTPS connection for `urllib3`"
 
     METADATA_DEPENDENCIES = (PositionProvider,)
@@ -87,6 +87,7 @@ JwtDecodeVerify = CoreCodemod(
             ),
         ],
     ),
+    trigger_tokens=["jwt"],
     transformer=LibcstTransformerPipeline(JwtDecodeVerifyTransformer),
     detector=SemgrepRuleDetector(
         r"""
@@ -73,6 +73,7 @@ NumpyNanEquality = CoreCodemod(
             ),
         ],
     ),
+    trigger_tokens=["numpy"],
     transformer=LibcstTransformerPipeline(NumpyNanEqualityTransformer),
     detector=None,
 )
@@ -13,6 +13,7 @@ class RemoveDebugBreakpoint(SimpleCodemod, NameResolutionMixin, AncestorPatterns
         review_guidance=ReviewGuidance.MERGE_WITHOUT_REVIEW,
         references=[],
     )
+    trigger_tokens = ("breakpoint", "set_trace")
     change_description = "Remove breakpoint call"
 
     def leave_Expr(
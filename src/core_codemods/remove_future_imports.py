@@ -26,6 +26,7 @@ class RemoveFutureImports(SimpleCodemod):
             Reference(url="https://docs.python.org/3/library/__future__.html"),
         ],
     )
+    trigger_tokens = ("__future__",)
     change_description = "Remove deprecated `__future__` imports"
 
     def leave_ImportFrom(
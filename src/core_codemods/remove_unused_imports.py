@@ -50,18 +50,3 @@ class RemoveUnusedImports(SimpleCodemod):
                     self.add_change_from_position(pos, self.change_description)
                     filtered_unused_imports.add((import_alias, importt))
         return tree.visit(RemoveUnusedImportsTransformer(filtered_unused_imports))
-
-    def filter_by_path_includes_or_excludes(self, pos_to_match) -> bool:
-        """
-        Returns True if the node, whose position in the file is pos_to_match, matches any of the lines specified in the path-includes or path-excludes flags.
-        """
-        # excludes takes precedence if defined
-        if self.line_exclude:
-            return not any(match_line(pos_to_match, line) for line in self.line_exclude)
-        if self.line_include:
-            return any(match_line(pos_to_match, line) for line in self.line_include)
-        return True
-
-
-def match_line(pos, line):
-    return pos.start.line == line and pos.end.line == line
@@ -45,5 +45,6 @@ SecureRandom = CoreCodemod(
                   ...
         """
     ),
+    trigger_tokens=["random"],
     transformer=LibcstTransformerPipeline(SecureRandomTransformer),
 )
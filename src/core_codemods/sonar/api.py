@@ -48,6 +48,8 @@ class SonarCodemod(SASTCodemod):
             ),
             transformer=transformer if transformer else other.transformer,
             detector=SonarDetector(),
+            # A different transformer may not need the same tokens
+            trigger_tokens=None if transformer else other.trigger_tokens,
             requested_rules=[rule_id],
         )
 
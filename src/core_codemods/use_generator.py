@@ -21,6 +21,7 @@ class UseGenerator(SimpleCodemod, NameResolutionMixin):
             ),
         ],
     )
+    trigger_tokens = ("any", "all", "sum", "min", "max")
     change_description = "Replace list comprehension with generator expression"
 
     def leave_Call(self, original_node: cst.Call, updated_node: cst.Call):
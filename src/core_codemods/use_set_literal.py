@@ -11,6 +11,7 @@ class UseSetLiteral(SimpleCodemod, NameResolutionMixin):
         review_guidance=ReviewGuidance.MERGE_WITHOUT_REVIEW,
         references=[],
     )
+    trigger_tokens = ("set",)
     change_description = "Replace sets from lists with set literals"
 
     def leave_Call(self, original_node: cst.Call, updated_node: cst.Call):
@@ -87,7 +87,7 @@ class UseWalrusIf(SimpleCodemod, NameResolutionMixin):
                 access = self.find_accesses(original_node.test.left)
         return len(access) == 1
 
-    def on_visit(self, node: cst.CSTNode) -> Optional[bool]:
+    def on_visit(self, node: cst.CSTNode) -> bool:
         if len(node.children) < 2:
             return super().on_visit(node)
 
@@ -5,8 +5,13 @@ import mock
 import pytest
 from libcst.codemod import CodemodContext
 
+from codemodder.code_directory import LineMatcher
 from codemodder.codemods.api import Metadata, ReviewGuidance, SimpleCodemod
+from codemodder.context import CodemodExecutionContext
+from codemodder.module_cache import ModuleCache
+from codemodder.result import ResultSet
 from core_codemods.api import CoreCodemod
+from core_codemods.fix_assert_tuple import FixAssertTuple
 
 
 class DoNothingCodemod(SimpleCodemod):
@@ -49,8 +54,79 @@ def test_filter_apply_by_extension(mocker, ext, call_count):
     )
 
     codemod.apply(
-        mocker.MagicMock(),
+        mocker.MagicMock(max_workers=1),
         [Path("file.py"), Path("file.txt"), Path("file.js"), Path("file2.py")],
     )
 
     assert process_file.call_count == call_count
+
+
+@pytest.mark.parametrize("source,call_count", [("import yaml\n", 1), ("x = 1\n", 0)])
+def test_skip_file_without_trigger_tokens(mocker, tmp_path, source, call_count):
+    parse = mocker.spy(cst, "parse_module")
+    transformer = mocker.MagicMock()
+    transformer.apply.return_value = None
+    codemod = CoreCodemod(
+        metadata=mocker.MagicMock(),
+        transformer=transformer,
+        trigger_tokens=["yaml"],
+    )
+    file_path = tmp_path / "code.py"
+    file_path.write_text(source)
+    context = mocker.MagicMock(incremental_index=None)
+    context.module_cache = ModuleCache()
+    context.line_matcher = LineMatcher([], [])
+
+    codemod.process_file_findings(file_path, context, None)
+
+    assert transformer.apply.call_count == call_count
+    parse.assert_not_called()
+
+
+def test_apply_only_to_files_with_results(mocker):
+    process_file = mocker.patch("core_codemods.api.CoreCodemod._process_file")
+    detector = mocker.MagicMock()
+    detector.apply.return_value = ResultSet(
+        {"do-nothing": {Path("file.py"): [mocker.MagicMock()]}}
+    )
+
+    codemod = CoreCodemod(
+        metadata=DoNothingCodemod.metadata,
+        detector=detector,
+        transformer=mocker.MagicMock(),
+    )
+
+    codemod.apply(
+        mocker.MagicMock(max_workers=1, directory=Path("/repo")),
+        [Path("/repo/file.py"), Path("/repo/file2.py")],
+    )
+
+    assert [call.args[0] for call in process_file.call_args_list] == [
+        Path("/repo/file.py")
+    ]
+
+
+class TestWrites:
+    def _context(self, tmp_path):
+        return CodemodExecutionContext(
+            tmp_path, False, False, mock.MagicMock(), mock.MagicMock(), [], []
+        )
+
+    def test_apply_writes_changes(self, tmp_path):
+        file_path = tmp_path / "code.py"
+        file_path.write_text("assert (1, 2)\n")
+
+        FixAssertTuple.apply(self._context(tmp_path), [file_path])
+
+        assert file_path.read_text() == "assert 1\nassert 2\n"
+
+    def test_batched_changes_written_at_end(self, tmp_path):
+        file_path = tmp_path / "code.py"
+        file_path.write_text("assert (1, 2)\n")
+        context = self._context(tmp_path)
+
+        with context.batch_writes():
+            FixAssertTuple.apply(context, [file_path])
+            assert file_path.read_text() == "assert (1, 2)\n"
+
+        assert file_path.read_text() == "assert 1\nassert 2\n"
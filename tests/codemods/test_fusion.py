@@ -0,0 +1,173 @@
+import libcst as cst
+import mock
+import pytest
+
+from codemodder.codemods.api import Metadata, ReviewGuidance, SimpleCodemod
+from codemodder.codemods.fusion import (
+    FusedTraversal,
+    apply_codemods_to_findings,
+    fusable_hooks,
+    is_fusable,
+)
+from codemodder.context import CodemodExecutionContext, Schedule
+from codemodder.registry import load_registered_codemods
+from core_codemods.api import CoreCodemod
+
+CODEMOD_IDS = [
+    "pixee:python/use-generator",
+    "pixee:python/use-set-literal",
+    "pixee:python/fix-assert-tuple",
+]
+
+
+class OverridesTraversal(SimpleCodemod):
+    metadata = Metadata(
+        name="overrides-traversal",
+        summary="A codemod that implements its own traversal.",
+        review_guidance=ReviewGuidance.MERGE_WITHOUT_REVIEW,
+    )
+
+    def transform_module_impl(self, tree: cst.Module) -> cst.Module:
+        return tree
+
+
+class AttributeHook(SimpleCodemod):
+    metadata = Metadata(
+        name="attribute-hook",
+        summary="A codemod with an attribute visitor hook.",
+        review_guidance=ReviewGuidance.MERGE_WITHOUT_REVIEW,
+    )
+
+    def visit_Call_func(self, node: cst.Call):
+        del node
+
+
+class RewritesModule(SimpleCodemod):
+    metadata = Metadata(
+        name="rewrites-module",
+        summary="A codemod that rewrites the module as a whole.",
+        review_guidance=ReviewGuidance.MERGE_WITHOUT_REVIEW,
+    )
+
+    def leave_Module(self, original_node: cst.Module, updated_node: cst.Module):
+        del original_node
+        return updated_node
+
+
+class ImportOnly(SimpleCodemod):
+    metadata = Metadata(
+        name="import-only",
+        summary="A codemod whose only change is an import.",
+        review_guidance=ReviewGuidance.MERGE_WITHOUT_REVIEW,
+    )
+    codemod_base = CoreCodemod
+
+    def leave_Name(self, original_node: cst.Name, updated_node: cst.Name):
+        if original_node.value == "getcwd":
+            self.add_needed_import("os", "getcwd")
+            self.report_change(original_node)
+        return updated_node
+
+
+class OptsOut(SimpleCodemod):
+    metadata = Metadata(
+        name="opts-out",
+        summary="A codemod that cannot share a traversal.",
+        review_guidance=ReviewGuidance.MERGE_WITHOUT_REVIEW,
+    )
+    fusable = False
+
+    def leave_Name(self, original_node: cst.Name, updated_node: cst.Name):
+        del original_node
+        return updated_node
+
+
+@pytest.fixture(scope="module")
+def codemods():
+    registry = load_registered_codemods()
+    return [registry.get_codemod(codemod_id) for codemod_id in CODEMOD_IDS]
+
+
+def _context(tmp_path):
+    return CodemodExecutionContext(
+        directory=tmp_path,
+        dry_run=False,
+        verbose=False,
+        registry=mock.MagicMock(),
+        repo_manager=mock.MagicMock(),
+        path_include=[],
+        path_exclude=[],
+        schedule=Schedule.FILE_MAJOR,
+    )
+
+
+def test_is_fusable(codemods):
+    assert all(is_fusable(codemod) for codemod in codemods)
+    registry = load_registered_codemods()
+    assert is_fusable(registry.get_codemod("pixee:python/secure-random"))
+    assert is_fusable(registry.get_codemod("pixee:python/fix-async-task-instantiation"))
+    assert fusable_hooks(OverridesTraversal) is None
+    assert fusable_hooks(AttributeHook) is None
+    assert fusable_hooks(RewritesModule) is None
+    assert fusable_hooks(OptsOut) is None
+    assert fusable_hooks(ImportOnly) is not None
+
+
+def test_only_applicable_codemods_may_change(tmp_path, codemods):
+    file_path = tmp_path / "code.py"
+    file_path.write_text("x = 1\ny = set([1, 2, 3])\n")
+    context = _context(tmp_path)
+
+    fusion = FusedTraversal(
+        context, file_path, [(codemod, None) for codemod in codemods]
+    )
+    assert [fusion.may_change(codemod) for codemod in codemods] == [
+        False,
+        True,
+        False,
+    ]
+
+
+def test_changes_are_attributed(tmp_path, codemods):
+    file_path = tmp_path / "code.py"
+    file_path.write_text("x = any([i for i in range(10)])\ny = set([1, 2, 3])\n")
+    context = _context(tmp_path)
+
+    file_contexts, _ = apply_codemods_to_findings(
+        file_path, context, [(codemod, None) for codemod in codemods]
+    )
+
+    assert (
+        context.module_cache.get_source(file_path)
+        == "x = any(i for i in range(10))\ny = {1, 2, 3}\n"
+    )
+    changesets = {
+        codemod_id: file_context.changesets
+        for codemod_id, file_context in file_contexts.items()
+    }
+    assert [change.lineNumber for change in changesets[CODEMOD_IDS[0]][0].changes] == [
+        1
+    ]
+    assert [change.lineNumber for change in changesets[CODEMOD_IDS[1]][0].changes] == [
+        2
+    ]
+    assert not changesets[CODEMOD_IDS[2]]
+
+
+def test_import_only_change_is_applied(tmp_path, codemods):
+    file_path = tmp_path / "code.py"
+    file_path.write_text("x = getcwd()\n")
+    context = _context(tmp_path)
+    import_only = ImportOnly()
+
+    file_contexts, _ = apply_codemods_to_findings(
+        file_path,
+        context,
+        [(codemod, None) for codemod in [import_only, *codemods]],
+    )
+
+    assert (
+        context.module_cache.get_source(file_path)
+        == "from os import getcwd\n\nx = getcwd()\n"
+    )
+    assert file_contexts[import_only.id].changesets
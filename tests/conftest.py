@@ -7,6 +7,7 @@ def disable_write_report(mocker):
     Unit tests should not write analysis report or update any source files.
     """
     mocker.patch("codemodder.codetf.CodeTF.write_report")
+    mocker.patch("codemodder.codemodder.CodeTFWriter")
 
 
 @pytest.fixture(autouse=True)
@@ -14,7 +15,7 @@ def disable_update_code(mocker):
     """
     Unit tests should not write analysis report or update any source files.
     """
-    mocker.patch("codemodder.codemods.libcst_transformer.update_code")
+    mocker.patch("codemodder.context.write_files")
 
 
 @pytest.fixture(autouse=True)
@@ -1,10 +1,12 @@
 from textwrap import dedent
 
+import libcst as cst
 import pytest
 
 from codemodder.codetf import DiffSide
 from codemodder.dependency import DefusedXML, Security
 from codemodder.dependency_management.setup_py_writer import SetupPyWriter
+from codemodder.module_cache import ModuleCache
 from codemodder.project_analysis.file_parsers.package_store import (
     FileType,
     PackageStore,
@@ -469,3 +471,44 @@ def test_setup_call_requirements_separate(tmpdir):
         "contextual_description": True,
         "contextual_description_position": "right",
     }
+
+
+@pytest.mark.parametrize("dry_run", [True, False])
+def test_update_staged_setuppy(tmp_path, dry_run):
+    original = """\
+    from setuptools import setup
+    setup(
+        name="test pkg",
+        install_requires=["protobuf>=3.12,<3.18; python_version < '3'"],
+    )
+    """
+    changed = original.replace('"test pkg"', '"test-pkg"')
+
+    dependency_file = tmp_path / "setup.py"
+    dependency_file.write_text(dedent(original))
+    # A codemod changed the file earlier in the run
+    module_cache = ModuleCache()
+    module_cache.stage(
+        dependency_file, cst.parse_module(dedent(changed)), dedent(changed)
+    )
+
+    store = PackageStore(
+        type=FileType.SETUP_PY,
+        file=dependency_file,
+        dependencies=set(),
+        py_versions=[">=3.6"],
+    )
+
+    writer = SetupPyWriter(store, tmp_path, module_cache)
+    changeset = writer.write([DefusedXML], dry_run=dry_run)
+
+    assert changeset is not None
+    assert dependency_file.read_text() == dedent(original)
+    after = f"""\
+        from setuptools import setup
+        setup(
+            name="test-pkg",
+            install_requires=["protobuf>=3.12,<3.18; python_version < '3'", "{DefusedXML.requirement}"],
+        )
+        """
+    assert module_cache.get_source(dependency_file) == dedent(after)
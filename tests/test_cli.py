@@ -142,6 +142,15 @@ class TestParseArgs:
             in caplog.messages
         )
 
+    def test_incremental_requires_cache_dir(self, caplog):
+        with pytest.raises(SystemExit) as err:
+            parse_args(
+                ["some/path", "--output", "here.txt", "--incremental"],
+                self.registry,
+            )
+        assert err.value.args[0] == 3
+        assert "CLI error: --incremental requires --cache-dir" in caplog.messages
+
     @pytest.mark.parametrize("codemod", ["secure-random", "pixee:python/secure-random"])
     def test_codemod_name_or_id(self, codemod):
         parse_args(
@@ -1,8 +1,17 @@
 from pathlib import Path
 
+import git
 import pytest
 
-from codemodder.code_directory import file_line_patterns, match_files
+from codemodder import code_directory
+from codemodder.code_directory import (
+    LineMatcher,
+    RepositoryInventory,
+    changed_files,
+    file_line_patterns,
+    match_files,
+)
+from codemodder.codemods.utils import is_django_settings_file
 
 
 @pytest.fixture(scope="module")
@@ -108,34 +117,176 @@ class TestMatchFiles:
         )
         self._assert_expected(files, expected)
 
-    def test_include_test_overridden_by_default_excludes(self, mocker):
-        mocker.patch(
-            "codemodder.code_directory.Path.rglob",
-            return_value=[
-                "foo/tests/test_insecure_random.py",
-                "foo/tests/test_make_request.py",
-            ],
-        )
-        mocker.patch(
-            "codemodder.code_directory.Path.is_file",
-            return_value=True,
-        )
-        files = match_files(Path("."), include_paths=["tests/**"])
+    @pytest.fixture
+    def test_files(self, tmp_path):
+        files = ["foo/tests/test_insecure_random.py", "foo/tests/test_make_request.py"]
+        (tmp_path / "foo" / "tests").mkdir(parents=True)
+        for name in files:
+            (tmp_path / name).touch()
+        return tmp_path, files
+
+    def test_include_test_overridden_by_default_excludes(self, test_files):
+        base_dir, _ = test_files
+        files = match_files(base_dir, include_paths=["tests/**"])
         self._assert_expected(files, [])
 
-    def test_include_test_without_default_includes(self, mocker):
-        files = ["foo/tests/test_insecure_random.py", "foo/tests/test_make_request.py"]
-        mocker.patch(
-            "codemodder.code_directory.Path.rglob",
-            return_value=files,
-        )
-        mocker.patch(
-            "codemodder.code_directory.Path.is_file",
-            return_value=True,
+    def test_include_test_without_default_includes(self, test_files):
+        base_dir, files = test_files
+        result = match_files(base_dir, exclude_paths=[])
+        assert result == [base_dir / x for x in files]
+
+    def test_excluded_directories_are_not_walked(self, mocker, dir_structure):
+        scandir = mocker.spy(code_directory.os, "scandir")
+        files = match_files(dir_structure, ["tests/**", "**/more_samples/**"])
+        self._assert_expected(files, ["insecure_random.py", "make_request.py"])
+
+        walked = [Path(call.args[0]).name for call in scandir.call_args_list]
+        assert "tests" not in walked
+        assert "more_samples" not in walked
+
+    def test_match_candidates(self, dir_structure):
+        expected = ["make_request.py"]
+        files = match_files(
+            dir_structure,
+            candidates=[
+                dir_structure / "samples" / "make_request.py",
+                dir_structure / "samples" / "more_samples" / "empty_for_testing.txt",
+                dir_structure / "tests" / "test_make_request.py",
+            ],
         )
-        result = match_files(Path("."), exclude_paths=[])
-        assert result == [Path(x) for x in files]
+        self._assert_expected(files, expected)
+
+    @pytest.mark.parametrize(
+        "include_paths", [None, ["samples/**"], ["**/*.txt", "**/*.py"]]
+    )
+    def test_match_inventory(self, dir_structure, include_paths):
+        exclude_paths = ["tests/**"]
+        inventory = RepositoryInventory(dir_structure)
+        assert match_files(
+            dir_structure, exclude_paths, include_paths, inventory=inventory
+        ) == match_files(dir_structure, exclude_paths, include_paths)
 
     def test_extract_line_from_pattern(self):
         lines = file_line_patterns(Path("insecure_random.py"), ["insecure_*.py:3"])
         assert lines == [3]
+
+    def test_line_matcher(self):
+        matcher = LineMatcher(
+            ["insecure_*.py:3", "insecure_*.py:5", "*.py", "other.py:1"],
+            ["insecure_random.py:4", "bad:pattern:7"],
+        )
+        assert matcher.lines(Path("insecure_random.py")) == (
+            frozenset({3, 5}),
+            frozenset({4}),
+        )
+        assert matcher.lines("other.py") == (frozenset({1}), frozenset())
+        assert matcher.lines(Path("unrelated.py")) == (frozenset(), frozenset())
+
+
+class TestRepositoryInventory:
+    def test_directory_is_walked_once(self, mocker, dir_structure):
+        scandir = mocker.spy(code_directory.os, "scandir")
+        inventory = RepositoryInventory(dir_structure)
+        assert not scandir.called
+
+        assert inventory.find("make_request.py") == [
+            dir_structure / "samples" / "make_request.py"
+        ]
+        assert inventory.with_suffix(".txt") == [
+            str(Path("samples", "more_samples", "empty_for_testing.txt"))
+        ]
+        assert inventory.contains(dir_structure / "tests", "test_make_request.py")
+        assert not inventory.contains(dir_structure, "make_request.py")
+        assert inventory.contains(dir_structure.parent, "make_request.py") is None
+        assert len(inventory.files) == 6
+
+        # One call for each of the directories
+        assert scandir.call_count == 4
+
+    def test_excluded_directory_is_not_walked(self, mocker, dir_structure):
+        scandir = mocker.spy(code_directory.os, "scandir")
+        exclude_paths = ["tests/**"]
+        inventory = RepositoryInventory(dir_structure, exclude_paths)
+        assert match_files(
+            dir_structure, exclude_paths, inventory=inventory
+        ) == match_files(dir_structure, exclude_paths)
+
+        scanned = {Path(call.args[0]) for call in scandir.call_args_list}
+        assert dir_structure / "tests" not in scanned
+        assert inventory.find("test_make_request.py") == []
+
+    def test_django_settings_file(self, tmp_path):
+        (tmp_path / "project").mkdir()
+        (tmp_path / "project" / "settings.py").touch()
+        inventory = RepositoryInventory(tmp_path)
+        assert not is_django_settings_file(
+            tmp_path / "project" / "settings.py", inventory
+        )
+
+        inventory = RepositoryInventory(tmp_path)
+        (tmp_path / "manage.py").touch()
+        assert is_django_settings_file(tmp_path / "project" / "settings.py", inventory)
+
+
+class TestChangedFiles:
+    @pytest.fixture
+    def repo_dir(self, tmp_path):
+        repo = git.Repo.init(tmp_path)
+        with repo.config_writer() as config:
+            config.set_value("user", "name", "test")
+            config.set_value("user", "email", "test@example.com")
+
+        (tmp_path / "src").mkdir()
+        (tmp_path / "src" / "unchanged.py").write_text("x = 1\n")
+        (tmp_path / "src" / "modified.py").write_text("x = 1\n")
+        (tmp_path / "src" / "deleted.py").write_text("x = 1\n")
+        (tmp_path / "other.py").write_text("x = 1\n")
+        repo.index.add(
+            ["src/unchanged.py", "src/modified.py", "src/deleted.py", "other.py"]
+        )
+        repo.index.commit("initial")
+
+        (tmp_path / "src" / "modified.py").write_text("x = 2\n")
+        (tmp_path / "src" / "deleted.py").unlink()
+        (tmp_path / "src" / "added.py").write_text("x = 1\n")
+        (tmp_path / "other.py").write_text("x = 2\n")
+        return tmp_path
+
+    def test_changed_files(self, repo_dir):
+        assert changed_files(repo_dir, "HEAD") == [
+            repo_dir / "other.py",
+            repo_dir / "src" / "added.py",
+            repo_dir / "src" / "modified.py",
+        ]
+
+    def test_changed_files_in_subdirectory(self, repo_dir):
+        assert changed_files(repo_dir / "src", "HEAD") == [
+            repo_dir / "src" / "added.py",
+            repo_dir / "src" / "modified.py",
+        ]
+
+    def test_changed_files_with_special_names(self, repo_dir):
+        names = ["with space.py", "tab\tname.py", "ünïcode.py"]
+        repo = git.Repo(repo_dir)
+        for name in names:
+            (repo_dir / name).write_text("x = 1\n")
+        repo.index.add(names[:2])
+        repo.index.commit("special")
+        for name in names:
+            (repo_dir / name).write_text("x = 2\n")
+        (repo_dir / "new file.py").write_text("x = 1\n")
+
+        assert changed_files(repo_dir, "HEAD") == sorted(
+            repo_dir / name
+            for name in [
+                "new file.py",
+                "other.py",
+                "src/added.py",
+                "src/modified.py",
+                *names,
+            ]
+        )
+
+    def test_bad_ref(self, repo_dir):
+        with pytest.raises(git.GitError):
+            changed_files(repo_dir, "no-such-ref")
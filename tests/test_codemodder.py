@@ -1,10 +1,15 @@
+import json
 import logging
+import subprocess
 
 import libcst as cst
 import mock
 import pytest
 
+import codemodder.context
 from codemodder.codemodder import find_semgrep_results, run
+from codemodder.codemods.libcst_transformer import LibcstTransformerPipeline
+from codemodder.codetf import CodeTF
 from codemodder.diff import create_diff_from_tree
 from codemodder.registry import load_registered_codemods
 from codemodder.result import ResultSet
@@ -26,6 +31,13 @@ def disable_codemod_apply(mocker, request):
         "test_cst_parsing_fails",
         "test_dry_run",
         "test_run_codemod_name_or_id",
+        "test_file_major_matches_codemod_major",
+        "test_process_executor_matches_thread_executor",
+        "test_incremental_skips_unchanged_files",
+        "test_diff_applies_changes",
+        "test_dry_run_sees_earlier_changes",
+        "test_process_executor_writes_once",
+        "test_semgrep_sees_earlier_changes",
     ):
         return
     mocker.patch("codemodder.codemods.base_codemod.BaseCodemod.apply")
@@ -74,9 +86,33 @@ class TestRun:
         mock_parse.assert_not_called()
         assert codetf.exists()
 
+    def test_failed_run_keeps_previous_report(self, mocker, dir_structure):
+        code_dir, codetf = dir_structure
+        codetf.write_text("previous")
+
+        def apply_codemods(context, codemods_to_run, *args):
+            context.report_results(codemods_to_run[0])
+            raise RuntimeError
+
+        mocker.patch("codemodder.codemodder.apply_codemods", apply_codemods)
+        args = [
+            str(code_dir),
+            "--output",
+            str(codetf),
+            "--codemod-include=url-sandbox",
+        ]
+        with pytest.raises(RuntimeError):
+            run(args)
+
+        assert codetf.read_text() == "previous"
+        assert sorted(path.name for path in code_dir.iterdir()) == [
+            "result.codetf",
+            "test_random.py",
+            "test_request.py",
+        ]
+
     @mock.patch("libcst.parse_module", side_effect=Exception)
-    @mock.patch("codemodder.codetf.CodeTF.build")
-    def test_cst_parsing_fails(self, build_report, mock_parse, dir_structure):
+    def test_cst_parsing_fails(self, mock_parse, dir_structure):
         code_dir, codetf = dir_structure
         args = [
             str(code_dir),
@@ -93,10 +129,7 @@ class TestRun:
         assert res == 0
         mock_parse.assert_called()
 
-        build_report.assert_called_once()
-        args_to_reporting = build_report.call_args_list[0][0]
-        assert len(args_to_reporting) == 4
-        _, _, _, results_by_codemod = args_to_reporting
+        results_by_codemod = CodeTF.model_validate_json(codetf.read_text()).results
         assert results_by_codemod != []
 
         requests_report = results_by_codemod[0]
@@ -106,17 +139,13 @@ class TestRun:
             str(code_dir / "test_request.py"),
         ]
 
-        build_report.return_value.write_report.assert_called_once()
-
     def test_dry_run(self, mocker, dir_structure):
-        mock_update_code = mocker.patch(
-            "codemodder.codemods.libcst_transformer.update_code"
-        )
+        mock_write_files = mocker.patch("codemodder.context.write_files")
         transform_apply = mocker.patch(
             "codemodder.codemods.libcst_transformer.LibcstTransformerPipeline.apply",
             new_callable=mock.PropertyMock,
         )
-        mocker.patch("codemodder.context.CodemodExecutionContext.compile_results")
+        mocker.patch("codemodder.context.CodemodExecutionContext.report_results")
 
         code_dir, codetf = dir_structure
         args = [
@@ -134,11 +163,10 @@ class TestRun:
         assert res == 0
         assert codetf.exists()
         transform_apply.assert_called()
-        mock_update_code.assert_not_called()
+        mock_write_files.assert_not_called()
 
     @pytest.mark.parametrize("dry_run", [True, False])
-    @mock.patch("codemodder.codetf.CodeTF.build")
-    def test_reporting(self, mock_reporting, dry_run, dir_structure):
+    def test_reporting(self, dry_run, dir_structure):
         code_dir, codetf = dir_structure
         args = [
             str(code_dir),
@@ -153,14 +181,12 @@ class TestRun:
         res = run(args)
         assert res == 0
 
-        mock_reporting.assert_called_once()
-        args_to_reporting = mock_reporting.call_args_list[0][0]
-        assert len(args_to_reporting) == 4
-        _, _, _, results_by_codemod = args_to_reporting
-
-        assert len(results_by_codemod) == 3
-
-        mock_reporting.return_value.write_report.assert_called_once()
+        results_by_codemod = CodeTF.model_validate_json(codetf.read_text()).results
+        assert [result.codemod for result in results_by_codemod] == [
+            "pixee:python/use-generator",
+            "pixee:python/use-defusedxml",
+            "pixee:python/use-walrus-if",
+        ]
 
     @pytest.mark.parametrize(
         "codemod", ["use-defusedxml", "pixee:python/use-defusedxml"]
@@ -169,17 +195,14 @@ class TestRun:
         "codemodder.codemods.libcst_transformer.LibcstTransformerPipeline.apply",
         new_callable=mock.PropertyMock,
     )
-    @mock.patch("codemodder.context.CodemodExecutionContext.compile_results")
-    @mock.patch("codemodder.codetf.CodeTF.write_report")
+    @mock.patch("codemodder.context.CodemodExecutionContext.report_results")
     def test_run_codemod_name_or_id(
         self,
-        write_report,
-        mock_compile_results,
+        mock_report_results,
         transform_apply,
         codemod,
         dir_structure,
     ):
-        del write_report
         code_dir, codetf = dir_structure
         args = [
             str(code_dir),
@@ -190,14 +213,13 @@ class TestRun:
 
         exit_code = run(args)
         assert exit_code == 0
-        mock_compile_results.assert_called()
+        mock_report_results.assert_called()
         transform_apply.assert_called()
 
 
 class TestCodemodIncludeExclude:
 
-    @mock.patch("codemodder.codetf.CodeTF.write_report")
-    def test_codemod_include_no_match(self, write_report, dir_structure, caplog):
+    def test_codemod_include_no_match(self, dir_structure, caplog):
         bad_codemod = "doesntexist"
         code_dir, codetf = dir_structure
         args = [
@@ -209,7 +231,7 @@ class TestCodemodIncludeExclude:
         caplog.set_level(logging.INFO)
 
         run(args)
-        write_report.assert_called_once()
+        assert codetf.exists()
 
         assert "no codemods to run" in caplog.text
         assert "scanned: 0 files" in caplog.text
@@ -218,8 +240,7 @@ class TestCodemodIncludeExclude:
             in caplog.text
         )
 
-    @mock.patch("codemodder.codetf.CodeTF.write_report")
-    def test_codemod_include_some_match(self, write_report, dir_structure, caplog):
+    def test_codemod_include_some_match(self, dir_structure, caplog):
         bad_codemod = "doesntexist"
         good_codemod = "secure-random"
         code_dir, codetf = dir_structure
@@ -231,15 +252,14 @@ class TestCodemodIncludeExclude:
         ]
         caplog.set_level(logging.INFO)
         run(args)
-        write_report.assert_called_once()
+        assert codetf.exists()
         assert f"running codemod pixee:python/{good_codemod}" in caplog.text
         assert (
             f"Requested codemod to include '{bad_codemod}' does not exist."
             in caplog.text
         )
 
-    @mock.patch("codemodder.codetf.CodeTF.write_report")
-    def test_codemod_exclude_some_match(self, write_report, dir_structure, caplog):
+    def test_codemod_exclude_some_match(self, dir_structure, caplog):
         bad_codemod = "doesntexist"
         good_codemod = "secure-random"
         code_dir, codetf = dir_structure
@@ -251,14 +271,13 @@ class TestCodemodIncludeExclude:
         ]
         caplog.set_level(logging.INFO)
         run(args)
-        write_report.assert_called_once()
+        assert codetf.exists()
 
         assert f"running codemod {good_codemod}" not in caplog.text
         assert "running codemod " in caplog.text
 
-    @mock.patch("codemodder.codetf.CodeTF.write_report")
     @mock.patch("codemodder.codemods.base_codemod.BaseCodemod.apply")
-    def test_codemod_exclude_no_match(self, apply, write_report, dir_structure, caplog):
+    def test_codemod_exclude_no_match(self, apply, dir_structure, caplog):
         bad_codemod = "doesntexist"
         code_dir, codetf = dir_structure
         args = [
@@ -269,7 +288,7 @@ class TestCodemodIncludeExclude:
         ]
         caplog.set_level(logging.INFO)
         run(args)
-        write_report.assert_called_once()
+        assert codetf.exists()
         assert "running codemod " in caplog.text
 
     @mock.patch("codemodder.codemods.semgrep.semgrep_run")
@@ -293,7 +312,7 @@ class TestCodemodIncludeExclude:
 
 
 class TestExitCode:
-    @mock.patch("codemodder.codetf.CodeTF.write_report")
+    @mock.patch("codemodder.codemodder.CodeTFWriter")
     def test_no_changes_success_0(self, mock_report, dir_structure):
         del mock_report
         code_dir, codetf = dir_structure
@@ -309,7 +328,7 @@ class TestExitCode:
         exit_code = run(args)
         assert exit_code == 0
 
-    @mock.patch("codemodder.codetf.CodeTF.write_report")
+    @mock.patch("codemodder.codemodder.CodeTFWriter")
     def test_bad_project_dir_1(self, mock_report):
         del mock_report
         args = [
@@ -322,7 +341,21 @@ class TestExitCode:
         exit_code = run(args)
         assert exit_code == 1
 
-    @mock.patch("codemodder.codetf.CodeTF.write_report")
+    @mock.patch("codemodder.codemodder.CodeTFWriter")
+    def test_changed_since_not_a_repo_1(self, mock_report, tmp_path):
+        del mock_report
+        args = [
+            str(tmp_path),
+            "--output",
+            "here.txt",
+            "--codemod-include=url-sandbox",
+            "--changed-since=HEAD",
+        ]
+
+        exit_code = run(args)
+        assert exit_code == 1
+
+    @mock.patch("codemodder.codemodder.CodeTFWriter")
     def test_conflicting_include_exclude(self, mock_report):
         del mock_report
         args = [
@@ -379,3 +412,178 @@ SESSION_COOKIE_SECURE = True"""
 +CSRF_TRUSTED_ORIGINS = ["http://127.0.0.1:8000","http://0.0.0.0:8000","http://172.16.189.10"]
 +SESSION_COOKIE_SECURE = True"""
         )
+
+
+class TestSchedule:
+    @pytest.fixture(autouse=True)
+    def disable_update_code(self):
+        """
+        Override fixture from conftest.py: later codemods must see earlier changes
+        """
+
+    def _run(self, tmp_path_factory, schedule, executor="thread", dry_run=False):
+        code_dir = tmp_path_factory.mktemp("code")
+        (code_dir / "code.py").write_text(
+            "x = any([i for i in range(10)])\ny = set([1, 2, 3])\nbreakpoint()\n"
+        )
+        codetf = code_dir / "result.codetf"
+        args = [
+            str(code_dir),
+            "--output",
+            str(codetf),
+            "--codemod-include=use-generator,use-set-literal,remove-debug-breakpoint",
+            f"--schedule={schedule}",
+            f"--executor={executor}",
+            "--max-workers=2",
+        ] + (["--dry-run"] if dry_run else [])
+        assert run(args) == 0
+        return (code_dir / "code.py").read_text(), json.loads(codetf.read_text())
+
+    def test_file_major_matches_codemod_major(self, tmp_path_factory):
+        code, codetf = self._run(tmp_path_factory, "codemod-major")
+        file_major_code, file_major_codetf = self._run(tmp_path_factory, "file-major")
+
+        assert (
+            code == file_major_code == "x = any(i for i in range(10))\ny = {1, 2, 3}\n"
+        )
+        assert [result["changeset"] for result in codetf["results"]] == [
+            result["changeset"] for result in file_major_codetf["results"]
+        ]
+        assert all(result["changeset"] for result in codetf["results"])
+
+    @pytest.mark.parametrize("executor", ["thread", "process"])
+    @pytest.mark.parametrize("schedule", ["codemod-major", "file-major"])
+    def test_dry_run_sees_earlier_changes(self, tmp_path_factory, schedule, executor):
+        _, codetf = self._run(tmp_path_factory, schedule)
+        dry_run_code, dry_run_codetf = self._run(
+            tmp_path_factory, schedule, executor=executor, dry_run=True
+        )
+
+        assert dry_run_code == (
+            "x = any([i for i in range(10)])\ny = set([1, 2, 3])\nbreakpoint()\n"
+        )
+        assert [result["changeset"] for result in codetf["results"]] == [
+            result["changeset"] for result in dry_run_codetf["results"]
+        ]
+
+    @pytest.mark.parametrize("schedule", ["codemod-major", "file-major"])
+    def test_process_executor_writes_once(self, mocker, tmp_path_factory, schedule):
+        write_files = mocker.spy(codemodder.context, "write_files")
+
+        code, _ = self._run(tmp_path_factory, schedule, executor="process")
+
+        assert code == "x = any(i for i in range(10))\ny = {1, 2, 3}\n"
+        write_files.assert_called_once()
+
+    @pytest.mark.parametrize("schedule", ["codemod-major", "file-major"])
+    def test_process_executor_matches_thread_executor(self, tmp_path_factory, schedule):
+        code, codetf = self._run(tmp_path_factory, schedule)
+        process_code, process_codetf = self._run(
+            tmp_path_factory, schedule, executor="process"
+        )
+
+        assert code == process_code
+        assert [result["changeset"] for result in codetf["results"]] == [
+            result["changeset"] for result in process_codetf["results"]
+        ]
+
+    @pytest.mark.parametrize("dry_run", [False, True])
+    @pytest.mark.parametrize("schedule", ["codemod-major", "file-major"])
+    def test_semgrep_sees_earlier_changes(self, tmp_path_factory, schedule, dry_run):
+        code_dir = tmp_path_factory.mktemp("code")
+        (code_dir / "code.py").write_text(
+            "import subprocess\nimport random\n\ndef f(cmd):\n"
+            "    subprocess.run(cmd, shell=True)\n\nx = random.random()\n"
+        )
+        codetf = code_dir / "result.codetf"
+        args = [
+            str(code_dir),
+            "--output",
+            str(codetf),
+            # A codemod in between must not decide for secure-random before the rescan
+            "--codemod-include=sandbox-process-creation,exception-without-raise,secure-random",
+            f"--schedule={schedule}",
+        ] + (["--dry-run"] if dry_run else [])
+        assert run(args) == 0
+
+        # The last codemod matches lines that were moved by the first
+        changesets = [
+            result["changeset"] for result in json.loads(codetf.read_text())["results"]
+        ]
+        assert [len(changeset) for changeset in changesets] == [1, 0, 1]
+        assert "+x = secrets.SystemRandom().random()" in changesets[2][0]["diff"]
+        if not dry_run:
+            assert (
+                "x = secrets.SystemRandom().random()\n"
+                in (code_dir / "code.py").read_text()
+            )
+
+
+class TestOutputFormat:
+    @pytest.fixture(autouse=True)
+    def disable_update_code(self):
+        """
+        Override fixture from conftest.py: the patch is checked against the changed files
+        """
+
+    @pytest.mark.parametrize("schedule", ["codemod-major", "file-major"])
+    def test_diff_applies_changes(self, tmp_path_factory, schedule):
+        code = "x = any([i for i in range(10)])\ny = set([1, 2, 3])\nbreakpoint()\n"
+        code_dir = tmp_path_factory.mktemp("code")
+        (code_dir / "code.py").write_text(code)
+        (code_dir / "pkg").mkdir()
+        (code_dir / "pkg" / "other.py").write_text("z = set([4])\n")
+        patch = tmp_path_factory.mktemp("patch") / "changes.patch"
+        args = [
+            str(code_dir),
+            "--output",
+            str(patch),
+            "--output-format=diff",
+            "--codemod-include=use-generator,use-set-literal,remove-debug-breakpoint",
+            f"--schedule={schedule}",
+        ]
+
+        assert run(args + ["--dry-run"]) == 0
+        assert (code_dir / "code.py").read_text() == code
+        assert [
+            line for line in patch.read_text().splitlines() if line.startswith("diff")
+        ] == [
+            "diff --git a/code.py b/code.py",
+            "diff --git a/code.py b/code.py",
+            "diff --git a/code.py b/code.py",
+            "diff --git a/pkg/other.py b/pkg/other.py",
+        ]
+
+        subprocess.run(["git", "apply", str(patch)], cwd=code_dir, check=True)
+        assert (code_dir / "code.py").read_text() == (
+            "x = any(i for i in range(10))\ny = {1, 2, 3}\n"
+        )
+        assert (code_dir / "pkg" / "other.py").read_text() == "z = {4}\n"
+
+
+class TestIncremental:
+    def test_incremental_skips_unchanged_files(self, mocker, tmp_path_factory):
+        code_dir = tmp_path_factory.mktemp("code")
+        cache_dir = tmp_path_factory.mktemp("cache")
+        (code_dir / "code.py").write_text("x = set()\n")
+        args = [
+            str(code_dir),
+            "--output",
+            str(code_dir / "result.codetf"),
+            "--codemod-include=use-set-literal",
+            "--cache-dir",
+            str(cache_dir),
+            "--incremental",
+        ]
+
+        transform = mocker.spy(LibcstTransformerPipeline, "apply")
+        assert run(args) == 0
+        assert transform.call_count == 1
+        assert (cache_dir / "incremental.idx").stat().st_size > 0
+
+        assert run(args) == 0
+        assert transform.call_count == 1
+
+        (code_dir / "code.py").write_text("x = set([1, 2])\n")
+        assert run(args) == 0
+        assert transform.call_count == 2
@@ -5,7 +5,16 @@ import jsonschema
 import pytest
 import requests
 
-from codemodder.codetf import Change, ChangeSet, CodeTF, DiffSide, Reference, Result
+from codemodder.codetf import (
+    Change,
+    ChangeSet,
+    CodeTF,
+    CodeTFWriter,
+    DiffSide,
+    Reference,
+    Result,
+    Run,
+)
 
 
 @pytest.fixture(autouse=True)
@@ -113,6 +122,86 @@ def test_write_codetf_with_results(tmpdir, mocker, codetf_schema):
     jsonschema.validate(json.loads(data), codetf_schema)
 
 
+@pytest.mark.parametrize("num_results", [0, 1, 2])
+def test_write_codetf_incrementally(tmpdir, mocker, codetf_schema, num_results):
+    path = tmpdir / "test.codetf.json"
+
+    context = mocker.MagicMock(directory=Path("/foo/bar/whatever"))
+    results = [
+        Result(
+            codemod=f"test-{idx}",
+            summary="test",
+            description="test",
+            failedFiles=["failed"],
+            changeset=[
+                ChangeSet(
+                    path=f"test{num}",
+                    diff="--- a/test\n+++ b/test\n@@ -1,1 +1,1 @@\n-1\n+2\n",
+                    changes=[Change(lineNumber=1, description="Change 1 to 2")],
+                )
+                for num in range(idx + 1)
+            ],
+        )
+        for idx in range(num_results)
+    ]
+    writer = CodeTFWriter(path)
+    for result in results:
+        writer.add_result(result)
+    run = Run.build(context, 42, [])
+    retval = writer.close(run)
+
+    assert retval == 0
+
+    data = path.read_text(encoding="utf-8")
+    assert CodeTF.model_validate_json(data) == CodeTF(run=run, results=results)
+    assert json.loads(data) == json.loads(
+        CodeTF(run=run, results=results).model_dump_json(exclude_none=True)
+    )
+
+    jsonschema.validate(json.loads(data), codetf_schema)
+
+
+def test_write_codetf_incrementally_fails(tmpdir, mocker):
+    context = mocker.MagicMock(directory=Path("/foo/bar/whatever"))
+    writer = CodeTFWriter(tmpdir / "missing" / "test.codetf.json")
+    writer.add_result(
+        Result(codemod="test", summary="test", description="test", changeset=[])
+    )
+
+    assert writer.close(Run.build(context, 42, [])) == 2
+
+
+def test_write_codetf_incrementally_discard(tmpdir):
+    path = Path(tmpdir) / "test.codetf.json"
+    path.write_text("previous", encoding="utf-8")
+    writer = CodeTFWriter(path)
+    writer.add_result(
+        Result(codemod="test", summary="test", description="test", changeset=[])
+    )
+    writer.discard()
+
+    assert path.read_text(encoding="utf-8") == "previous"
+    assert list(Path(tmpdir).iterdir()) == [path]
+
+
+def test_write_codetf_concurrently(tmpdir, mocker):
+    context = mocker.MagicMock(directory=Path("/foo/bar/whatever"))
+    path = Path(tmpdir) / "test.codetf.json"
+    writers = [CodeTFWriter(path), CodeTFWriter(path)]
+    for idx, writer in enumerate(writers):
+        writer.add_result(
+            Result(
+                codemod=f"test-{idx}", summary="test", description="test", changeset=[]
+            )
+        )
+
+    assert writers[1].close(Run.build(context, 42, [])) == 0
+    assert writers[0].close(Run.build(context, 42, [])) == 0
+
+    assert CodeTF.model_validate_json(path.read_text()).results[0].codemod == "test-0"
+    assert list(Path(tmpdir).iterdir()) == [path]
+
+
 def test_reference_use_url_for_description():
     ref = Reference(url="https://example.com")
     assert ref.description == "https://example.com"
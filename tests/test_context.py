@@ -1,6 +1,12 @@
+import os
+import stat
+
+import libcst as cst
 import pytest
 
+from codemodder.codetf import ChangeSet
 from codemodder.context import CodemodExecutionContext as Context
+from codemodder.context import write_files
 from codemodder.dependency import Security
 from codemodder.project_analysis.python_repo_manager import PythonRepoManager
 from codemodder.registry import load_registered_codemods
@@ -77,3 +83,99 @@ class TestContext:
 ```"""
             in description
         )
+
+    def test_report_results_releases_diffs(self, mocker):
+        registry = load_registered_codemods()
+        repo_manager = PythonRepoManager(mocker.Mock())
+        codemod = registry.match_codemods(codemod_include=["url-sandbox"])[0]
+
+        context = Context(mocker.Mock(), True, False, registry, repo_manager, [], [])
+        context.report = mocker.MagicMock()
+        changeset = ChangeSet(path="code.py", diff="--- \n+++ \n")
+        context.add_changesets(codemod.id, [changeset])
+
+        context.report_results(codemod)
+        context.report_results(codemod)
+
+        context.report.add_result.assert_called_once()
+        (result,) = context.report.add_result.call_args.args
+        assert result.codemod == codemod.id
+        assert result.changeset == [changeset]
+        assert not changeset.diff
+        assert context.get_changed_files() == ["code.py"]
+        with pytest.raises(ValueError):
+            context.compile_results([codemod])
+
+
+class TestWriteFiles:
+    @pytest.fixture(autouse=True)
+    def disable_update_code(self):
+        """
+        Override fixture from conftest.py: these tests write files
+        """
+
+    def _stage(self, context, file_path, code):
+        context.module_cache.stage(file_path, cst.parse_module(code), code)
+
+    def test_flush_staged(self, mocker, tmp_path):
+        first, second = tmp_path / "a.py", tmp_path / "b.py"
+        first.write_text("x = 1\n")
+        second.write_text("y = 1\n")
+        first.chmod(0o755)
+        context = Context(tmp_path, False, False, mocker.Mock(), mocker.Mock(), [], [])
+        self._stage(context, first, "x = 2\n")
+        self._stage(context, second, "y = 2\n")
+        replace = mocker.spy(os, "replace")
+
+        context.flush_staged()
+
+        assert first.read_text() == "x = 2\n"
+        assert second.read_text() == "y = 2\n"
+        assert stat.S_IMODE(first.stat().st_mode) == 0o755
+        assert replace.call_count == 2
+        assert sorted(tmp_path.iterdir()) == [first, second]
+        assert not context.module_cache.staged_paths()
+
+    def test_failed_write_replaces_nothing(self, mocker, tmp_path):
+        first, second = tmp_path / "a.py", tmp_path / "b.py"
+        first.write_text("x = 1\n")
+        second.write_text("y = 1\n")
+        mocker.patch.object(os, "fsync", side_effect=[None, OSError("disk full")])
+
+        with pytest.raises(OSError):
+            write_files({first: "x = 2\n", second: "y = 2\n"})
+
+        assert first.read_text() == "x = 1\n"
+        assert second.read_text() == "y = 1\n"
+        assert sorted(tmp_path.iterdir()) == [first, second]
+
+    def test_failed_replace_removes_temp_files(self, mocker, tmp_path):
+        first, second = tmp_path / "a.py", tmp_path / "b.py"
+        first.write_text("x = 1\n")
+        second.write_text("y = 1\n")
+        replace = os.replace
+
+        def replace_once(src, dst):
+            if os.path.basename(dst) == second.name:
+                raise OSError("read-only filesystem")
+            replace(src, dst)
+
+        mocker.patch.object(os, "replace", side_effect=replace_once)
+
+        with pytest.raises(OSError):
+            write_files({first: "x = 2\n", second: "y = 2\n"})
+
+        assert first.read_text() == "x = 2\n"
+        assert second.read_text() == "y = 1\n"
+        assert sorted(tmp_path.iterdir()) == [first, second]
+
+    def test_dry_run_writes_nothing(self, mocker, tmp_path):
+        file_path = tmp_path / "a.py"
+        file_path.write_text("x = 1\n")
+        context = Context(tmp_path, True, False, mocker.Mock(), mocker.Mock(), [], [])
+        self._stage(context, file_path, "x = 2\n")
+
+        context.flush_staged()
+
+        assert file_path.read_text() == "x = 1\n"
+        assert not context.module_cache.staged_paths()
@@ -0,0 +1,45 @@
+import difflib
+
+import pytest
+
+from codemodder.diff import create_diff, unified_diff
+
+
+def _lines(count: int, changed: dict[int, str] | None = None) -> list[str]:
+    lines = [f"value_{idx} = compute({idx})\n" for idx in range(count)]
+    for idx, line in (changed or {}).items():
+        lines[idx] = line
+    return lines
+
+
+@pytest.mark.parametrize(
+    "original,new",
+    [
+        (_lines(10), _lines(10)),
+        (_lines(10), _lines(10, {0: "first = 1\n"})),
+        (_lines(10), _lines(10, {9: "last = 1\n"})),
+        (_lines(50), _lines(50, {10: "x = 1\n", 40: "y = 2\n"})),
+        (_lines(50), _lines(50, {20: "x = 1\n", 24: "y = 2\n"})),
+        (_lines(10), _lines(10)[:5] + ["new = 1\n"] + _lines(10)[5:]),
+        (_lines(10), _lines(10)[:5] + _lines(10)[6:]),
+        (_lines(10), _lines(10)[:-1] + ["no_newline = 1"]),
+        (_lines(5), []),
+        ([], _lines(5)),
+    ],
+)
+def test_matches_difflib(original, new):
+    assert list(unified_diff(original, new)) == list(
+        difflib.unified_diff(original, new)
+    )
+
+
+def test_only_changed_region_is_compared(mocker):
+    original = _lines(20000)
+    new = _lines(20000, {10000: "changed = 1\n"})
+    expected = "".join(difflib.unified_diff(original, new))
+    matcher = mocker.spy(difflib, "SequenceMatcher")
+
+    assert create_diff(original, new) == expected
+    ((_, original_region, new_region), _) = matcher.call_args
+    assert original_region == [original[10000]]
+    assert new_region == ["changed = 1\n"]
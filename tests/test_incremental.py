@@ -0,0 +1,57 @@
+import codemodder.incremental
+from codemodder.incremental import DIGEST_SIZE, IncrementalIndex
+
+
+def test_key_depends_on_inputs():
+    key = IncrementalIndex.key("codemod", "x = 1\n", None, [], [])
+
+    assert key == IncrementalIndex.key("codemod", "x = 1\n", None, [], [])
+    assert key != IncrementalIndex.key("other", "x = 1\n", None, [], [])
+    assert key != IncrementalIndex.key("codemod", "x = 2\n", None, [], [])
+    assert key != IncrementalIndex.key("codemod", "x = 1\n", [], [], [])
+    assert key != IncrementalIndex.key("codemod", "x = 1\n", None, [1], [])
+
+
+def test_saved_keys_are_loaded(tmp_path):
+    path = tmp_path / "cache" / "incremental.idx"
+    first = IncrementalIndex.key("codemod", "x = 1\n", None, [], [])
+    second = IncrementalIndex.key("codemod", "x = 2\n", None, [], [])
+
+    index = IncrementalIndex(path)
+    index.add(first)
+    index.save()
+    index.add(second)
+    index.save()
+
+    loaded = IncrementalIndex(path)
+    assert len(loaded) == 2
+    assert first in loaded
+    assert second in loaded
+
+
+def test_stale_keys_are_compacted(mocker, tmp_path):
+    mocker.patch.object(codemodder.incremental, "COMPACT_THRESHOLD", 2)
+    path = tmp_path / "incremental.idx"
+    keys = [
+        IncrementalIndex.key("codemod", f"x = {idx}\n", None, [], [])
+        for idx in range(6)
+    ]
+    index = IncrementalIndex(path)
+    for key in keys[:5]:
+        index.add(key)
+    index.save()
+
+    # Half of the keys are stale, which does not outnumber those that were used
+    index = IncrementalIndex(path)
+    index.add(keys[0])
+    index.add(keys[1])
+    index.add(keys[5])
+    index.save()
+    assert len(path.read_bytes()) == 6 * DIGEST_SIZE
+
+    # Five of six keys are stale
+    index = IncrementalIndex(path)
+    index.add(keys[5])
+    index.save()
+    assert path.read_bytes() == keys[5]
+    assert len(IncrementalIndex(path)) == 1
@@ -1,9 +1,19 @@
+import gc
+import weakref
+from pathlib import Path
+
+import libcst as cst
 from libcst._exceptions import ParserSyntaxError
 
 from codemodder.codemods.libcst_transformer import (
     LibcstResultTransformer,
     LibcstTransformerPipeline,
 )
+from codemodder.file_context import FileContext
+from codemodder.module_cache import ModuleCache
+from codemodder.registry import load_registered_codemods
+from codemodder.result import LineInfo
+from codemodder.semgrep import SemgrepLocation, SemgrepResult
 
 
 def test_parse_error(mocker, caplog):
@@ -14,10 +24,12 @@ def test_parse_error(mocker, caplog):
 
     transformer = mocker.MagicMock(spec=LibcstResultTransformer)
     file_context = mocker.MagicMock()
+    context = mocker.MagicMock()
+    context.module_cache = ModuleCache()
 
     pipeline = LibcstTransformerPipeline(transformer)
     pipeline.apply(
-        context=mocker.MagicMock(),
+        context=context,
         file_context=file_context,
         results=None,
     )
@@ -40,3 +52,99 @@ def test_transformer_error(mocker, caplog):
 
     file_context.add_failure.assert_called_once()
     assert "error transforming file" in caplog.text
+
+
+class ReplaceCall(LibcstResultTransformer):
+    def on_result_found(self, original_node, updated_node):
+        del original_node
+        return updated_node.with_changes(func=cst.Name("replaced"))
+
+
+class ReplaceCallWithVisit(ReplaceCall):
+    def visit_Name(self, node: cst.Name):
+        del node
+
+
+def _call_result(line: int) -> SemgrepResult:
+    return SemgrepResult(
+        rule_id="rule",
+        locations=[
+            SemgrepLocation(
+                file=Path("code.py"),
+                start=LineInfo(line=line, column=5),
+                end=LineInfo(line=line, column=8),
+            )
+        ],
+    )
+
+
+def test_result_guided():
+    assert ReplaceCall.is_result_guided()
+    assert not ReplaceCallWithVisit.is_result_guided()
+
+
+def test_skip_subtrees_without_results(mocker, tmp_path):
+    module = cst.parse_module("a()\nif x:\n    b()\nc()\n")
+    file_context = FileContext(tmp_path, tmp_path / "code.py")
+    on_result_found = mocker.spy(ReplaceCall, "on_result_found")
+    leave_name = mocker.spy(ReplaceCall, "leave_Name")
+
+    new_module = ReplaceCall.transform(module, [_call_result(3)], file_context)
+
+    assert new_module.code == "a()\nif x:\n    replaced()\nc()\n"
+    on_result_found.assert_called_once()
+    # Only the names within the `if` statement are visited
+    assert [call.args[1].value for call in leave_name.call_args_list] == ["x", "b"]
+
+
+def test_result_in_decorator(tmp_path):
+    module = cst.parse_module("@decorate(\n    a()\n)\ndef f():\n    pass\n")
+    file_context = FileContext(tmp_path, tmp_path / "code.py")
+
+    new_module = ReplaceCall.transform(module, [_call_result(2)], file_context)
+
+    assert new_module.code == "@decorate(\n    replaced()\n)\ndef f():\n    pass\n"
+
+
+def test_skip_file_without_results(mocker, tmp_path):
+    module = cst.parse_module("a()\n")
+    file_context = FileContext(tmp_path, tmp_path / "code.py")
+    wrapper = mocker.spy(cst, "MetadataWrapper")
+
+    assert ReplaceCall.transform(module, [], file_context) is module
+    wrapper.assert_not_called()
+
+
+def test_transformers_are_released(tmp_path):
+    codemod = load_registered_codemods().get_codemod("pixee:python/secure-random")
+    instances: weakref.WeakSet = weakref.WeakSet()
+
+    class TrackedTransformer(codemod.transformer.transformers[0]):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            instances.add(self)
+
+    for idx in range(10):
+        file_path = tmp_path / f"code{idx}.py"
+        results = [
+            SemgrepResult(
+                rule_id="secure-random",
+                locations=[
+                    SemgrepLocation(
+                        file=file_path,
+                        start=LineInfo(line=3, column=1),
+                        end=LineInfo(line=3, column=16),
+                    )
+                ],
+            )
+        ]
+        module = TrackedTransformer.transform(
+            cst.parse_module("import random\n\nrandom.random()\n"),
+            results,
+            FileContext(tmp_path, file_path, results=results),
+        )
+        assert "secrets.SystemRandom().random()" in module.code
+
+    # Nothing that was computed for a file should outlive its transformer
+    gc.collect()
+    assert not instances
@@ -0,0 +1,149 @@
+import libcst as cst
+
+from codemodder.module_cache import ModuleCache
+
+
+def test_module_is_parsed_once(mocker, tmp_path):
+    path = tmp_path / "code.py"
+    path.write_text("x = 1\n")
+    parse = mocker.spy(cst, "parse_module")
+
+    cache = ModuleCache()
+    first = cache.get_module(path)
+    second = cache.get_module(path)
+
+    assert first is second
+    assert first.code == "x = 1\n"
+    parse.assert_called_once()
+
+
+def test_changed_file_is_reparsed(mocker, tmp_path):
+    path = tmp_path / "code.py"
+    path.write_text("x = 1\n")
+    parse = mocker.spy(cst, "parse_module")
+
+    cache = ModuleCache()
+    first = cache.get_module(path)
+    path.write_text("x = 2\n")
+    second = cache.get_module(path)
+
+    assert first is not second
+    assert second.code == "x = 2\n"
+    assert parse.call_count == 2
+
+
+def test_update_reuses_new_tree(mocker, tmp_path):
+    path = tmp_path / "code.py"
+    path.write_text("x = 1\n")
+
+    cache = ModuleCache()
+    cache.get_module(path)
+
+    new_tree = cst.parse_module("x = 2\n")
+    path.write_text(new_tree.code)
+    cache.update(path, new_tree)
+
+    parse = mocker.spy(cst, "parse_module")
+    assert cache.get_module(path) is new_tree
+    parse.assert_not_called()
+
+
+def test_metadata_wrapper_is_reused(tmp_path):
+    path = tmp_path / "code.py"
+    path.write_text("x = 1\n")
+
+    cache = ModuleCache()
+    module = cache.get_module(path)
+    wrapper = cache.get_metadata_wrapper(path, module)
+
+    assert wrapper.module is module
+    assert cache.get_metadata_wrapper(path, cache.get_module(path)) is wrapper
+
+    new_tree = cst.parse_module("x = 2\n")
+    cache.update(path, new_tree)
+    new_wrapper = cache.get_metadata_wrapper(path, new_tree)
+
+    assert new_wrapper is not wrapper
+    # Trees that were not parsed by the cache may share nodes, so they are copied
+    assert new_wrapper.module is not new_tree
+    assert new_wrapper.module.deep_equals(new_tree)
+    assert cache.get_metadata_wrapper(path, new_tree) is new_wrapper
+
+
+def test_code_is_not_regenerated(mocker, tmp_path):
+    path = tmp_path / "code.py"
+    path.write_text("x = 1\n")
+
+    cache = ModuleCache()
+    module = cache.get_module(path)
+    new_tree = cst.parse_module("x = 2\n")
+    cache.stage(path, new_tree, "x = 2\n")
+    codegen = mocker.spy(cst.Module, "_codegen_impl")
+
+    assert cache.get_code(path, module) == "x = 1\n"
+    assert cache.get_code(path, new_tree) == "x = 2\n"
+    codegen.assert_not_called()
+
+    assert cache.get_code(path, cst.parse_module("x = 3\n")) == "x = 3\n"
+    codegen.assert_called_once()
+
+
+def test_staged_source_is_parsed_when_needed(mocker, tmp_path):
+    path = tmp_path / "code.py"
+    path.write_text("x = 1\n")
+
+    cache = ModuleCache()
+    parse = mocker.spy(cst, "parse_module")
+    cache.stage_source(path, "x = 2\n")
+
+    assert cache.get_staged_source(path) == "x = 2\n"
+    assert cache.get_source(path) == "x = 2\n"
+    parse.assert_not_called()
+
+    module = cache.get_module(path)
+    assert module.code == "x = 2\n"
+    assert cache.get_module(path) is module
+    parse.assert_called_once()
+    assert cache.get_staged_source(tmp_path / "other.py") is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    paths = [tmp_path / f"code{idx}.py" for idx in range(3)]
+    for path in paths:
+        path.write_text("x = 1\n")
+
+    cache = ModuleCache(max_entries=2)
+    first = cache.get_module(paths[0])
+    cache.get_metadata_wrapper(paths[0], first)
+    second = cache.get_module(paths[1])
+    cache.get_metadata_wrapper(paths[1], second)
+    # Using the first file makes the second the least recently used
+    assert cache.get_module(paths[0]) is first
+    cache.get_metadata_wrapper(paths[0], first)
+    cache.get_metadata_wrapper(paths[2], cache.get_module(paths[2]))
+
+    assert len(cache) == 2
+    assert cache.get_module(paths[0]) is first
+    assert cache.get_module(paths[1]) is not second
+
+
+def test_release(tmp_path):
+    path = tmp_path / "code.py"
+    path.write_text("x = 1\n")
+    other = tmp_path / "other.py"
+    other.write_text("y = 1\n")
+
+    cache = ModuleCache()
+    module = cache.get_module(path)
+    wrapper = cache.get_metadata_wrapper(path, module)
+    new_tree = cst.parse_module("y = 2\n")
+    cache.stage(other, new_tree, "y = 2\n")
+
+    cache.release(path)
+    cache.release(other)
+
+    assert len(cache) == 0
+    assert cache.get_module(path) is not module
+    assert cache.get_metadata_wrapper(path, module) is not wrapper
+    assert cache.get_staged_source(other) == "y = 2\n"
+    assert cache.get_module(other) is not new_tree
@@ -0,0 +1,73 @@
+import subprocess
+
+from codemodder.codetf import ChangeSet, Result
+from codemodder.diff import create_diff
+from codemodder.patch import PatchWriter, format_patch
+
+
+def _result(*changesets):
+    return Result(
+        codemod="test", summary="test", description="test", changeset=changesets
+    )
+
+
+def test_format_patch():
+    diff = create_diff(["a\n", "b\n"], ["a\n", "c\n"])
+
+    assert format_patch("pkg/code.py", diff) == (
+        "diff --git a/pkg/code.py b/pkg/code.py\n"
+        "--- a/pkg/code.py\n"
+        "+++ b/pkg/code.py\n"
+        "@@ -1,2 +1,2 @@\n a\n-b\n+c\n"
+    )
+
+
+def test_format_patch_no_newline():
+    diff = create_diff(["a\n", "b\n"], ["a\n", "b\n", "c"])
+
+    assert format_patch("code.py", diff).endswith("+c\n\\ No newline at end of file\n")
+
+
+def test_patch_is_ordered_by_path(tmp_path):
+    (tmp_path / "a.py").write_text("x = 1\ny = 2\n")
+    (tmp_path / "b.py").write_text("z = 3\n")
+    writer = PatchWriter(tmp_path / "changes.patch")
+    writer.add_result(
+        _result(
+            ChangeSet(path="b.py", diff=create_diff(["z = 3\n"], ["z = 4\n"])),
+            ChangeSet(
+                path="a.py",
+                diff=create_diff(["x = 1\n", "y = 2\n"], ["x = 2\n", "y = 2\n"]),
+            ),
+        )
+    )
+    writer.add_result(
+        _result(
+            ChangeSet(
+                path="a.py",
+                diff=create_diff(["x = 2\n", "y = 2\n"], ["x = 2\n", "y = 3\n"]),
+            ),
+            ChangeSet(path="c.py", diff=""),
+        )
+    )
+
+    assert writer.close(None) == 0
+
+    patch = (tmp_path / "changes.patch").read_text()
+    assert [line for line in patch.splitlines() if line.startswith("diff")] == [
+        "diff --git a/a.py b/a.py",
+        "diff --git a/a.py b/a.py",
+        "diff --git a/b.py b/b.py",
+    ]
+    subprocess.run(["git", "apply", "changes.patch"], cwd=tmp_path, check=True)
+    assert (tmp_path / "a.py").read_text() == "x = 2\ny = 3\n"
+    assert (tmp_path / "b.py").read_text() == "z = 4\n"
+
+
+def test_failed_write(tmp_path):
+    writer = PatchWriter(tmp_path / "missing" / "changes.patch")
+    writer.add_result(
+        _result(ChangeSet(path="b.py", diff=create_diff(["z = 3\n"], ["z = 4\n"])))
+    )
+
+    assert writer.close(None) == 2
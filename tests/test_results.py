@@ -1,6 +1,8 @@
 import json
 from pathlib import Path
 
+from codemodder.result import LineInfo, ResultIndex
+from codemodder.semgrep import SemgrepLocation, SemgrepResult, SemgrepResultSet
 from core_codemods.sonar.results import SonarResultSet
 
 
@@ -89,3 +91,106 @@ class TestResults:
         result = SonarResultSet.from_json(sonar_json)
         # did not crash and returned an empty ResultSet
         assert not result
+
+    def test_paths_are_normalized(self, mocker, tmp_path):
+        result_set = SemgrepResultSet()
+        for idx, name in enumerate(["./src/code.py", "src/lib/../code.py", "b.py"]):
+            result_set.add_result(_result("rule", (idx, idx), file=Path(name)))
+        context = mocker.MagicMock(directory=tmp_path)
+
+        assert list(result_set["rule"]) == [Path("src/code.py"), Path("b.py")]
+        results = result_set.results_for_rule_and_file(
+            context, "rule", tmp_path / "src" / "code.py"
+        )
+        assert [result.locations[0].start.line for result in results] == [0, 1]
+        assert not result_set.results_for_rule_and_file(
+            context, "rule", tmp_path / "c.py"
+        )
+        assert result_set.files_for_rules(context, ["rule"]) == {
+            tmp_path / "src" / "code.py",
+            tmp_path / "b.py",
+        }
+
+    def test_file_keys_are_shared(self, mocker, tmp_path):
+        # Keys are computed once per file rather than once per lookup
+        files = [Path(f"pkg{idx % 10}", f"mod{idx}.py") for idx in range(200)]
+        result_set = SemgrepResultSet()
+        for idx in range(1000):
+            result_set.add_result(
+                _result(f"rule{idx % 5}", (idx, idx), file=files[idx % 200])
+            )
+        context = mocker.MagicMock(directory=tmp_path)
+        relative_path = mocker.spy(result_set, "_relative_path")
+
+        for rule_id in result_set:
+            for file in files:
+                result_set.results_for_rule_and_file(context, rule_id, tmp_path / file)
+
+        assert relative_path.call_count == len(files)
+
+    def test_merged_file_keys(self, mocker, tmp_path):
+        context = mocker.MagicMock(directory=tmp_path)
+        first = SemgrepResultSet()
+        first.add_result(_result("rule", (1, 1), file=Path("a.py")))
+        second = SemgrepResultSet()
+        second.add_result(_result("rule", (2, 2), file=Path("./a.py")))
+        assert first.results_for_rule_and_file(context, "rule", tmp_path / "a.py")
+
+        merged = first | second
+        assert merged._file_keys == {}
+        results = merged.results_for_rule_and_file(context, "rule", tmp_path / "a.py")
+        assert sorted(result.locations[0].start.line for result in results) == [1, 2]
+
+        first.add_result(_result("rule", (3, 3), file=Path("c.py")))
+        assert first._file_keys == {}
+
+
+def _result(
+    rule_id: str, *lines: tuple[int, int], file: Path = Path("code.py")
+) -> SemgrepResult:
+    return SemgrepResult(
+        rule_id=rule_id,
+        locations=[
+            SemgrepLocation(file=file, start=LineInfo(start), end=LineInfo(end))
+            for start, end in lines
+        ],
+    )
+
+
+class TestResultIndex:
+    def test_overlapping(self):
+        results = [
+            _result("b", (10, 12)),
+            _result("a", (3, 3), (20, 20)),
+            _result("c", (11, 11)),
+        ]
+        index = ResultIndex(results)
+
+        assert index.overlapping(1, 2) == []
+        assert index.overlapping(4, 9) == []
+        assert index.overlapping(3, 3) == [results[1]]
+        assert index.overlapping(12, 30) == [results[0], results[1]]
+        assert index.overlapping(1, 100) == results
+        assert index.overlapping(21, 100) == []
+
+    def test_matches_linear_scan(self):
+        results = [
+            _result(str(idx), (start, start + span))
+            for idx, (start, span) in enumerate(
+                [(5, 0), (1, 40), (7, 2), (30, 0), (7, 0), (90, 5)]
+            )
+        ]
+        index = ResultIndex(results)
+        for start in range(0, 100, 3):
+            for end in range(start, start + 10):
+                assert index.overlapping(start, end) == [
+                    result
+                    for result in results
+                    if any(
+                        loc.start.line <= end and loc.end.line >= start
+                        for loc in result.locations
+                    )
+                ]
+
+    def test_empty(self):
+        assert not ResultIndex([]).overlapping(1, 1)
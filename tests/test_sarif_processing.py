@@ -1,9 +1,11 @@
+import io
 import json
 import subprocess
 from pathlib import Path
 
 import pytest
 
+from codemodder.sarifs import JsonStream, iter_sarif_results, iter_sarif_runs
 from codemodder.semgrep import SemgrepResult, SemgrepResultSet
 
 
@@ -68,3 +70,65 @@ class TestSarifProcessing:
             check=False,
         )
         assert completed_process.returncode == 0
+
+    def test_iter_sarif_results_drops_unused_fields(self, tmp_path):
+        sarif_file = Path("tests") / "samples" / "webgoat_v8.2.0_codeql.sarif"
+        with open(sarif_file, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        results = list(iter_sarif_results(sarif_file))
+        assert len(results) == len(data["runs"][0]["results"])
+        for (run, result), expected in zip(results, data["runs"][0]["results"]):
+            assert run["tool"] == data["runs"][0]["tool"]
+            assert "results" not in run
+            assert "codeFlows" not in result
+            assert result["locations"] == expected["locations"]
+
+    def test_iter_sarif_results_before_tool(self, tmp_path):
+        sarif_file = tmp_path / "results.sarif"
+        sarif_file.write_text(
+            json.dumps(
+                {
+                    "runs": [
+                        {"results": [{"ruleId": "a"}], "tool": {"name": "a"}},
+                        {"results": None, "tool": {"name": "b"}},
+                        {"tool": {"name": "c"}, "results": [{"ruleId": "c"}]},
+                    ]
+                }
+            )
+        )
+
+        assert [
+            (run["tool"]["name"], result["ruleId"])
+            for run, result in iter_sarif_results(sarif_file)
+        ] == [("a", "a"), ("c", "c")]
+        assert [run["tool"]["name"] for run in iter_sarif_runs(sarif_file)] == [
+            "a",
+            "b",
+            "c",
+        ]
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 7])
+    def test_json_stream_chunks(self, chunk_size):
+        data = {"a": [12345, 'x"]}', None], "runs": [{"b": 1.5e10, "c": {}}]}
+        stream = JsonStream(io.StringIO(json.dumps(data)), chunk_size)
+
+        decoded = {}
+        for key in stream.object_keys():
+            if key == "runs":
+                decoded[key] = []
+                for _ in stream.array_items():
+                    decoded[key].append(
+                        {run_key: stream.value() for run_key in stream.object_keys()}
+                    )
+            else:
+                decoded[key] = stream.value()
+        assert decoded == data
+
+    def test_json_stream_truncated(self):
+        stream = JsonStream(io.StringIO('{"runs": [{"results": [1, 2'), 4)
+        with pytest.raises(json.JSONDecodeError):
+            for _ in stream.object_keys():
+                for _ in stream.array_items():
+                    for _ in stream.object_keys():
+                        stream.skip()
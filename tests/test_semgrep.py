@@ -1,11 +1,24 @@
 import json
+import urllib.parse
 from pathlib import Path
 
 import pytest
 
-from codemodder.codemods.semgrep import SemgrepSarifFileDetector
+import codemodder.semgrep
+from codemodder import sarifs
+from codemodder.codemods.semgrep import SemgrepRuleDetector, SemgrepSarifFileDetector
 from codemodder.context import CodemodExecutionContext
-from codemodder.semgrep import SemgrepResultSet, SemgrepSarifToolDetector
+from codemodder.module_cache import ModuleCache
+from codemodder.result import LineInfo
+from codemodder.sarifs import SarifRegistry
+from codemodder.semgrep import (
+    InternalSemgrepResultSet,
+    SemgrepLocation,
+    SemgrepResult,
+    SemgrepResultSet,
+    SemgrepSarifToolDetector,
+)
+from codemodder.semgrep import run as semgrep_run
 
 SAMPLE_DATA_PATH = Path(__file__).parent / "samples"
 
@@ -31,6 +44,7 @@ def test_semgrep_sarif_codemode_detector(mocker):
     context.tool_result_files_map = {
         "semgrep": [SAMPLE_DATA_PATH / "pygoat.semgrep.sarif.json"]
     }
+    context.sarif_registry = None
     results = detector.apply(codemod_id="foo", context=context, files_to_analyze=[])
     assert isinstance(results, SemgrepResultSet)
     assert len(results) == 25
@@ -38,3 +52,183 @@ def test_semgrep_sarif_codemode_detector(mocker):
         "python.django.security.audit.secure-cookies.django-secure-set-cookie"
         in results
     )
+
+
+def test_semgrep_sarif_codemod_detector_uses_registry(mocker):
+    detector = SemgrepSarifFileDetector()
+    sarif_files = [
+        SAMPLE_DATA_PATH / "pygoat.semgrep.sarif.json",
+        SAMPLE_DATA_PATH / "webgoat_v8.2.0_codeql.sarif",
+    ]
+    registry = SarifRegistry.load(sarif_files)
+    assert registry.files_by_tool() == {
+        "semgrep": [str(sarif_files[0])],
+        "codeql": [str(sarif_files[1])],
+    }
+
+    iter_runs = mocker.spy(sarifs, "_iter_runs")
+    context = mocker.MagicMock(spec=CodemodExecutionContext)
+    context.sarif_registry = registry
+    results = detector.apply(codemod_id="foo", context=context, files_to_analyze=[])
+
+    assert results == SemgrepResultSet.from_sarif(sarif_files[0])
+    assert detector.apply("bar", context, []) is results
+    # The results are read once to build the result set, and once more for the
+    # comparison above, but the results of the unused codeql run are never read
+    assert [call.args[0] for call in iter_runs.call_args_list] == [sarif_files[0]] * 2
+
+
+def test_semgrep_rule_detector_reuses_run_results(mocker):
+    semgrep_run = mocker.patch("codemodder.codemods.semgrep.semgrep_run")
+    detector = SemgrepRuleDetector("- pattern: foo()")
+
+    context = mocker.MagicMock(spec=CodemodExecutionContext)
+    context.semgrep_results = InternalSemgrepResultSet()
+    results = detector.apply(codemod_id="foo", context=context, files_to_analyze=[])
+
+    assert results is context.semgrep_results
+    semgrep_run.assert_not_called()
+
+
+def test_semgrep_rule_detector_runs_standalone(mocker):
+    semgrep_run = mocker.patch("codemodder.codemods.semgrep.semgrep_run")
+    detector = SemgrepRuleDetector("- pattern: foo()")
+
+    context = mocker.MagicMock(spec=CodemodExecutionContext)
+    context.semgrep_results = None
+    context.timer = mocker.MagicMock()
+    results = detector.apply(codemod_id="foo", context=context, files_to_analyze=[])
+
+    assert results is semgrep_run.return_value
+    semgrep_run.assert_called_once()
+
+
+def test_semgrep_run_uses_cache(mocker, tmp_path):
+    code_dir = tmp_path / "code"
+    code_dir.mkdir()
+    changed = code_dir / "changed.py"
+    changed.write_text("foo()\n")
+    unchanged = code_dir / "unchanged.py"
+    unchanged.write_text("foo()\nbar()\n")
+    rules = tmp_path / "rules.yaml"
+    rules.write_text(
+        "rules:\n- id: call-foo\n  pattern: foo()\n  message: foo\n"
+        "  languages: [python]\n  severity: WARNING\n"
+    )
+
+    context = mocker.MagicMock(spec=CodemodExecutionContext)
+    context.cache_dir = tmp_path / "cache"
+    context.verbose = False
+    context.directory = code_dir
+    scan = mocker.spy(codemodder.semgrep, "_scan")
+
+    results = semgrep_run(context, [rules], [changed, unchanged])
+    assert scan.call_args.args[2] == [changed, unchanged]
+    assert sorted(results.files_for_rule("call-foo")) == [changed, unchanged]
+
+    changed.write_text("bar()\n")
+    results = semgrep_run(context, [rules], [changed, unchanged])
+    assert scan.call_args.args[2] == [changed]
+    assert results.files_for_rule("call-foo") == [unchanged]
+    assert len(results.results_for_rule_and_file(context, "call-foo", unchanged)) == 1
+
+    results = semgrep_run(context, [rules], [changed, unchanged])
+    assert scan.call_count == 2
+    assert results.files_for_rule("call-foo") == [unchanged]
+
+
+@pytest.mark.parametrize(
+    "uri",
+    [
+        lambda path: str(path),
+        lambda path: path.as_uri(),
+        lambda path: urllib.parse.quote(str(path.relative_to(Path.cwd()))),
+        lambda path: f"./sub/../{path.relative_to(Path.cwd())}",
+    ],
+    ids=["absolute", "file-uri", "percent-encoded", "unnormalized"],
+)
+def test_semgrep_cache_matches_uris(mocker, monkeypatch, tmp_path, uri):
+    monkeypatch.chdir(tmp_path)
+    code = tmp_path / "my code.py"
+    code.write_text("foo()\n")
+    rules = tmp_path / "rules.yaml"
+    rules.write_text("rules: []\n")
+    context = mocker.MagicMock(spec=CodemodExecutionContext)
+    context.cache_dir = tmp_path / "cache"
+    sarif_result = {
+        "ruleId": "call-foo",
+        "locations": [
+            {
+                "physicalLocation": {
+                    "artifactLocation": {"uri": uri(code)},
+                    "region": {
+                        "startLine": 1,
+                        "startColumn": 1,
+                        "endLine": 1,
+                        "endColumn": 6,
+                        "snippet": {"text": "foo()"},
+                    },
+                }
+            }
+        ],
+    }
+    scan = mocker.patch(
+        "codemodder.semgrep._scan",
+        return_value={"runs": [{"results": [sarif_result]}]},
+    )
+
+    semgrep_run(context, [rules], [code])
+    results = semgrep_run(context, [rules], [code])
+
+    scan.assert_called_once()
+    assert len(results["call-foo"]) == 1
+
+
+def test_semgrep_cache_write_failure(mocker, tmp_path):
+    code = tmp_path / "code.py"
+    code.write_text("foo()\n")
+    rules = tmp_path / "rules.yaml"
+    rules.write_text("rules: []\n")
+    context = mocker.MagicMock(spec=CodemodExecutionContext)
+    # The cache cannot be created beneath a file
+    context.cache_dir = code
+    mocker.patch("codemodder.semgrep._scan", return_value={"runs": []})
+    read_bytes = mocker.spy(Path, "read_bytes")
+
+    results = semgrep_run(context, [rules], [code])
+
+    assert not results
+    # The rules are read once, and the file is hashed once for both lookup and store
+    assert [call.args[0] for call in read_bytes.call_args_list] == [rules, code]
+
+
+def test_semgrep_rule_detector_rescans_staged_files(mocker, tmp_path):
+    changed = tmp_path / "changed.py"
+    changed.write_text("bar()\n")
+    unchanged = tmp_path / "unchanged.py"
+    unchanged.write_text("foo()\n")
+    context = mocker.MagicMock(spec=CodemodExecutionContext)
+    context.timer = mocker.MagicMock()
+    context.directory = tmp_path
+    context.verbose = False
+    context.module_cache = ModuleCache()
+    context.module_cache.stage_source(changed, "x = 1\nfoo()\n")
+    context.semgrep_results = InternalSemgrepResultSet()
+    context.semgrep_results.add_result(
+        SemgrepResult(
+            rule_id="foo",
+            locations=[
+                SemgrepLocation(file=file, start=LineInfo(1), end=LineInfo(1))
+                for file in (changed, unchanged)
+            ],
+        )
+    )
+    detector = SemgrepRuleDetector("- pattern: foo()")
+
+    results = detector.apply("foo", context, [changed, unchanged])
+
+    assert sorted(results.files_for_rule("foo")) == [changed, unchanged]
+    (result,) = results.results_for_rule_and_file(context, "foo", changed)
+    assert result.locations[0].start.line == 2
+    assert results.results_for_rule_and_file(context, "foo", unchanged)
+    assert len(context.semgrep_results["foo"][changed]) == 1